@@ -9,7 +9,7 @@ __author__ =
 __library__ = 'hyde'
 
 General command line:
-python3 HYDE_DynamicData_SnowNetwork_HS.py -settings_file configuration.json -time "YYYY-MM-DD HH:MM"
+python3 HYDE_DynamicData_SnowNetwork_HS.py -settings_file configuration.json -time "YYYY-MM-DD HH:MM" [--workers N]
 
 Version:
 20210427 (1.0.0) --> First released based on HYDE_DynamicData_GroundNetwork_WS.py in HYDE
@@ -19,6 +19,8 @@ Version:
 # -------------------------------------------------------------------------------------
 # Libraries
 import logging
+import multiprocessing
+import traceback
 import matplotlib.pylab as plt
 
 from argparse import ArgumentParser
@@ -29,6 +31,9 @@ from drv_configuration_time_hs import DriverTime
 
 from drv_data_hs_geo import DriverGeo
 from drv_data_hs_io import DriverData
+
+from lib_hs_logging import set_logging_buffer, emit_logging_buffer
+from lib_hs_analysis_interpolation_point import select_point2grid_cache, merge_point2grid_cache
 # -------------------------------------------------------------------------------------
 
 
@@ -41,6 +46,8 @@ alg_release = '2021-04-27'
 alg_type = 'DataDynamic'
 # Algorithm parameter(s)
 time_format = '%Y-%m-%d %H:%M'
+# Worker(s) collections (inherited by forked process(es); not pickled for each time step)
+worker_collections = {}
 # -------------------------------------------------------------------------------------
 
 
@@ -50,7 +57,7 @@ def main():
 
     # -------------------------------------------------------------------------------------
     # Get script argument(s)
-    [file_script, file_settings, time_arg] = get_args()
+    [file_script, file_settings, time_arg, workers_arg] = get_args()
 
     # Set algorithm configuration
     driver_algorithm = DriverAlgorithm(file_settings)
@@ -88,37 +95,58 @@ def main():
                            info_dict=data_settings['algorithm']['info'],
                            flag_updating_ancillary=data_settings['algorithm']['flag']['update_static_data_ancillary'])
     geo_collections = driver_geo.composer_geo()
+    interp_cache = driver_geo.get_interp_cache()
+    kernel_cache = driver_geo.get_kernel_cache()
     logging.info(' --> Set geographical data ... DONE')
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
+    # Set time task(s) (worker(s) process not overlapping window(s); ancillary and destination file(s) are not shared)
+    if workers_arg > 1:
+        time_chunks = driver_time.set_algorithm_plan(time_range, data_settings['data']['dynamic']['time'])
+        time_tasks = [(time_chunk[-1], time_chunk) for time_chunk in time_chunks]
+    else:
+        time_tasks = [(time_step, None) for time_step in time_range]
+
     # Iterate over time steps
-    for time_step in time_range:
-
-        # -------------------------------------------------------------------------------------
-        # Get data dynamic
-        driver_data_dynamic = DriverData(
-            time_step=time_step,
-            geo_collections=geo_collections,
-            src_dict=data_settings['data']['dynamic']['source'],
-            ancillary_dict=data_settings['data']['dynamic']['ancillary'],
-            dst_dict=data_settings['data']['dynamic']['destination'],
-            time_dict=data_settings['data']['dynamic']['time'],
-            variable_src_dict=data_settings['variables']['source'],
-            variable_dst_dict=data_settings['variables']['destination'],
-            info_dict=data_settings['algorithm']['info'],
-            template_dict=data_settings['algorithm']['template'],
-            flag_updating_ancillary=data_settings['algorithm']['flag']['update_dynamic_data_ancillary'],
-            flag_updating_destination=data_settings['algorithm']['flag']['update_dynamic_data_destination'],
-            flag_cleaning_tmp=data_settings['algorithm']['flag']['clean_temporary_data'])
-
-        # Method to organize datasets
-        driver_data_dynamic.organize_data()
-        # Method to dump datasets
-        driver_data_dynamic.dump_data()
-        # Method to delete tmp
-        driver_data_dynamic.clean_tmp()
-        # -------------------------------------------------------------------------------------
+    if workers_arg > 1 and len(time_tasks) > 1:
+
+        # Share collections with worker(s) through fork inheritance
+        worker_collections['data_settings'] = data_settings
+        worker_collections['geo_collections'] = geo_collections
+        worker_collections['interp_cache'] = interp_cache
+        worker_collections['kernel_cache'] = kernel_cache
+
+        logging.info(' --> Process time steps using ' + str(workers_arg) + ' worker(s) ... ')
+        pool_context = multiprocessing.get_context('fork')
+        with pool_context.Pool(processes=workers_arg) as pool_handle:
+            # Log record(s) are emitted in time steps order
+            for time_step, time_records, time_error, time_cache in pool_handle.imap(
+                    exec_time_step_worker, time_tasks):
+                emit_logging_buffer(time_records)
+                if time_error is not None:
+                    logging.error(' ===> Time step ' + str(time_step) + ' failed in worker process')
+                    raise RuntimeError(time_error)
+                # Method to merge interpolation weights and kernels computed by the worker(s)
+                merge_point2grid_cache(interp_cache, time_cache['interp_cache'])
+                merge_point2grid_cache(kernel_cache, time_cache['kernel_cache'])
+        logging.info(' --> Process time steps using ' + str(workers_arg) + ' worker(s) ... DONE')
+
+        # Method to delete tmp (after all the worker(s) are joined)
+        for time_step, time_window in time_tasks:
+            driver_data_dynamic = set_time_step(time_step, data_settings, geo_collections, time_window=time_window)
+            driver_data_dynamic.clean_tmp()
+        # Method to dump interpolation weights cache
+        driver_geo.dump_interp_cache(interp_cache, kernel_cache=kernel_cache)
+
+    else:
+
+        for time_step, time_window in time_tasks:
+            # Method to process time step
+            exec_time_step(time_step, data_settings, geo_collections,
+                           interp_cache=interp_cache, kernel_cache=kernel_cache, time_window=time_window)
+            # Method to dump interpolation weights cache
+            driver_geo.dump_interp_cache(interp_cache, kernel_cache=kernel_cache)
 
     # -------------------------------------------------------------------------------------
 
@@ -139,6 +167,86 @@ def main():
 # -------------------------------------------------------------------------------------
 
 
+# -------------------------------------------------------------------------------------
+# Method to set the driver of a time step
+def set_time_step(time_step, data_settings, geo_collections, interp_cache=None, kernel_cache=None,
+                  time_window=None):
+
+    # Get data dynamic
+    driver_data_dynamic = DriverData(
+        time_step=time_step,
+        geo_collections=geo_collections,
+        src_dict=data_settings['data']['dynamic']['source'],
+        ancillary_dict=data_settings['data']['dynamic']['ancillary'],
+        dst_dict=data_settings['data']['dynamic']['destination'],
+        time_dict=data_settings['data']['dynamic']['time'],
+        variable_src_dict=data_settings['variables']['source'],
+        variable_dst_dict=data_settings['variables']['destination'],
+        info_dict=data_settings['algorithm']['info'],
+        template_dict=data_settings['algorithm']['template'],
+        flag_updating_ancillary=data_settings['algorithm']['flag']['update_dynamic_data_ancillary'],
+        flag_updating_destination=data_settings['algorithm']['flag']['update_dynamic_data_destination'],
+        flag_cleaning_tmp=data_settings['algorithm']['flag']['clean_temporary_data'],
+        interp_cache=interp_cache, kernel_cache=kernel_cache,
+        time_window=time_window)
+
+    return driver_data_dynamic
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to process a time step
+def exec_time_step(time_step, data_settings, geo_collections, interp_cache=None, kernel_cache=None,
+                   time_window=None, flag_cleaning_tmp=True):
+
+    # Get data dynamic
+    driver_data_dynamic = set_time_step(time_step, data_settings, geo_collections,
+                                        interp_cache=interp_cache, kernel_cache=kernel_cache,
+                                        time_window=time_window)
+
+    # Method to organize datasets
+    driver_data_dynamic.organize_data()
+    # Method to dump datasets
+    driver_data_dynamic.dump_data()
+    # Method to delete tmp
+    if flag_cleaning_tmp:
+        driver_data_dynamic.clean_tmp()
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to process a time step in a worker process
+def exec_time_step_worker(time_task):
+
+    time_step, time_window = time_task
+
+    # Buffer log record(s) to emit them in the parent process
+    logger_buffer = worker_collections.get('logger_buffer')
+    if logger_buffer is None:
+        logger_buffer = worker_collections['logger_buffer'] = set_logging_buffer()
+
+    # Interpolation weights and kernels computed by the worker are sent back to the parent process
+    interp_cache, kernel_cache = worker_collections['interp_cache'], worker_collections['kernel_cache']
+    interp_keys, kernel_keys = set(interp_cache['cache_data'].keys()), set(kernel_cache['cache_data'].keys())
+
+    time_error = None
+    try:
+        exec_time_step(time_step, worker_collections['data_settings'], worker_collections['geo_collections'],
+                       interp_cache=interp_cache, kernel_cache=kernel_cache,
+                       time_window=time_window, flag_cleaning_tmp=False)
+    except Exception:
+        time_error = traceback.format_exc()
+
+    time_cache = {'interp_cache': select_point2grid_cache(interp_cache, interp_keys),
+                  'kernel_cache': select_point2grid_cache(kernel_cache, kernel_keys)}
+
+    return time_step, logger_buffer.flush_records(), time_error, time_cache
+
+# -------------------------------------------------------------------------------------
+
+
 # -------------------------------------------------------------------------------------
 # Method to get script argument(s)
 def get_args():
@@ -146,6 +254,7 @@ def get_args():
     parser_handle = ArgumentParser()
     parser_handle.add_argument('-settings_file', action="store", dest="alg_settings")
     parser_handle.add_argument('-time', action="store", dest="alg_time")
+    parser_handle.add_argument('-workers', '--workers', action="store", dest="alg_workers", type=int)
     parser_values = parser_handle.parse_args()
 
     alg_script = parser_handle.prog
@@ -160,7 +269,12 @@ def get_args():
     else:
         alg_time = None
 
-    return alg_script, alg_settings, alg_time
+    if parser_values.alg_workers:
+        alg_workers = parser_values.alg_workers
+    else:
+        alg_workers = 1
+
+    return alg_script, alg_settings, alg_time, alg_workers
 
 # -------------------------------------------------------------------------------------
 
@@ -29,7 +29,7 @@ class DriverVariable:
     # -------------------------------------------------------------------------------------
     # Method to initialize class
     def __init__(self, var_obj, ref_obj, var_attributes=None,
-                 fx_name=None, fx_parameters=None, fx_outcome=None,
+                 fx_name=None, fx_parameters=None, fx_outcome=None, fx_interp_cache=None, fx_kernel_cache=None,
                  tag_var_geo_x='longitude', tag_var_geo_y='latitude', tag_var_geo_z='altitude',
                  tag_ref_geo_x='west_east', tag_ref_geo_y='south_north',
                  tag_var_ws_data='data',
@@ -45,6 +45,8 @@ class DriverVariable:
         self.fx_name = fx_name
         self.fx_parameters = fx_parameters
         self.fx_outcome = fx_outcome
+        self.fx_interp_cache = fx_interp_cache
+        self.fx_kernel_cache = fx_kernel_cache
 
         self.tag_var_geo_x = tag_var_geo_x
         self.tag_var_geo_y = tag_var_geo_y
@@ -68,7 +70,8 @@ class DriverVariable:
             self.ref_cellsize_x, self.ref_cellsize_y, self.ref_nodata = self.get_ref_attributes()
 
         self.fx_nodata, self.fx_interp_name, self.fx_interp_radius_x, self.fx_interp_radius_y, \
-            self.fx_regression_radius_influence, self.fx_min_sensor_number, self.fx_n_cpu = self.get_fx_attributes()
+            self.fx_regression_radius_influence, self.fx_regression_solver, self.fx_min_sensor_number, \
+            self.fx_interp_engine, self.fx_n_cpu = self.get_fx_attributes()
         self.fx_obj = self.get_fx_method()
 
     # -------------------------------------------------------------------------------------
@@ -201,15 +204,21 @@ class DriverVariable:
         fx_regression_radius_influence = 0.0
         if 'regression_radius_influence' in list(self.fx_parameters.keys()):
             fx_regression_radius_influence = self.fx_parameters['regression_radius_influence']
+        fx_regression_solver = 'qr_update'
+        if 'regression_solver' in list(self.fx_parameters.keys()):
+            fx_regression_solver = self.fx_parameters['regression_solver']
         fx_min_sensor_number = None
         if 'min_sensor_number' in list(self.fx_parameters.keys()):
             fx_min_sensor_number = self.fx_parameters['min_sensor_number']
+        fx_interp_engine = 'native'
+        if 'interp_engine' in list(self.fx_parameters.keys()):
+            fx_interp_engine = self.fx_parameters['interp_engine']
         fx_n_cpu = 1
         if 'cpu' in list(self.fx_parameters.keys()):
             fx_n_cpu = self.fx_parameters['cpu']
 
         return fx_nodata, fx_interp_name, fx_interp_radius_x, fx_interp_radius_y, fx_regression_radius_influence, \
-               fx_min_sensor_number, fx_n_cpu
+               fx_regression_solver, fx_min_sensor_number, fx_interp_engine, fx_n_cpu
 
     # -------------------------------------------------------------------------------------
 
@@ -239,8 +248,8 @@ class DriverVariable:
     @staticmethod
     def pop_fx_args(fx_signature, fx_data):
 
-        fx_data_tmp = deepcopy(fx_data)
-        for fx_key_tmp in fx_data_tmp.keys():
+        fx_keys_tmp = list(fx_data.keys())
+        for fx_key_tmp in fx_keys_tmp:
             if fx_key_tmp not in list(fx_signature.parameters.keys()):
                 fx_data.pop(fx_key_tmp, None)
 
@@ -271,6 +280,7 @@ class DriverVariable:
                        'fx_nodata': self.fx_nodata, 'fx_interp_name': self.fx_interp_name,
                        'fx_interp_radius_x': self.fx_interp_radius_x, 'fx_interp_radius_y': self.fx_interp_radius_y,
                        'fx_regression_radius_influence': self.fx_regression_radius_influence,
+                       'fx_regression_solver': self.fx_regression_solver,
                        'ref_geo_x': ref_obj[self.tag_ref_geo_x].values,
                        'ref_geo_y': ref_obj[self.tag_ref_geo_y].values,
                        'ref_geo_z': ref_obj[self.tag_ref_land_data].values,
@@ -280,6 +290,9 @@ class DriverVariable:
                        'ref_cell_size': np.mean([self.ref_cellsize_x, self.ref_cellsize_y]),
                        'ref_no_data': self.ref_nodata, 'ref_epsg': '4326',
                        'fx_min_sensor_number': self.fx_min_sensor_number,
+                       'fx_interp_engine': self.fx_interp_engine,
+                       'fx_interp_cache': self.fx_interp_cache,
+                       'fx_kernel_cache': self.fx_kernel_cache,
                        'fx_n_cpu': self.fx_n_cpu
                        }
 
@@ -19,6 +19,8 @@ from lib_hs_geo import read_file_raster
 from lib_hs_io_generic import write_obj, read_obj, convert_values2da
 from lib_hs_generic import make_folder
 
+from lib_hs_analysis_interpolation_point import create_point2grid_cache
+
 from lib_hs_ancillary_snow import compute_predictor, command_line_predictor
 
 # Debug
@@ -38,6 +40,8 @@ class DriverGeo:
                  tag_ancillary_homogeneous_region_grid='grid_homogeneous_region_reference',
                  tag_ancillary_data_geo='geo_reference',
                  tag_ancillary_data_predictor='predictor_reference',
+                 tag_ancillary_data_interp='interp_reference', tag_cache_size='cache_size',
+                 tag_kernel_cache_size='kernel_cache_size',
                  tag_dst_data_aspect='aspect_data',
                  tag_dst_data_slope='slope_data',
                  tag_dst_data_hillshade='hillshade_data',
@@ -59,6 +63,8 @@ class DriverGeo:
         self.tag_ancillary_homogeneous_region_grid = tag_ancillary_homogeneous_region_grid
         self.tag_ancillary_data_geo = tag_ancillary_data_geo
         self.tag_ancillary_data_predictor = tag_ancillary_data_predictor
+        self.tag_ancillary_data_interp = tag_ancillary_data_interp
+        self.tag_cache_size = tag_cache_size
         self.tag_dst_data_aspect = tag_dst_data_aspect
         self.tag_dst_data_slope = tag_dst_data_slope
         self.tag_dst_data_hillshade = tag_dst_data_hillshade
@@ -95,6 +101,18 @@ class DriverGeo:
 
         self.predictor_to_use = self.info_dict[self.tag_predictor_to_use]
 
+        self.file_path_ancillary_interp, self.interp_cache_size, self.kernel_cache_size = None, 20, 20
+        if self.tag_ancillary_data_interp in list(ancillary_dict.keys()):
+            ancillary_interp = ancillary_dict[self.tag_ancillary_data_interp]
+            self.folder_name_ancillary_interp = ancillary_interp[self.tag_folder_name]
+            self.file_name_ancillary_interp = ancillary_interp[self.tag_file_name]
+            self.file_path_ancillary_interp = os.path.join(self.folder_name_ancillary_interp,
+                                                           self.file_name_ancillary_interp)
+            if self.tag_cache_size in list(ancillary_interp.keys()):
+                self.interp_cache_size = ancillary_interp[self.tag_cache_size]
+            if tag_kernel_cache_size in list(ancillary_interp.keys()):
+                self.kernel_cache_size = ancillary_interp[tag_kernel_cache_size]
+
         self.tag_dim_geo_x = 'longitude'
         self.tag_dim_geo_y = 'latitude'
         self.tag_coord_geo_x = 'west_east'
@@ -119,6 +137,87 @@ class DriverGeo:
         return file_dset
     # -------------------------------------------------------------------------------------
 
+    # -------------------------------------------------------------------------------------
+    # Method to get interpolation weights cache
+    def get_interp_cache(self):
+
+        logging.info(' ---> Get interpolation weights cache ... ')
+
+        file_path_ancillary = self.file_path_ancillary_interp
+
+        if file_path_ancillary is not None:
+
+            if self.flag_updating_ancillary:
+                if os.path.exists(file_path_ancillary):
+                    os.remove(file_path_ancillary)
+
+            if os.path.exists(file_path_ancillary):
+                cache_obj = read_obj(file_path_ancillary)
+                interp_cache = create_point2grid_cache(cache_obj, cache_size=self.interp_cache_size)
+                logging.info(' ---> Get interpolation weights cache ... DONE. Loaded using saved ancillary file')
+            else:
+                interp_cache = create_point2grid_cache(cache_size=self.interp_cache_size)
+                logging.info(' ---> Get interpolation weights cache ... DONE')
+        else:
+            interp_cache = create_point2grid_cache(cache_size=self.interp_cache_size)
+            logging.info(' ---> Get interpolation weights cache ... DONE. Ancillary file not defined; '
+                         'cache will be not saved')
+
+        return interp_cache
+
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Method to get snow kernel cache (own LRU, saved in the interpolation ancillary file)
+    def get_kernel_cache(self):
+
+        file_path_ancillary = self.file_path_ancillary_interp
+
+        cache_obj = None
+        if file_path_ancillary is not None and os.path.exists(file_path_ancillary):
+            cache_obj = read_obj(file_path_ancillary)
+        if cache_obj is not None and 'kernel_data' in list(cache_obj.keys()):
+            kernel_cache = create_point2grid_cache({'cache_data': cache_obj['kernel_data']},
+                                                   cache_size=self.kernel_cache_size)
+        else:
+            kernel_cache = create_point2grid_cache(cache_size=self.kernel_cache_size)
+
+        return kernel_cache
+
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Method to dump interpolation weights cache
+    def dump_interp_cache(self, interp_cache, kernel_cache=None):
+
+        logging.info(' ---> Dump interpolation weights cache ... ')
+
+        file_path_ancillary = self.file_path_ancillary_interp
+
+        cache_updated = interp_cache['cache_updated']
+        if kernel_cache is not None:
+            cache_updated = cache_updated or kernel_cache['cache_updated']
+
+        if file_path_ancillary is not None:
+            if cache_updated:
+                folder_name_ancillary, file_name_ancillary = os.path.split(file_path_ancillary)
+                make_folder(folder_name_ancillary)
+
+                cache_obj = {'cache_data': interp_cache['cache_data']}
+                if kernel_cache is not None:
+                    cache_obj['kernel_data'] = kernel_cache['cache_data']
+                    kernel_cache['cache_updated'] = False
+                write_obj(file_path_ancillary, cache_obj)
+                interp_cache['cache_updated'] = False
+
+                logging.info(' ---> Dump interpolation weights cache ... DONE')
+            else:
+                logging.info(' ---> Dump interpolation weights cache ... SKIPPED. Cache not updated')
+        else:
+            logging.info(' ---> Dump interpolation weights cache ... SKIPPED. Ancillary file not defined')
+
+    # -------------------------------------------------------------------------------------
+
     # -----------------------------------------------------------------------------------
     # Method to define geo predictor(s)
     def define_geo_predictor(self, dset_land):
@@ -19,12 +19,15 @@ import xarray as xr
 import pandas as pd
 import matplotlib.pylab as plt
 
+from copy import deepcopy
+
 from lib_hs_conventions import conventions_vars
 
 from cpl_data_variables_hs import DriverVariable
 
-from lib_hs_io_generic import write_obj, read_obj, convert_values2da, \
-    create_dset, write_dset, read_file_csv
+from lib_hs_io_generic import write_obj, read_obj, write_dset_store, read_dset_store, convert_values2da, \
+    create_dset, write_dset, read_file_csv, \
+    write_dset_aggregated, check_dset_aggregated
 from lib_hs_generic import make_folder, fill_tags2string, list_folder, \
     get_root_path
 
@@ -39,10 +42,14 @@ class DriverData:
     def __init__(self, time_step, geo_collections=None,
                  src_dict=None, ancillary_dict=None, dst_dict=None,
                  variable_src_dict=None, variable_dst_dict=None, time_dict=None, template_dict=None, info_dict=None,
-                 flag_updating_ancillary=True, flag_updating_destination=True, flag_cleaning_tmp=True):
+                 flag_updating_ancillary=True, flag_updating_destination=True, flag_cleaning_tmp=True,
+                 interp_cache=None, kernel_cache=None, time_window=None):
 
         self.time_step = time_step
+        self.time_window = time_window
         self.geo_collections = geo_collections
+        self.interp_cache = interp_cache
+        self.kernel_cache = kernel_cache
 
         self.src_dict = src_dict
         self.ancillary_dict = ancillary_dict
@@ -56,6 +63,12 @@ class DriverData:
         self.tag_file_name = 'file_name'
         self.tag_file_fields = 'file_fields'
         self.tag_file_compression = 'file_compression'
+        self.tag_file_compression_level = 'file_compression_level'
+        self.tag_file_compression_mode = 'file_compression_mode'
+        self.tag_file_encoding = 'file_encoding'
+        self.tag_file_aggregation = 'file_aggregation'
+        self.tag_time_frequency = 'time_frequency'
+        self.tag_file_format = 'file_format'
 
         self.domain_name = info_dict['domain']
         self.predictor_to_use = info_dict['predictor_to_use']
@@ -78,6 +91,10 @@ class DriverData:
 
         self.folder_name_anc_dset_raw = self.ancillary_dict[self.tag_folder_name]
         self.file_name_anc_dset_raw = self.ancillary_dict[self.tag_file_name]
+        if self.tag_file_format in list(self.ancillary_dict.keys()):
+            self.file_format_anc = self.ancillary_dict[self.tag_file_format]
+        else:
+            self.file_format_anc = 'dictionary'
         self.file_path_anc_dset_collections = self.collect_file_list(
             self.folder_name_anc_dset_raw, self.file_name_anc_dset_raw)
 
@@ -89,6 +106,30 @@ class DriverData:
             self.folder_name_dst_dset_raw, self.file_name_dst_dset_raw)
 
         self.file_compression_dst = self.dst_dict[self.tag_file_compression]
+        if self.tag_file_compression_level in list(self.dst_dict.keys()):
+            self.file_compression_level_dst = self.dst_dict[self.tag_file_compression_level]
+        else:
+            self.file_compression_level_dst = 9
+        if self.tag_file_compression_mode in list(self.dst_dict.keys()):
+            self.file_compression_mode_dst = self.dst_dict[self.tag_file_compression_mode]
+        else:
+            self.file_compression_mode_dst = 'netcdf_gzip'
+        if self.file_compression_mode_dst not in ['netcdf_gzip', 'gzip']:
+            logging.error(' ===> Compression mode "' + str(self.file_compression_mode_dst) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
+
+        # Aggregated destination file(s) (time steps appended to daily or rolling file(s))
+        if self.tag_file_aggregation in list(self.dst_dict.keys()):
+            self.file_aggregation_dst = self.dst_dict[self.tag_file_aggregation]
+        else:
+            self.file_aggregation_dst = None
+        if self.file_aggregation_dst is not None:
+            self.file_path_dst_dset_collections = self.collect_file_list(
+                self.folder_name_dst_dset_raw, self.file_aggregation_dst[self.tag_file_name],
+                file_time_frequency=self.file_aggregation_dst[self.tag_time_frequency])
+            if self.file_compression_dst:
+                logging.warning(' ===> Aggregated destination file(s) are not compressed by gzip')
+                self.file_compression_dst = False
 
         self.file_zip_dst_dset_raw = self.add_file_extension(self.file_name_dst_dset_raw, file_extension='.gz')
         self.file_zip_dst_dset_collections = self.collect_file_list(
@@ -104,6 +145,18 @@ class DriverData:
         self.tag_coord_geo_y = 'south_north'
 
         self.dst_vars_compression_level = 9
+        if self.tag_file_encoding in list(self.dst_dict.keys()):
+            self.dst_vars_encoding_profile = deepcopy(self.dst_dict[self.tag_file_encoding])
+        else:
+            self.dst_vars_encoding_profile = None
+        # NetCDF variable(s) are not compressed if the destination file is compressed by gzip only
+        if self.file_compression_dst and (self.file_compression_mode_dst == 'gzip'):
+            self.dst_vars_compression_level = 0
+            if self.dst_vars_encoding_profile is not None:
+                if (self.dst_vars_encoding_profile.get('complevel', 0) > 0) or \
+                        self.dst_vars_encoding_profile.get('shuffle', False):
+                    logging.warning(' ===> Encoding "complevel" and "shuffle" are ignored in "gzip" compression mode')
+                self.dst_vars_encoding_profile['complevel'] = 0
         self.dst_vars_writing_engine = 'netcdf4'
 
     # -------------------------------------------------------------------------------------
@@ -123,6 +176,10 @@ class DriverData:
     # Method to collect time(s)
     def collect_file_time(self):
 
+        # Time window defined by the time plan
+        if self.time_window is not None:
+            return pd.DatetimeIndex(self.time_window)
+
         time_period = self.time_dict["time_period"]
         time_frequency = self.time_dict["time_frequency"]
         time_rounding = self.time_dict["time_rounding"]
@@ -136,12 +193,16 @@ class DriverData:
 
     # -------------------------------------------------------------------------------------
     # Method to collect ancillary file
-    def collect_file_list(self, folder_name_raw, file_name_raw, file_variable=None):
+    def collect_file_list(self, folder_name_raw, file_name_raw, file_variable=None, file_time_frequency=None):
 
         domain_name = self.domain_name
         file_name_list = []
         for datetime_step in self.time_range:
 
+            # Time step of the aggregated file(s)
+            if file_time_frequency is not None:
+                datetime_step = datetime_step.floor(file_time_frequency)
+
             template_values_step = {
                 'domain_name': domain_name,
                 'source_var_name': file_variable,
@@ -164,19 +225,31 @@ class DriverData:
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
-    # Method to write dataset in dictionary format
+    # Method to write dataset in dictionary or array store format
     @staticmethod
-    def write_dset_obj(file_name, file_dset):
-        file_dict = file_dset.to_dict()
-        write_obj(file_name, file_dict)
+    def write_dset_obj(file_name, file_dset, file_format='dictionary'):
+        if file_format == 'dictionary':
+            file_dict = file_dset.to_dict()
+            write_obj(file_name, file_dict)
+        elif file_format == 'array':
+            write_dset_store(file_name, file_dset)
+        else:
+            logging.error(' ===> Ancillary file format "' + str(file_format) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
-    # Method to load dataset saved in dictionary format
+    # Method to load dataset saved in dictionary or array store format
     @staticmethod
-    def read_dset_obj(file_name):
-        file_dict = read_obj(file_name)
-        file_dset = xr.Dataset.from_dict(file_dict)
+    def read_dset_obj(file_name, file_format='dictionary'):
+        if file_format == 'dictionary':
+            file_dict = read_obj(file_name)
+            file_dset = xr.Dataset.from_dict(file_dict)
+        elif file_format == 'array':
+            file_dset = read_dset_store(file_name)
+        else:
+            logging.error(' ===> Ancillary file format "' + str(file_format) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
         return file_dset
     # -------------------------------------------------------------------------------------
 
@@ -220,23 +293,25 @@ class DriverData:
             var_file_path_dst = file_path_dst_collections[id]
             var_file_path_zip = file_path_zip_collections[id]
 
-            if flag_upd_dst:
+            if flag_upd_dst and (self.file_aggregation_dst is None):
                 if os.path.exists(var_file_path_dst):
                     os.remove(var_file_path_dst)
                 if os.path.exists(var_file_path_zip):
                     os.remove(var_file_path_zip)
 
-            if self.file_compression_dst:
-                var_file_path_check = var_file_path_zip
+            if self.file_aggregation_dst is not None:
+                var_file_saved = (not flag_upd_dst) and check_dset_aggregated(var_file_path_dst, time_step)
+            elif self.file_compression_dst:
+                var_file_saved = os.path.exists(var_file_path_zip)
             else:
-                var_file_path_check = var_file_path_dst
+                var_file_saved = os.path.exists(var_file_path_dst)
 
-            if not os.path.exists(var_file_path_check):
+            if not var_file_saved:
                 if os.path.exists(var_file_path_anc):
 
                     logging.info(' ------> Create dataset object ... ')
 
-                    var_dset_anc = self.read_dset_obj(var_file_path_anc)
+                    var_dset_anc = self.read_dset_obj(var_file_path_anc, file_format=self.file_format_anc)
 
                     # Iterate over variables
                     var_data_dict = {}
@@ -277,8 +352,17 @@ class DriverData:
 
                     var_folder_name_dst, var_file_name_dst = os.path.split(var_file_path_dst)
                     make_folder(var_folder_name_dst)
-                    write_dset(var_file_path_dst, var_dset, dset_compression_level=self.dst_vars_compression_level,
-                               dset_engine=self.dst_vars_writing_engine)
+                    if self.file_aggregation_dst is not None:
+                        write_dset_aggregated(var_file_path_dst, var_dset,
+                                              dset_compression_level=self.dst_vars_compression_level,
+                                              dset_engine=self.dst_vars_writing_engine,
+                                              dset_encoding_profile=self.dst_vars_encoding_profile,
+                                              file_time_frequency=self.file_aggregation_dst[self.tag_time_frequency],
+                                              time_step_frequency=self.time_dict[self.tag_time_frequency])
+                    else:
+                        write_dset(var_file_path_dst, var_dset, dset_compression_level=self.dst_vars_compression_level,
+                                   dset_engine=self.dst_vars_writing_engine,
+                                   dset_encoding_profile=self.dst_vars_encoding_profile)
 
                     logging.info(' ------> Save dataset object ... DONE')
 
@@ -286,7 +370,7 @@ class DriverData:
 
                     if self.file_compression_dst:
 
-                        zip_filename(var_file_path_dst, var_file_path_zip)
+                        zip_filename(var_file_path_dst, var_file_path_zip, zip_level=self.file_compression_level_dst)
                         if os.path.exists(var_file_path_dst):
                             os.remove(var_file_path_dst)
 
@@ -371,7 +455,9 @@ class DriverData:
                                                              var_attributes=var_attributes,
                                                              fx_name=var_method_compute['name'],
                                                              fx_parameters=var_method_compute['params'],
-                                                             fx_outcome=var_method_compute['outcome'])
+                                                             fx_outcome=var_method_compute['outcome'],
+                                                             fx_interp_cache=self.interp_cache,
+                                                             fx_kernel_cache=self.kernel_cache)
 
                             var_collections = driver_variable.compute_data()
 
@@ -403,7 +489,7 @@ class DriverData:
                     make_folder(var_folder_name_anc)
 
                     var_dset.attrs = self.geo_collections.attrs
-                    self.write_dset_obj(var_file_path_anc, var_dset)
+                    self.write_dset_obj(var_file_path_anc, var_dset, file_format=self.file_format_anc)
 
                     logging.info(' -----> Time ' + str(time_step) + ' ... DONE')
 
@@ -441,7 +527,8 @@ class DriverData:
             folder_name_anc_list = list_folder(folder_name_anc_main)
             for folder_name_anc_step in folder_name_anc_list:
                 if os.path.exists(folder_name_anc_step):
-                    os.rmdir(folder_name_anc_step)
+                    if not any(os.scandir(folder_name_anc_step)):
+                        os.rmdir(folder_name_anc_step)
 
     # -------------------------------------------------------------------------------------
 
@@ -15,7 +15,7 @@ import numpy as np
 import scipy.stats
 
 from scipy import linalg
-from scipy.linalg import qr
+from scipy.linalg import qr, qr_insert, qr_delete
 #################################################################################
 
 
@@ -36,7 +36,7 @@ def stepnext(inmodel, pval, b, penter, premove, keep):
     """
 
     swap = -1
-    p = np.NaN
+    p = np.nan
 
     # Look for terms out that should be in.
     termsout = (~inmodel & ~keep).nonzero()[0]
@@ -66,7 +66,7 @@ def stepnext(inmodel, pval, b, penter, premove, keep):
                     # For convenience we'll pick the one with the smallest
                     # coeff.
                     swap = badterms[abs(b[badterms]).argmin()]
-                p = np.NaN
+                p = np.nan
             else:
                 kmax = pval[termsin].argmax()
                 pmax = pval[termsin][kmax]
@@ -168,10 +168,10 @@ def stepcalc(allx, y, inmodel):
             flat_ptemp = ptemp.ravel()
             for i in range(flat_tval.size):
                 if np.isnan(flat_tval[i]):
-                    flat_ptemp[i] = np.NaN
+                    flat_ptemp[i] = np.nan
         else:
-            tval = np.NaN
-            ptemp = np.NaN
+            tval = np.nan
+            ptemp = np.nan
         PVAL[~inmodel] = ptemp
         tstat[~inmodel] = tval
 
@@ -205,10 +205,135 @@ def stepcalc(allx, y, inmodel):
 # --------------------------------------------------------------------------------
 
 
+# --------------------------------------------------------------------------------
+# Method to compute stepwisefit (stepcalc) updating the QR factorization of the previous step
+def stepcalc_update(allx, y, inmodel, qrobj):
+    """
+    Perform fit and other calculations as part of stepwise regression, updating
+    the QR factorization of the previous step when a single predictor enters or
+    leaves the model. Rank deficient models fall back to stepcalc.
+    """
+
+    N = y.size          # Number of independent tests (rows in allx).
+    P = inmodel.size    # Number of independent variables in each test (cols in allx).
+    X = np.concatenate((np.ones((N, 1)), allx[:, inmodel]), 1)
+    nin = inmodel.sum() + 1
+    tol = max(N, P + 1) * np.finfo(allx.dtype).eps
+    x = allx[:, ~inmodel]
+    sumxsq = (x ** 2).sum(axis=0)
+
+    # Update QR factorization (columns are kept in the order of X).
+    Q, R = None, None
+    if qrobj.inmodel is not None:
+        swap = (qrobj.inmodel != inmodel).nonzero()[0]
+        if swap.size == 0:
+            Q, R = qrobj.Q, qrobj.R
+        elif swap.size == 1:
+            k = inmodel[:swap[0]].sum() + 1
+            try:
+                if inmodel[swap[0]]:
+                    Q, R = qr_insert(qrobj.Q, qrobj.R, X[:, k], k, which="col", rcond=tol)
+                else:
+                    Q, R = qr_delete(qrobj.Q, qrobj.R, k, 1, which="col")
+            except (linalg.LinAlgError, ValueError):
+                Q, R = None, None
+    if Q is None:
+        Q, R = qr(X, mode="economic")
+
+    # Rank deficient model (use the pivoted QR of stepcalc).
+    Rdiag = abs(np.diag(R))
+    if (Rdiag <= tol * Rdiag.max()).any():
+        qrobj.inmodel, qrobj.Q, qrobj.R = None, None, None
+        return stepcalc(allx, y, inmodel)
+    qrobj.inmodel, qrobj.Q, qrobj.R = inmodel.copy(), Q, R
+
+    # Compute the LS coefficients.
+    Qb = np.dot(Q.conj().T, y)
+    Qb[abs(Qb) < tol * max(abs(Qb))] = 0
+    b = linalg.solve_triangular(R, Qb)
+
+    r = y - np.dot(X, b)
+    dfe = N - nin
+    df0 = nin - 1
+    SStotal = linalg.norm(y - y.mean())
+    SStotal = np.dot(SStotal, SStotal)
+    SSresid = linalg.norm(r)
+    SSresid = np.dot(SSresid, SSresid)
+    perfectyfit = (dfe == 0) or (SSresid < tol * SStotal)
+    if perfectyfit:
+        SSresid = 0
+        r[:] = 0
+    rmse = np.sqrt(np.divide(SSresid, dfe))
+    # Standard errors of the "in" predictors (diag of (R^T R)^-1 solving R^T z = e_k for the k-th predictor).
+    se = np.zeros((nin, 1))
+    if nin > 1:
+        Z = linalg.solve_triangular(R, np.eye(nin, nin - 1, -1), trans="T", lower=False)
+        se[1:] = rmse * np.expand_dims(np.sqrt((Z ** 2).sum(axis=0)), 1)
+
+    # Compute separate added-variable coeffs and their standard errors.
+    xr = x - np.dot(Q, np.dot(Q.conj().T, x))
+    yr = r
+    xx = (xr ** 2).sum(axis=0)
+
+    perfectxfit = (xx <= tol * sumxsq)
+    if perfectxfit.any():
+        xr[:, perfectxfit] = 0
+        xx[perfectxfit] = 1
+    b2 = np.divide(np.dot(yr.conj().T, xr), xx)
+    r2 = yr - xr * b2
+    df2 = max(0, dfe - 1)
+    s2 = np.divide(np.sqrt(np.divide((r2 ** 2).sum(axis=0), df2)), np.sqrt(xx))
+
+    # Combine in/out coefficients and standard errors.
+    B = np.zeros((P, 1))
+    B[inmodel] = b[1:]
+    B[~inmodel] = b2.reshape((-1, 1))
+    SE = np.zeros((P, 1))
+    SE[inmodel] = se[1:]
+    SE[~inmodel] = s2.reshape((-1, 1))
+
+    # Get P-to-enter or P-to-remove for all terms.
+    tstat = np.divide(B, SE)
+    tdf = np.where(inmodel, dfe, dfe - 1).reshape((P, 1))
+    PVAL = 2 * scipy.stats.t.cdf(-abs(tstat), tdf)
+    if dfe <= 1:
+        tstat[~inmodel] = np.nan
+        PVAL[~inmodel] = np.nan
+
+    # Compute some summary statistics.
+    if df0 != 0:
+        MSexplained = np.divide(SStotal - SSresid, df0)
+    else:
+        MSexplained = np.nan
+    fstat = np.divide(MSexplained, np.dot(rmse, rmse))
+    pval = scipy.stats.f.cdf(1. / fstat, dfe, df0)
+
+    # Return summary statistics as a single structure.
+    stats = LazyDict()
+    stats.source = "stepwisefit"
+    stats.dfe = dfe
+    stats.df0 = df0
+    stats.SStotal = SStotal
+    stats.SSresid = SSresid
+    stats.fstat = fstat
+    stats.pval = pval
+    stats.rmse = rmse
+    stats.xr = xr
+    stats.yr = yr
+    stats.B = B
+    stats.SE = SE
+    stats.TSTAT = tstat
+    stats.PVAL = PVAL
+    stats.intercept = b[0]
+
+    return B, SE, PVAL, stats
+# --------------------------------------------------------------------------------
+
+
 # --------------------------------------------------------------------------------
 # Method to compute stepwisefit (main)
 def stepwisefit(allx, y, inmodel=None, penter=0.05, premove=0.10,
-                display=False, maxiter=np.Inf, keep=None, scale=False):
+                display=False, maxiter=np.inf, keep=None, scale=False, solver='qr'):
 
     """
     Original Source for Documentation (and code reference):
@@ -246,6 +371,9 @@ def stepwisefit(allx, y, inmodel=None, penter=0.05, premove=0.10,
                    predictors to keep in their initial state (default none)
         'scale'    Either 'on' [True] to scale each column of X by its standard deviation
                    before fitting, or 'off' [False] (the default) to omit scaling.
+        'solver'   Either 'qr' (the default) to compute the pivoted QR factorization at
+                   each step or 'qr_update' to update the factorization of the previous
+                   step when a single predictor enters or leaves the model.
 
       Example:
          load hald
@@ -267,7 +395,7 @@ def stepwisefit(allx, y, inmodel=None, penter=0.05, premove=0.10,
 
     # Begin Housekeeping
     if maxiter < 0:
-        maxiter = np.Inf
+        maxiter = np.inf
 
     allx = np.asarray(allx)
     assert len(allx.shape) == 2
@@ -302,6 +430,12 @@ def stepwisefit(allx, y, inmodel=None, penter=0.05, premove=0.10,
 
     assert 0 < penter <= premove < 1
 
+    if solver == 'qr_update':
+        qrobj = LazyDict(inmodel=None, Q=None, R=None)
+    elif solver != 'qr':
+        logging.error(' ===> Stepwisefit solver "' + solver + '" is not supported')
+        raise NotImplementedError('Stepwisefit solver not implemented yet')
+
     rmse = []
     df0 = []
     inmat = []
@@ -322,7 +456,10 @@ def stepwisefit(allx, y, inmodel=None, penter=0.05, premove=0.10,
     jstep = 0
     while True:
         # Perform current fit
-        b, se, pval, stats = stepcalc(allx, y, inmodel)
+        if solver == 'qr_update':
+            b, se, pval, stats = stepcalc_update(allx, y, inmodel, qrobj)
+        else:
+            b, se, pval, stats = stepcalc(allx, y, inmodel)
         if not scale:
             # Undo scaling if this was not requested.
             b = b / sx.conj().T
@@ -371,3 +508,4 @@ def stepwisefit(allx, y, inmodel=None, penter=0.05, premove=0.10,
     return b, se, pval, inmodel, stats, nextstep, history
 
 # --------------------------------------------------------------------------------
+
@@ -13,10 +13,12 @@ import tempfile
 import os
 import json
 import pickle
+import fcntl
 
 import pandas as pd
 import numpy as np
 import xarray as xr
+import netCDF4
 import matplotlib.pylab as plt
 
 from copy import deepcopy
@@ -35,6 +37,10 @@ attributes_defined_lut = {
         'Missing_value': ['Missing_value', 'missing_value']
     }
 }
+# Time format of the aggregated file index
+index_time_format = '%Y-%m-%d %H:%M'
+# Array store file signature
+store_magic = b'HYDESTORE1'
 # -------------------------------------------------------------------------------------
 
 
@@ -407,7 +413,13 @@ def clip_data(map, valid_range=None, missing_value=None):
 # Method to write dataset
 def write_dset(file_name,
                dset_data, dset_mode='w', dset_engine='h5netcdf', dset_compression_level=0, dset_format='NETCDF4',
-               dim_key_time='time', fill_value=-9999.0):
+               dim_key_time='time', fill_value=-9999.0, dset_encoding_profile=None, dset_unlimited_dims=None):
+
+    # Encoding profile (keys: complevel, shuffle, chunk_sizes, dtype, least_significant_digit)
+    if dset_encoding_profile is None:
+        dset_encoding_profile = {}
+    if 'complevel' in list(dset_encoding_profile.keys()):
+        dset_compression_level = dset_encoding_profile['complevel']
 
     dset_encoding = {}
     for var_name in dset_data.data_vars:
@@ -426,15 +438,193 @@ def write_dset(file_name,
                 var_attrs_encoding['zlib'] = True
             if 'complevel' not in list(var_attrs_encoding.keys()):
                 var_attrs_encoding['complevel'] = dset_compression_level
+            if 'shuffle' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['shuffle'] = dset_encoding_profile['shuffle']
+
+        var_dims = dset_data[var_name].dims
+        if ('chunk_sizes' in list(dset_encoding_profile.keys())) and (var_dims.__len__() > 0):
+            chunk_sizes = dset_encoding_profile['chunk_sizes']
+            var_attrs_encoding['chunksizes'] = tuple(
+                [min(chunk_sizes.get(var_dim, dset_data.sizes[var_dim]), dset_data.sizes[var_dim])
+                 for var_dim in var_dims])
+
+        if np.issubdtype(dset_data[var_name].dtype, np.floating):
+            if 'dtype' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['dtype'] = dset_encoding_profile['dtype']
+            if 'least_significant_digit' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['least_significant_digit'] = dset_encoding_profile['least_significant_digit']
 
         dset_encoding[var_name] = var_attrs_encoding
 
     if dim_key_time in list(dset_data.coords):
         dset_encoding[dim_key_time] = {'calendar': 'gregorian'}
+        if 'units' in list(dset_data[dim_key_time].encoding.keys()):
+            dset_encoding[dim_key_time]['units'] = dset_data[dim_key_time].encoding['units']
 
     dset_data.to_netcdf(path=file_name, format=dset_format, mode=dset_mode, engine=dset_engine,
-                        encoding=dset_encoding)
+                        encoding=dset_encoding, unlimited_dims=dset_unlimited_dims)
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to write dataset in an aggregated file (time step saved in the slot of its offset from the file start time)
+def write_dset_aggregated(file_name, dset_data, dset_engine='netcdf4', dset_compression_level=0,
+                          dset_format='NETCDF4', dim_key_time='time', fill_value=-9999.0,
+                          dset_encoding_profile=None, dset_vars_static=None,
+                          file_time_frequency=None, time_step_frequency='H'):
+
+    if dset_vars_static is None:
+        dset_vars_static = ['terrain']
+
+    # Time-dependent variable(s) are organized along the time dimension
+    dset_step = dset_data.copy()
+    for var_name in list(dset_step.data_vars):
+        if (var_name not in dset_vars_static) and (dim_key_time not in dset_step[var_name].dims):
+            var_encoding = dset_step[var_name].encoding
+            dset_step[var_name] = dset_step[var_name].expand_dims(dim_key_time)
+            dset_step[var_name].encoding = var_encoding
+    time_step = pd.Timestamp(dset_step[dim_key_time].values[0])
+    time_key = time_step.strftime(index_time_format)
+    # Time units are fixed to append time step(s) with the same reference
+    dset_step[dim_key_time].encoding['units'] = 'minutes since 1970-01-01 00:00:00'
+
+    # Lock the aggregated file (more processes can write the same file)
+    with open(file_name + '.lock', 'w') as file_lock:
+        fcntl.flock(file_lock, fcntl.LOCK_EX)
+
+        file_index = read_dset_index(file_name)
+        flag_file_new = (not os.path.exists(file_name)) or (not os.path.exists(file_name + '.index'))
+        if flag_file_new:
+            file_index = {}
+
+        # Time slot defined by the offset from the file start time (time axis is ordered; missing steps are filled)
+        time_delta = pd.Timedelta(time_step_frequency if time_step_frequency[0].isdigit()
+                                  else '1' + time_step_frequency)
+        if file_time_frequency is not None:
+            time_start = time_step.floor(file_time_frequency)
+            time_position = int((time_step - time_start) / time_delta)
+        else:
+            # Time slot defined by the arrival order (file frequency not defined)
+            time_position = file_index.get(time_key, file_index.__len__())
+            time_start = time_step - time_position * time_delta
+
+        if flag_file_new:
+
+            # File is created with the first slot (no data if the time step is not the first one)
+            dset_init = dset_step
+            if time_position > 0:
+                dset_init = dset_step.copy(deep=True)
+                for var_name in list(dset_init.data_vars):
+                    if dim_key_time in dset_init[var_name].dims:
+                        dset_init[var_name][...] = np.nan if np.issubdtype(
+                            dset_init[var_name].dtype, np.floating) else fill_value
+                dset_init[dim_key_time] = pd.DatetimeIndex([time_start])
+                dset_init[dim_key_time].encoding = dset_step[dim_key_time].encoding
+
+            if os.path.exists(file_name):
+                os.remove(file_name)
+            write_dset(file_name, dset_init, dset_mode='w', dset_engine=dset_engine,
+                       dset_compression_level=dset_compression_level, dset_format=dset_format,
+                       dim_key_time=dim_key_time, fill_value=fill_value,
+                       dset_encoding_profile=dset_encoding_profile, dset_unlimited_dims=[dim_key_time])
+
+        if (not flag_file_new) or (time_position > 0):
+
+            # Time-dependent variable(s) not available in the file are created (filled by no data)
+            with netCDF4.Dataset(file_name, 'r') as file_handle:
+                time_n = file_handle.dimensions[dim_key_time].__len__()
+                vars_file = list(file_handle.variables.keys())
+                vars_coords = [getattr(var_handle, 'coordinates') for var_handle in file_handle.variables.values()
+                               if (dim_key_time in var_handle.dimensions) and hasattr(var_handle, 'coordinates')]
+            dset_missing = xr.Dataset()
+            for var_name in list(dset_step.data_vars):
+                if (dim_key_time in dset_step[var_name].dims) and (var_name not in vars_file):
+                    var_step = dset_step[var_name]
+                    var_fill = np.nan if np.issubdtype(var_step.dtype, np.floating) else fill_value
+                    var_missing = xr.DataArray(
+                        np.full((time_n,) + var_step.shape[1:], var_fill, dtype=var_step.dtype),
+                        dims=var_step.dims, attrs=var_step.attrs)
+                    var_missing.encoding = deepcopy(var_step.encoding)
+                    if vars_coords:
+                        var_missing.attrs['coordinates'] = vars_coords[0]
+                    dset_missing[var_name] = var_missing
+            if dset_missing.data_vars:
+                write_dset(file_name, dset_missing, dset_mode='a', dset_engine=dset_engine,
+                           dset_compression_level=dset_compression_level, dset_format=dset_format,
+                           dim_key_time=dim_key_time, fill_value=fill_value,
+                           dset_encoding_profile=dset_encoding_profile)
+
+            with netCDF4.Dataset(file_name, 'a') as file_handle:
+                var_time = file_handle.variables[dim_key_time]
+                var_calendar = getattr(var_time, 'calendar', 'standard')
+                # Time axis is filled up to the time slot (data of the missing time steps are no data)
+                for time_id in range(var_time.shape[0], time_position):
+                    var_time[time_id] = netCDF4.date2num(
+                        (time_start + time_id * time_delta).to_pydatetime(), units=var_time.units,
+                        calendar=var_calendar)
+                var_time[time_position] = netCDF4.date2num(
+                    time_step.to_pydatetime(), units=var_time.units, calendar=var_calendar)
+                for var_name in list(dset_step.data_vars):
+                    if dim_key_time in dset_step[var_name].dims:
+                        var_values = dset_step[var_name].values[0]
+                        var_handle = file_handle.variables[var_name]
+                        if np.issubdtype(var_values.dtype, np.floating):
+                            var_values = np.where(np.isnan(var_values),
+                                                  getattr(var_handle, '_FillValue', fill_value), var_values)
+                        var_handle[time_position, ...] = var_values
+
+        file_index[time_key] = time_position
+        write_dset_index(file_name, file_index)
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to read a time step from an aggregated file (using the time index)
+def read_dset_aggregated(file_name, file_time, dim_key_time='time'):
+
+    file_index = read_dset_index(file_name)
+    time_key = pd.Timestamp(file_time).strftime(index_time_format)
+    if time_key in list(file_index.keys()):
+        with xr.open_dataset(file_name) as file_dset:
+            dset_data = file_dset.isel({dim_key_time: [file_index[time_key]]}).load()
+    else:
+        logging.warning(' ===> Time ' + str(file_time) + ' is not available in file: ' + file_name)
+        dset_data = None
+    return dset_data
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to check a time step in an aggregated file
+def check_dset_aggregated(file_name, file_time):
+    file_index = read_dset_index(file_name)
+    return pd.Timestamp(file_time).strftime(index_time_format) in list(file_index.keys())
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to read the time index of an aggregated file
+def read_dset_index(file_name):
+    file_name_index = file_name + '.index'
+    if os.path.exists(file_name_index) and os.path.exists(file_name):
+        with open(file_name_index) as file_handle:
+            file_index = json.load(file_handle)
+    else:
+        file_index = {}
+    return file_index
+# -------------------------------------------------------------------------------------
 
+
+# -------------------------------------------------------------------------------------
+# Method to write the time index of an aggregated file
+def write_dset_index(file_name, file_index):
+    file_name_index = file_name + '.index'
+    with open(file_name_index + '.tmp', 'w') as file_handle:
+        json.dump(file_index, file_handle, indent=1)
+    os.replace(file_name_index + '.tmp', file_name_index)
 # -------------------------------------------------------------------------------------
 
 
@@ -457,3 +647,89 @@ def write_obj(filename, data):
     with open(filename, 'wb') as handle:
         pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
 # -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to write dataset in array store format (raw arrays in one memory-mappable file)
+def write_dset_store(filename, dset, store_align=64):
+
+    # Organize header (dims, attrs and array layout) and raw array blocks
+    store_header = {'attrs': dict(dset.attrs), 'coords': {}, 'data_vars': {}}
+    store_blocks, store_offset = [], 0
+    for store_group, store_collections in [('coords', dset.coords), ('data_vars', dset.data_vars)]:
+        for var_name, var_da in store_collections.items():
+            var_values = np.asarray(var_da.values)
+            var_info = {'dims': var_da.dims, 'attrs': dict(var_da.attrs)}
+            if var_values.dtype.hasobject:
+                var_info['values'] = var_values
+            else:
+                var_info['dtype'] = var_values.dtype.str
+                var_info['shape'] = var_values.shape
+                var_info['offset'] = store_offset
+                store_blocks.append(var_values)
+                store_offset += -(-var_values.nbytes // store_align) * store_align
+            store_header[store_group][var_name] = var_info
+
+    store_header_bytes = pickle.dumps(store_header, protocol=pickle.HIGHEST_PROTOCOL)
+    store_start = get_dset_store_start(store_header_bytes.__len__(), store_align)
+
+    if os.path.exists(filename):
+        os.remove(filename)
+    with open(filename, 'wb') as handle:
+        handle.write(store_magic)
+        handle.write(np.uint64(store_header_bytes.__len__()).tobytes())
+        handle.write(store_header_bytes)
+        handle.write(b'\0' * (store_start - handle.tell()))
+        for var_values in store_blocks:
+            handle.write(var_values.tobytes())
+            handle.write(b'\0' * (-var_values.nbytes % store_align))
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to read dataset in array store format (arrays are memory-mapped in copy-on-write mode)
+def read_dset_store(filename, store_align=64, store_mmap=True):
+
+    if not os.path.exists(filename):
+        return None
+
+    with open(filename, 'rb') as handle:
+        file_magic = handle.read(store_magic.__len__())
+        if file_magic != store_magic:
+            # Dataset saved in dictionary format (previous workspace)
+            logging.warning(' ===> File ' + filename + ' is not in array store format; read as dictionary object')
+            return xr.Dataset.from_dict(read_obj(filename))
+        store_header_n = int(np.frombuffer(handle.read(8), dtype=np.uint64)[0])
+        store_header = pickle.loads(handle.read(store_header_n))
+    store_start = get_dset_store_start(store_header_n, store_align)
+
+    store_collections = {}
+    for store_group in ['coords', 'data_vars']:
+        store_collections[store_group] = {}
+        for var_name, var_info in store_header[store_group].items():
+            if 'values' in var_info:
+                var_values = var_info['values']
+            else:
+                var_dtype, var_shape = np.dtype(var_info['dtype']), tuple(var_info['shape'])
+                var_offset = store_start + var_info['offset']
+                if store_mmap and int(np.prod(var_shape)) > 0 and var_shape.__len__() > 0:
+                    var_values = np.memmap(filename, dtype=var_dtype, mode='c', offset=var_offset, shape=var_shape)
+                else:
+                    var_values = np.fromfile(filename, dtype=var_dtype, count=int(np.prod(var_shape)),
+                                             offset=var_offset).reshape(var_shape)
+            store_collections[store_group][var_name] = (var_info['dims'], var_values, var_info['attrs'])
+
+    dset = xr.Dataset(data_vars=store_collections['data_vars'], coords=store_collections['coords'],
+                      attrs=store_header['attrs'])
+
+    return dset
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to get the start of array block(s) in array store format
+def get_dset_store_start(store_header_n, store_align=64):
+    store_start = store_magic.__len__() + 8 + store_header_n
+    store_start = -(-store_start // store_align) * store_align
+    return store_start
+# -------------------------------------------------------------------------------------
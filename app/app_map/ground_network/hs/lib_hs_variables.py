@@ -11,7 +11,7 @@ Version:       '1.0.1'
 # Library
 import logging
 import numpy as np
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 
 from lib_hs_geo import find_geo_index, deg_2_km
 
@@ -34,7 +34,8 @@ def compute_snow_height(var_data, var_geo_x, var_geo_y, var_geo_z,
                         var_units='cm', var_missing_value=-9999.0, var_fill_value=-9999.0,
                         fx_nodata=-9999.0, fx_interp_name='idw', fx_min_sensor_number=10,
                         fx_interp_radius_x=None, fx_interp_radius_y=None, fx_regression_radius_influence=None,
-                        fx_n_cpu=1):
+                        fx_regression_solver='qr_update',
+                        fx_interp_engine='native', fx_interp_cache=None, fx_kernel_cache=None, fx_n_cpu=1):
 
     if var_units is None:
         logging.warning(' ===> Snow height variable unit is undefined; set to [cm]')
@@ -114,108 +115,78 @@ def compute_snow_height(var_data, var_geo_x, var_geo_y, var_geo_z,
     grid_kernel_all_regions = np.zeros(shape=[grid_geo_x.shape[0], grid_geo_y.shape[1]])
     grid_kernel_all_regions[:, :] = np.nan
 
-    for i_homog_reg, homog_region_this_round in enumerate(homogeneous_regions_IDs):
-
-        # take data and predictors for this region
-        ref_point_predictors_container_this_region = \
-            ref_point_predictors_container[ref_point_homog_ID == homog_region_this_round, :]
-        var_data_select_this_region = var_data_select[ref_point_homog_ID == homog_region_this_round]
-        var_data_n_this_region_n = var_data_select_this_region.__len__()
-        index_geo_x_this_region = index_geo_x[ref_point_homog_ID == homog_region_this_round]
-        index_geo_y_this_region = index_geo_y[ref_point_homog_ID == homog_region_this_round]
-        var_point_x_select_this_region = var_point_x_select[ref_point_homog_ID == homog_region_this_round]
-        var_point_y_select_this_region = var_point_y_select[ref_point_homog_ID == homog_region_this_round]
-
-        logging.info('[ Homogeneous region: ' + str(homog_region_this_round) + ']')
-        logging.info('[ Available data for this homogeneous region: ' + str(var_data_n_this_region_n) + ']')
-
-        #Determine whether to compute snow depth map or not
-        if (fx_min_sensor_number is None):
-            comput = True
-        elif (var_data_n_this_region_n >= fx_min_sensor_number):
-            comput = True
-        else:
-            comput = False
-
-        if comput:
-            logging.info('[ ===> Snow-depth map PRODUCED for this region! ]')
-
-            # stepwise fit for this region
-            [swf_b, swf_se, swf_pval, swf_inmodel, swf_stats, swf_nextstep, swf_history] = stepwisefit(
-                ref_point_predictors_container_this_region, var_data_select_this_region, [], 0.1)
-
-            # we force elevation if not included already!
-            if not(swf_inmodel[0]):
-                swf_inmodel[0]=True
-                logging.warning(' ===> Elevation was not identified as predictor by stepwisefit ===> FORCED! ')
-
-            # restrict predictor space to allowed predictors
-            swf_inmodel = swf_inmodel.tolist()
-            swf_inmodel_false = [idx for idx, vx in enumerate(swf_inmodel) if not vx]
-            ref_point_predictors_container_this_region = \
-                    np.delete(ref_point_predictors_container_this_region, swf_inmodel_false, axis=1)
-            ref_grid_predictors_container_this_region = \
-                    np.delete(ref_grid_predictors_container, swf_inmodel_false, axis=2)
-
-            # Multivariate linear regression
-            var_a = np.concatenate((ref_point_predictors_container_this_region,
-                                    np.ones([ref_point_predictors_container_this_region.__len__(), 1])), axis=1)
-            var_coeff = np.linalg.lstsq(var_a, var_data_select_this_region, rcond=None)[0]
-
-            # Basemap
-            grid_basemap_this_region = np.ones(shape=[grid_geo_x.shape[0], grid_geo_y.shape[1]])
-            grid_basemap_this_region[:, :] = var_coeff[-1]
-            var_coeff_reduced = var_coeff[:-1]
-            for id, var_coeff_step in enumerate(var_coeff_reduced):
-                grid_basemap_this_region = grid_basemap_this_region + \
-                                           ref_grid_predictors_container[:, :, id] * var_coeff_step
-
-            # Filter data to avoid nan(s) and negative value(s), as well as to restrict to this homogeneous region
-            grid_basemap_this_region[grid_basemap_this_region < 0] = 0
-            grid_basemap_this_region[ref_geo_homogeneous_region != homog_region_this_round] = np.nan
-
-            # Compute residuals
-            var_point_map = grid_basemap_this_region[index_geo_y_this_region, index_geo_x_this_region]
-            var_point_res = var_point_map - var_data_select_this_region
-            var_point_res_select = np.delete(var_point_res, np.isnan(var_point_res), axis=0)
-
-            # Distribute residuals
-            grid_data_res_this_region = interp_point2grid(var_point_res_select, var_point_x_select_this_region,
-                                                          var_point_y_select_this_region,
-                                              grid_geo_x, grid_geo_y,
-                                              epsg_code=ref_epsg,
-                                              interp_no_data=fx_nodata, interp_method=fx_interp_name,
-                                              interp_radius_x=fx_interp_radius_x,
-                                              interp_radius_y=fx_interp_radius_y,
-                                              n_cpu=fx_n_cpu)
-            var_point_res_after = grid_data_res_this_region[index_geo_y_this_region, index_geo_x_this_region]
-            grid_data_res_this_region[ref_geo_homogeneous_region != homog_region_this_round] = np.nan
-            grid_data_res_this_region[grid_data_res_this_region == fx_nodata] = np.nan
-            #note: we set grid_data_res_this_region to nan also where it shows missing value, because this is not the final
-            #map. We will add it to basemap.
-
-            #final map
-            grid_data_this_region = grid_basemap_this_region - grid_data_res_this_region
-            var_data_select_this_region_after = grid_data_this_region[index_geo_y_this_region, index_geo_x_this_region]
-            grid_data_this_region[grid_data_this_region < 0] = 0
-            grid_map_all_regions[ref_geo_homogeneous_region == homog_region_this_round] = deepcopy(\
-                grid_data_this_region[ref_geo_homogeneous_region == homog_region_this_round])
-
-            # Kernel
-            grid_kernel_this_region = compute_kernel(ref_geo_z, ref_geo_x, ref_geo_y,
-                                         ref_cell_size, ref_cell_size,
-                                         index_geo_x_this_region, index_geo_y_this_region, fx_regression_radius_influence)
-            grid_kernel_this_region[grid_kernel_this_region < 0] = 0
-            grid_kernel_this_region[grid_kernel_this_region > 1] = 1
-            grid_kernel_this_region[np.isnan(grid_kernel_this_region)] = var_missing_value
-            grid_kernel_all_regions[ref_geo_homogeneous_region == homog_region_this_round] = \
-                deepcopy(grid_kernel_this_region[ref_geo_homogeneous_region == homog_region_this_round])
-
-        else:
-            logging.warning(' ===> Snow-depth map NOT PRODUCED for this region! ')
-            grid_map_all_regions[ref_geo_homogeneous_region == homog_region_this_round] = var_missing_value
-            grid_kernel_all_regions[ref_geo_homogeneous_region == homog_region_this_round] = var_missing_value
+    # Iterate over homogeneous regions (regions are computed in parallel threads if more cpu(s) are set; only one
+    # level is parallel, so the interpolation of each region uses a single cpu if the regions are parallel)
+    region_executor, region_n_cpu = None, fx_n_cpu
+    if (fx_n_cpu is not None) and (fx_n_cpu > 1) and (homogeneous_regions_IDs.__len__() > 1):
+        region_executor, region_n_cpu = ThreadPoolExecutor(max_workers=fx_n_cpu), 1
+
+    # Region(s) executor is shut down also if a region fails (pending region(s) are cancelled)
+    try:
+        region_collections = []
+        for i_homog_reg, homog_region_this_round in enumerate(homogeneous_regions_IDs):
 
+            # take data and predictors for this region
+            ref_point_predictors_container_this_region = \
+                ref_point_predictors_container[ref_point_homog_ID == homog_region_this_round, :]
+            var_data_select_this_region = var_data_select[ref_point_homog_ID == homog_region_this_round]
+            var_data_n_this_region_n = var_data_select_this_region.__len__()
+            index_geo_x_this_region = index_geo_x[ref_point_homog_ID == homog_region_this_round]
+            index_geo_y_this_region = index_geo_y[ref_point_homog_ID == homog_region_this_round]
+            var_point_x_select_this_region = var_point_x_select[ref_point_homog_ID == homog_region_this_round]
+            var_point_y_select_this_region = var_point_y_select[ref_point_homog_ID == homog_region_this_round]
+
+            # take bounding box (window) and mask for this region
+            region_mask = ref_geo_homogeneous_region == homog_region_this_round
+            region_rows = np.flatnonzero(region_mask.any(axis=1))
+            region_cols = np.flatnonzero(region_mask.any(axis=0))
+            region_window = (slice(region_rows[0], region_rows[-1] + 1), slice(region_cols[0], region_cols[-1] + 1))
+            region_mask = region_mask[region_window]
+
+            logging.info('[ Homogeneous region: ' + str(homog_region_this_round) + ']')
+            logging.info('[ Available data for this homogeneous region: ' + str(var_data_n_this_region_n) + ']')
+
+            #Determine whether to compute snow depth map or not
+            if (fx_min_sensor_number is None):
+                comput = True
+            elif (var_data_n_this_region_n >= fx_min_sensor_number):
+                comput = True
+            else:
+                comput = False
+
+            if comput:
+                logging.info('[ ===> Snow-depth map PRODUCED for this region! ]')
+
+                region_args = (region_window, region_mask,
+                               ref_point_predictors_container_this_region, ref_grid_predictors_container,
+                               var_data_select_this_region, index_geo_x_this_region, index_geo_y_this_region,
+                               var_point_x_select_this_region, var_point_y_select_this_region,
+                               grid_geo_x, grid_geo_y, ref_geo_z, ref_geo_x, ref_geo_y, ref_cell_size, ref_epsg,
+                               var_missing_value, fx_nodata, fx_interp_name, fx_interp_radius_x, fx_interp_radius_y,
+                               fx_regression_radius_influence, fx_regression_solver, fx_interp_engine, fx_interp_cache,
+                               fx_kernel_cache, region_n_cpu)
+                if region_executor is not None:
+                    region_collections.append((region_window, region_mask,
+                                               region_executor.submit(compute_snow_height_region, *region_args)))
+                else:
+                    region_collections.append((region_window, region_mask,
+                                               compute_snow_height_region(*region_args)))
+
+            else:
+                logging.warning(' ===> Snow-depth map NOT PRODUCED for this region! ')
+                grid_map_all_regions[region_window][region_mask] = var_missing_value
+                grid_kernel_all_regions[region_window][region_mask] = var_missing_value
+
+        # Assemble the regions mosaic (in place)
+        for region_window, region_mask, region_results in region_collections:
+            if region_executor is not None:
+                region_results = region_results.result()
+            grid_data_this_region, grid_kernel_this_region = region_results
+            grid_map_all_regions[region_window][region_mask] = grid_data_this_region[region_mask]
+            grid_kernel_all_regions[region_window][region_mask] = grid_kernel_this_region[region_mask]
+    finally:
+        if region_executor is not None:
+            region_executor.shutdown(cancel_futures=True)
 
     # Final housekeeping
     grid_map_all_regions[np.isnan(ref_geo_z)] = var_fill_value
@@ -228,3 +199,91 @@ def compute_snow_height(var_data, var_geo_x, var_geo_y, var_geo_z,
 
     return grid_map_all_regions, grid_kernel_all_regions
 # -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to compute snow height and snow kernel maps of a homogeneous region (cropped to the region window)
+def compute_snow_height_region(region_window, region_mask,
+                               ref_point_predictors_container_this_region, ref_grid_predictors_container,
+                               var_data_select_this_region, index_geo_x_this_region, index_geo_y_this_region,
+                               var_point_x_select_this_region, var_point_y_select_this_region,
+                               grid_geo_x, grid_geo_y, ref_geo_z, ref_geo_x, ref_geo_y, ref_cell_size, ref_epsg,
+                               var_missing_value, fx_nodata, fx_interp_name, fx_interp_radius_x, fx_interp_radius_y,
+                               fx_regression_radius_influence, fx_regression_solver, fx_interp_engine,
+                               fx_interp_cache, fx_kernel_cache, fx_n_cpu=1):
+
+    # Station indexes referred to the region window
+    index_geo_x_this_window = index_geo_x_this_region - region_window[1].start
+    index_geo_y_this_window = index_geo_y_this_region - region_window[0].start
+
+    # stepwise fit for this region
+    [swf_b, swf_se, swf_pval, swf_inmodel, swf_stats, swf_nextstep, swf_history] = stepwisefit(
+        ref_point_predictors_container_this_region, var_data_select_this_region, [], 0.1,
+        solver=fx_regression_solver)
+
+    # we force elevation if not included already!
+    if not(swf_inmodel[0]):
+        swf_inmodel[0]=True
+        logging.warning(' ===> Elevation was not identified as predictor by stepwisefit ===> FORCED! ')
+
+    # restrict predictor space to allowed predictors
+    swf_inmodel = swf_inmodel.tolist()
+    swf_inmodel_false = [idx for idx, vx in enumerate(swf_inmodel) if not vx]
+    ref_point_predictors_container_this_region = \
+            np.delete(ref_point_predictors_container_this_region, swf_inmodel_false, axis=1)
+
+    # Multivariate linear regression
+    var_a = np.concatenate((ref_point_predictors_container_this_region,
+                            np.ones([ref_point_predictors_container_this_region.__len__(), 1])), axis=1)
+    var_coeff = np.linalg.lstsq(var_a, var_data_select_this_region, rcond=None)[0]
+
+    # Basemap (region window)
+    grid_basemap_this_region = np.ones(shape=[region_mask.shape[0], region_mask.shape[1]])
+    grid_basemap_this_region[:, :] = var_coeff[-1]
+    var_coeff_reduced = var_coeff[:-1]
+    for id, var_coeff_step in enumerate(var_coeff_reduced):
+        grid_basemap_this_region = grid_basemap_this_region + \
+                                   ref_grid_predictors_container[region_window[0], region_window[1], id] * var_coeff_step
+
+    # Filter data to avoid nan(s) and negative value(s), as well as to restrict to this homogeneous region
+    grid_basemap_this_region[grid_basemap_this_region < 0] = 0
+    grid_basemap_this_region[~region_mask] = np.nan
+
+    # Compute residuals
+    var_point_map = grid_basemap_this_region[index_geo_y_this_window, index_geo_x_this_window]
+    var_point_res = var_point_map - var_data_select_this_region
+    var_point_res_select = np.delete(var_point_res, np.isnan(var_point_res), axis=0)
+
+    # Distribute residuals (region window of the grid)
+    grid_data_res_this_region = interp_point2grid(var_point_res_select, var_point_x_select_this_region,
+                                                  var_point_y_select_this_region,
+                                                  grid_geo_x, grid_geo_y,
+                                                  epsg_code=ref_epsg,
+                                                  interp_no_data=fx_nodata, interp_method=fx_interp_name,
+                                                  interp_radius_x=fx_interp_radius_x,
+                                                  interp_radius_y=fx_interp_radius_y,
+                                                  interp_engine=fx_interp_engine,
+                                                  interp_cache=fx_interp_cache,
+                                                  interp_window=region_window,
+                                                  n_cpu=fx_n_cpu)
+    grid_data_res_this_region[~region_mask] = np.nan
+    grid_data_res_this_region[grid_data_res_this_region == fx_nodata] = np.nan
+    #note: we set grid_data_res_this_region to nan also where it shows missing value, because this is not the final
+    #map. We will add it to basemap.
+
+    #final map
+    grid_data_this_region = grid_basemap_this_region - grid_data_res_this_region
+    grid_data_this_region[grid_data_this_region < 0] = 0
+
+    # Kernel (region window)
+    grid_kernel_this_region = compute_kernel(ref_geo_z, ref_geo_x, ref_geo_y,
+                                             ref_cell_size, ref_cell_size,
+                                             index_geo_x_this_region, index_geo_y_this_region,
+                                             fx_regression_radius_influence,
+                                             kernel_cache=fx_kernel_cache, grid_window=region_window)
+    grid_kernel_this_region[grid_kernel_this_region < 0] = 0
+    grid_kernel_this_region[grid_kernel_this_region > 1] = 1
+    grid_kernel_this_region[np.isnan(grid_kernel_this_region)] = var_missing_value
+
+    return grid_data_this_region, grid_kernel_this_region
+# -------------------------------------------------------------------------------------
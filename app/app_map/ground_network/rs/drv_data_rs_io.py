@@ -54,6 +54,7 @@ class DriverData:
         self.tag_file_fields_types = 'file_fields_types'
         self.tag_file_fields_format = 'file_fields_format'
         self.tag_file_compression = 'file_compression'
+        self.tag_file_compression_level = 'file_compression_level'
 
         self.domain_name = info_dict['domain']
         self.variable_src_list = list(self.variable_src_dict.keys())
@@ -104,6 +105,10 @@ class DriverData:
             self.file_compression_dst = self.dst_dict[self.tag_file_compression]
         else:
             self.file_compression_dst = False
+        if self.tag_file_compression_level in list(self.dst_dict.keys()):
+            self.file_compression_level_dst = self.dst_dict[self.tag_file_compression_level]
+        else:
+            self.file_compression_level_dst = 9
         self.file_zip_dst_dset_raw = self.add_file_extension(self.file_name_dst_dset_raw, file_extension='.gz')
         self.file_zip_dst_dset_collections = self.collect_file_list(
             self.folder_name_dst_dset_raw, self.file_zip_dst_dset_raw)
@@ -307,7 +312,7 @@ class DriverData:
                     logging.info(' ------> Zip file ... ')
                     if self.file_compression_dst:
 
-                        zip_filename(var_file_path_dst, var_file_path_zip)
+                        zip_filename(var_file_path_dst, var_file_path_zip, zip_level=self.file_compression_level_dst)
                         if os.path.exists(var_file_path_dst):
                             os.remove(var_file_path_dst)
 
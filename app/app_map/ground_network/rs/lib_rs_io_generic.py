@@ -445,7 +445,13 @@ def clip_data(map, valid_range=None, missing_value=None):
 # Method to write dataset
 def write_dset(file_name,
                dset_data, dset_mode='w', dset_engine='h5netcdf', dset_compression_level=0, dset_format='NETCDF4',
-               dim_key_time='time', fill_value=-9999.0):
+               dim_key_time='time', fill_value=-9999.0, dset_encoding_profile=None):
+
+    # Encoding profile (keys: complevel, shuffle, chunk_sizes, dtype, least_significant_digit)
+    if dset_encoding_profile is None:
+        dset_encoding_profile = {}
+    if 'complevel' in list(dset_encoding_profile.keys()):
+        dset_compression_level = dset_encoding_profile['complevel']
 
     dset_encoding = {}
     for var_name in dset_data.data_vars:
@@ -464,6 +470,21 @@ def write_dset(file_name,
                 var_attrs_encoding['zlib'] = True
             if 'complevel' not in list(var_attrs_encoding.keys()):
                 var_attrs_encoding['complevel'] = dset_compression_level
+            if 'shuffle' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['shuffle'] = dset_encoding_profile['shuffle']
+
+        var_dims = dset_data[var_name].dims
+        if ('chunk_sizes' in list(dset_encoding_profile.keys())) and (var_dims.__len__() > 0):
+            chunk_sizes = dset_encoding_profile['chunk_sizes']
+            var_attrs_encoding['chunksizes'] = tuple(
+                [min(chunk_sizes.get(var_dim, dset_data.sizes[var_dim]), dset_data.sizes[var_dim])
+                 for var_dim in var_dims])
+
+        if np.issubdtype(dset_data[var_name].dtype, np.floating):
+            if 'dtype' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['dtype'] = dset_encoding_profile['dtype']
+            if 'least_significant_digit' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['least_significant_digit'] = dset_encoding_profile['least_significant_digit']
 
         dset_encoding[var_name] = var_attrs_encoding
 
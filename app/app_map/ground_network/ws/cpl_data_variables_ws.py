@@ -29,7 +29,7 @@ class DriverVariable:
     # -------------------------------------------------------------------------------------
     # Method to initialize class
     def __init__(self, var_obj, ref_obj, var_attributes=None,
-                 fx_name=None, fx_parameters=None, fx_outcome=None,
+                 fx_name=None, fx_parameters=None, fx_outcome=None, fx_interp_cache=None,
                  tag_var_geo_x='longitude', tag_var_geo_y='latitude', tag_var_geo_z='altitude',
                  tag_ref_geo_x='west_east', tag_ref_geo_y='south_north',
                  tag_var_ws_data='data',
@@ -44,6 +44,7 @@ class DriverVariable:
         self.fx_name = fx_name
         self.fx_parameters = fx_parameters
         self.fx_outcome = fx_outcome
+        self.fx_interp_cache = fx_interp_cache
 
         self.tag_var_geo_x = tag_var_geo_x
         self.tag_var_geo_y = tag_var_geo_y
@@ -66,7 +67,7 @@ class DriverVariable:
             self.ref_cellsize_x, self.ref_cellsize_y, self.ref_nodata = self.get_ref_attributes()
 
         self.fx_nodata, self.fx_interp_name, self.fx_interp_radius_x, self.fx_interp_radius_y, \
-            self.fx_regression_radius_influence, self.fx_cpu = self.get_fx_attributes()
+            self.fx_regression_radius_influence, self.fx_interp_engine, self.fx_cpu = self.get_fx_attributes()
         self.fx_obj = self.get_fx_method()
 
     # -------------------------------------------------------------------------------------
@@ -199,11 +200,15 @@ class DriverVariable:
         fx_regression_radius_influence = 0.0
         if 'regression_radius_influence' in list(self.fx_parameters.keys()):
             fx_regression_radius_influence = self.fx_parameters['regression_radius_influence']
+        fx_interp_engine = 'native'
+        if 'interp_engine' in list(self.fx_parameters.keys()):
+            fx_interp_engine = self.fx_parameters['interp_engine']
         fx_cpu = 1
         if 'cpu' in list(self.fx_parameters.keys()):
             fx_cpu = self.fx_parameters['cpu']
 
-        return fx_nodata, fx_interp_name, fx_interp_radius_x, fx_interp_radius_y, fx_regression_radius_influence, fx_cpu
+        return fx_nodata, fx_interp_name, fx_interp_radius_x, fx_interp_radius_y, fx_regression_radius_influence, \
+            fx_interp_engine, fx_cpu
 
     # -------------------------------------------------------------------------------------
 
@@ -233,8 +238,8 @@ class DriverVariable:
     @staticmethod
     def pop_fx_args(fx_signature, fx_data):
 
-        fx_data_tmp = deepcopy(fx_data)
-        for fx_key_tmp in fx_data_tmp.keys():
+        fx_keys_tmp = list(fx_data.keys())
+        for fx_key_tmp in fx_keys_tmp:
             if fx_key_tmp not in list(fx_signature.parameters.keys()):
                 fx_data.pop(fx_key_tmp, None)
 
@@ -242,12 +247,45 @@ class DriverVariable:
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
-    # Method to compute variable data
-    def compute_data(self):
+    # Method to define fx data
+    def define_fx_data(self, var_obj, var_data=None):
 
         # Get geographical data
         ref_obj = self.ref_obj
 
+        if var_data is None:
+            var_data = var_obj[self.tag_var_ws_data].values
+
+        fx_data = {'var_data': var_data,
+                   'var_geo_x': var_obj[self.tag_var_geo_x].values,
+                   'var_geo_y': var_obj[self.tag_var_geo_y].values,
+                   'var_geo_z': var_obj[self.tag_var_geo_z].values,
+                   'var_units': self.var_units,
+                   'var_missing_value': self.var_missing_value, 'var_fill_value': self.var_fill_value,
+                   'fx_nodata': self.fx_nodata, 'fx_interp_name': self.fx_interp_name,
+                   'fx_interp_radius_x': self.fx_interp_radius_x, 'fx_interp_radius_y': self.fx_interp_radius_y,
+                   'fx_regression_radius_influence': self.fx_regression_radius_influence,
+                   'fx_interp_engine': self.fx_interp_engine,
+                   'fx_interp_cache': self.fx_interp_cache,
+                   'ref_geo_x': ref_obj[self.tag_ref_geo_x].values,
+                   'ref_geo_y': ref_obj[self.tag_ref_geo_y].values,
+                   'ref_geo_z': ref_obj[self.tag_ref_land_data].values,
+                   'ref_geo_aspect': ref_obj[self.tag_ref_aspect_data].values,
+                   'ref_geo_slope': ref_obj[self.tag_ref_slope_data].values,
+                   'ref_geo_hillshade': ref_obj[self.tag_ref_hillshade_data].values,
+                   'ref_cell_size': np.mean([self.ref_cellsize_x, self.ref_cellsize_y]),
+                   'ref_no_data': self.ref_nodata, 'ref_epsg': '4326',
+                   'fx_cpu': self.fx_cpu
+                   }
+
+        return fx_data
+
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Method to compute variable data
+    def compute_data(self):
+
         # Get data filtered obj
         var_obj = deepcopy(self.filter_var_valid_range(self.var_obj))
 
@@ -256,25 +294,7 @@ class DriverVariable:
             # Get fx signature
             fx_signature = inspect.signature(self.fx_obj)
             # Create fx data
-            fx_data = {'var_data': var_obj[self.tag_var_ws_data].values,
-                       'var_geo_x': var_obj[self.tag_var_geo_x].values,
-                       'var_geo_y': var_obj[self.tag_var_geo_y].values,
-                       'var_geo_z': var_obj[self.tag_var_geo_z].values,
-                       'var_units': self.var_units,
-                       'var_missing_value': self.var_missing_value, 'var_fill_value': self.var_fill_value,
-                       'fx_nodata': self.fx_nodata, 'fx_interp_name': self.fx_interp_name,
-                       'fx_interp_radius_x': self.fx_interp_radius_x, 'fx_interp_radius_y': self.fx_interp_radius_y,
-                       'fx_regression_radius_influence': self.fx_regression_radius_influence,
-                       'ref_geo_x': ref_obj[self.tag_ref_geo_x].values,
-                       'ref_geo_y': ref_obj[self.tag_ref_geo_y].values,
-                       'ref_geo_z': ref_obj[self.tag_ref_land_data].values,
-                       'ref_geo_aspect': ref_obj[self.tag_ref_aspect_data].values,
-                       'ref_geo_slope': ref_obj[self.tag_ref_slope_data].values,
-                       'ref_geo_hillshade': ref_obj[self.tag_ref_hillshade_data].values,
-                       'ref_cell_size': np.mean([self.ref_cellsize_x, self.ref_cellsize_y]),
-                       'ref_no_data': self.ref_nodata, 'ref_epsg': '4326',
-                       'fx_cpu': self.fx_cpu
-                       }
+            fx_data = self.define_fx_data(var_obj)
 
             # Fill and pop fx data
             fx_data = self.fill_fx_args(fx_signature, fx_data)
@@ -292,4 +312,61 @@ class DriverVariable:
         return fx_results_collections
     # -------------------------------------------------------------------------------------
 
+    # -------------------------------------------------------------------------------------
+    # Method to compute variable data for a list of steps (steps sharing the same points are computed together)
+    def compute_data_batch(self, var_obj_list):
+
+        fx_results_list = [None] * var_obj_list.__len__()
+
+        if self.fx_obj and (self.fx_name in fx_collections.fx_batch_methods):
+
+            # Group steps using point(s) coordinates (after filtering data)
+            var_group_collections = {}
+            for var_id, var_obj_step in enumerate(var_obj_list):
+                if var_obj_step is not None:
+                    var_obj_step = self.filter_var_valid_range(var_obj_step)
+                    var_group_key = (var_obj_step[self.tag_var_geo_x].values.tobytes(),
+                                     var_obj_step[self.tag_var_geo_y].values.tobytes(),
+                                     var_obj_step[self.tag_var_geo_z].values.tobytes())
+                    if var_group_key not in list(var_group_collections.keys()):
+                        var_group_collections[var_group_key] = []
+                    var_group_collections[var_group_key].append((var_id, var_obj_step))
+
+            # Get fx signature
+            fx_signature = inspect.signature(self.fx_obj)
+
+            for var_group_list in var_group_collections.values():
+
+                var_group_id = [var_group_step[0] for var_group_step in var_group_list]
+                var_group_obj = var_group_list[0][1]
+
+                # Stack data in 2d format [points, steps]
+                var_group_data = np.column_stack(
+                    [var_group_step[1][self.tag_var_ws_data].values for var_group_step in var_group_list])
+
+                # Create, fill and pop fx data
+                fx_data = self.define_fx_data(var_group_obj, var_data=var_group_data)
+                fx_data = self.fill_fx_args(fx_signature, fx_data)
+                fx_data = self.pop_fx_args(fx_signature, fx_data)
+                # Execute fx method
+                fx_results_data = self.fx_obj(**fx_data)
+
+                # Split fx results in step(s) [rows, cols, steps] and organize them
+                for var_group_n, var_id in enumerate(var_group_id):
+                    if isinstance(fx_results_data, tuple):
+                        fx_results_step = tuple([fx_result[:, :, var_group_n] for fx_result in fx_results_data])
+                    else:
+                        fx_results_step = fx_results_data[:, :, var_group_n]
+                    fx_results_list[var_id] = self.organize_fx_result(fx_results_step)
+
+        else:
+            # Compute step(s) one by one (method does not support 2d data)
+            for var_id, var_obj_step in enumerate(var_obj_list):
+                if var_obj_step is not None:
+                    self.var_obj = var_obj_step
+                    fx_results_list[var_id] = self.compute_data()
+
+        return fx_results_list
+    # -------------------------------------------------------------------------------------
+
 # -------------------------------------------------------------------------------------
@@ -18,6 +18,8 @@ from lib_ws_geo import read_file_raster
 from lib_ws_io_generic import write_obj, read_obj, convert_values2da
 from lib_ws_generic import make_folder
 
+from lib_ws_analysis_interpolation_point import create_point2grid_cache
+
 from lib_ws_ancillary_snow import compute_predictor, command_line_predictor
 
 # Debug
@@ -35,6 +37,7 @@ class DriverGeo:
                  tag_ancillary_data_grid='grid_reference',
                  tag_ancillary_data_geo='geo_reference',
                  tag_ancillary_data_predictor='predictor_reference',
+                 tag_ancillary_data_interp='interp_reference', tag_cache_size='cache_size',
                  tag_dst_data_aspect='aspect_data',
                  tag_dst_data_slope='slope_data',
                  tag_dst_data_hillshade='hillshade_data',
@@ -52,6 +55,8 @@ class DriverGeo:
         self.tag_ancillary_data_grid = tag_ancillary_data_grid
         self.tag_ancillary_data_geo = tag_ancillary_data_geo
         self.tag_ancillary_data_predictor = tag_ancillary_data_predictor
+        self.tag_ancillary_data_interp = tag_ancillary_data_interp
+        self.tag_cache_size = tag_cache_size
         self.tag_dst_data_aspect = tag_dst_data_aspect
         self.tag_dst_data_slope = tag_dst_data_slope
         self.tag_dst_data_hillshade = tag_dst_data_hillshade
@@ -71,6 +76,16 @@ class DriverGeo:
         self.file_name_ancillary_predictor = ancillary_dict[self.tag_ancillary_data_predictor][self.tag_file_name]
         self.file_path_ancillary_predictor = os.path.join(self.folder_name_ancillary_predictor, self.file_name_ancillary_predictor)
 
+        self.file_path_ancillary_interp, self.interp_cache_size = None, 20
+        if self.tag_ancillary_data_interp in list(ancillary_dict.keys()):
+            ancillary_interp = ancillary_dict[self.tag_ancillary_data_interp]
+            self.folder_name_ancillary_interp = ancillary_interp[self.tag_folder_name]
+            self.file_name_ancillary_interp = ancillary_interp[self.tag_file_name]
+            self.file_path_ancillary_interp = os.path.join(self.folder_name_ancillary_interp,
+                                                           self.file_name_ancillary_interp)
+            if self.tag_cache_size in list(ancillary_interp.keys()):
+                self.interp_cache_size = ancillary_interp[self.tag_cache_size]
+
         self.tag_dim_geo_x = 'longitude'
         self.tag_dim_geo_y = 'latitude'
         self.tag_coord_geo_x = 'west_east'
@@ -95,6 +110,60 @@ class DriverGeo:
         return file_dset
     # -------------------------------------------------------------------------------------
 
+    # -------------------------------------------------------------------------------------
+    # Method to get interpolation weights cache
+    def get_interp_cache(self):
+
+        logging.info(' ---> Get interpolation weights cache ... ')
+
+        file_path_ancillary = self.file_path_ancillary_interp
+
+        if file_path_ancillary is not None:
+
+            if self.flag_updating_ancillary:
+                if os.path.exists(file_path_ancillary):
+                    os.remove(file_path_ancillary)
+
+            if os.path.exists(file_path_ancillary):
+                cache_obj = read_obj(file_path_ancillary)
+                interp_cache = create_point2grid_cache(cache_obj, cache_size=self.interp_cache_size)
+                logging.info(' ---> Get interpolation weights cache ... DONE. Loaded using saved ancillary file')
+            else:
+                interp_cache = create_point2grid_cache(cache_size=self.interp_cache_size)
+                logging.info(' ---> Get interpolation weights cache ... DONE')
+        else:
+            interp_cache = create_point2grid_cache(cache_size=self.interp_cache_size)
+            logging.info(' ---> Get interpolation weights cache ... DONE. Ancillary file not defined; '
+                         'cache will be not saved')
+
+        return interp_cache
+
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Method to dump interpolation weights cache
+    def dump_interp_cache(self, interp_cache):
+
+        logging.info(' ---> Dump interpolation weights cache ... ')
+
+        file_path_ancillary = self.file_path_ancillary_interp
+
+        if file_path_ancillary is not None:
+            if interp_cache['cache_updated']:
+                folder_name_ancillary, file_name_ancillary = os.path.split(file_path_ancillary)
+                make_folder(folder_name_ancillary)
+
+                write_obj(file_path_ancillary, {'cache_data': interp_cache['cache_data']})
+                interp_cache['cache_updated'] = False
+
+                logging.info(' ---> Dump interpolation weights cache ... DONE')
+            else:
+                logging.info(' ---> Dump interpolation weights cache ... SKIPPED. Cache not updated')
+        else:
+            logging.info(' ---> Dump interpolation weights cache ... SKIPPED. Ancillary file not defined')
+
+    # -------------------------------------------------------------------------------------
+
     # -----------------------------------------------------------------------------------
     # Method to define geo predictor(s)
     def define_geo_predictor(self, dset_land):
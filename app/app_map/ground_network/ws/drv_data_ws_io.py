@@ -18,10 +18,15 @@ import time
 import xarray as xr
 import pandas as pd
 
+from copy import deepcopy
+
 from lib_ws_conventions import conventions_vars
 from cpl_data_variables_ws import DriverVariable
 
-from lib_ws_io_generic import write_obj, read_obj, convert_values2da, create_dset, write_dset, read_file_csv
+from lib_ws_io_generic import write_obj, read_obj, write_dset_store, read_dset_store, convert_values2da, \
+    create_dset, write_dset, read_file_csv, \
+    read_file_csv_bulk, select_file_csv_bulk, \
+    write_dset_aggregated, check_dset_aggregated
 from lib_ws_generic import make_folder, fill_tags2string, list_folder, get_root_path
 
 from lib_ws_io_gzip import zip_filename
@@ -35,10 +40,13 @@ class DriverData:
     def __init__(self, time_step, geo_collections=None,
                  src_dict=None, ancillary_dict=None, dst_dict=None,
                  variable_src_dict=None, variable_dst_dict=None, time_dict=None, template_dict=None, info_dict=None,
-                 flag_updating_ancillary=True, flag_updating_destination=True, flag_cleaning_tmp=True):
+                 flag_updating_ancillary=True, flag_updating_destination=True, flag_cleaning_tmp=True,
+                 flag_batching_time=False, interp_cache=None, time_window=None):
 
         self.time_step = time_step
+        self.time_window = time_window
         self.geo_collections = geo_collections
+        self.interp_cache = interp_cache
 
         self.src_dict = src_dict
         self.ancillary_dict = ancillary_dict
@@ -52,6 +60,13 @@ class DriverData:
         self.tag_file_name = 'file_name'
         self.tag_file_fields = 'file_fields'
         self.tag_file_compression = 'file_compression'
+        self.tag_file_compression_level = 'file_compression_level'
+        self.tag_file_compression_mode = 'file_compression_mode'
+        self.tag_file_encoding = 'file_encoding'
+        self.tag_file_aggregation = 'file_aggregation'
+        self.tag_time_frequency = 'time_frequency'
+        self.tag_file_format = 'file_format'
+        self.tag_file_engine = 'file_engine'
 
         self.domain_name = info_dict['domain']
         self.variable_src_list = list(self.variable_src_dict.keys())
@@ -60,6 +75,7 @@ class DriverData:
         self.time_range = self.collect_file_time()
 
         self.file_fields_collections = {}
+        self.file_engine_collections = {}
         self.file_path_src_dset_collections = {}
         for variable_step in self.variable_src_list:
             folder_name_src_dset_raw = self.src_dict[variable_step][self.tag_folder_name]
@@ -68,10 +84,18 @@ class DriverData:
                                                              variable_step)
 
             self.file_fields_collections[variable_step] = self.src_dict[variable_step][self.tag_file_fields]
+            if self.tag_file_engine in list(self.src_dict[variable_step].keys()):
+                self.file_engine_collections[variable_step] = self.src_dict[variable_step][self.tag_file_engine]
+            else:
+                self.file_engine_collections[variable_step] = 'c'
             self.file_path_src_dset_collections[variable_step] = file_path_src_dset_list
 
         self.folder_name_anc_dset_raw = self.ancillary_dict[self.tag_folder_name]
         self.file_name_anc_dset_raw = self.ancillary_dict[self.tag_file_name]
+        if self.tag_file_format in list(self.ancillary_dict.keys()):
+            self.file_format_anc = self.ancillary_dict[self.tag_file_format]
+        else:
+            self.file_format_anc = 'dictionary'
         self.file_path_anc_dset_collections = self.collect_file_list(
             self.folder_name_anc_dset_raw, self.file_name_anc_dset_raw)
 
@@ -83,6 +107,30 @@ class DriverData:
             self.folder_name_dst_dset_raw, self.file_name_dst_dset_raw)
 
         self.file_compression_dst = self.dst_dict[self.tag_file_compression]
+        if self.tag_file_compression_level in list(self.dst_dict.keys()):
+            self.file_compression_level_dst = self.dst_dict[self.tag_file_compression_level]
+        else:
+            self.file_compression_level_dst = 9
+        if self.tag_file_compression_mode in list(self.dst_dict.keys()):
+            self.file_compression_mode_dst = self.dst_dict[self.tag_file_compression_mode]
+        else:
+            self.file_compression_mode_dst = 'netcdf_gzip'
+        if self.file_compression_mode_dst not in ['netcdf_gzip', 'gzip']:
+            logging.error(' ===> Compression mode "' + str(self.file_compression_mode_dst) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
+
+        # Aggregated destination file(s) (time steps appended to daily or rolling file(s))
+        if self.tag_file_aggregation in list(self.dst_dict.keys()):
+            self.file_aggregation_dst = self.dst_dict[self.tag_file_aggregation]
+        else:
+            self.file_aggregation_dst = None
+        if self.file_aggregation_dst is not None:
+            self.file_path_dst_dset_collections = self.collect_file_list(
+                self.folder_name_dst_dset_raw, self.file_aggregation_dst[self.tag_file_name],
+                file_time_frequency=self.file_aggregation_dst[self.tag_time_frequency])
+            if self.file_compression_dst:
+                logging.warning(' ===> Aggregated destination file(s) are not compressed by gzip')
+                self.file_compression_dst = False
 
         self.file_zip_dst_dset_raw = self.add_file_extension(self.file_name_dst_dset_raw, file_extension='.gz')
         self.file_zip_dst_dset_collections = self.collect_file_list(
@@ -91,6 +139,7 @@ class DriverData:
         self.flag_updating_ancillary = flag_updating_ancillary
         self.flag_updating_destination = flag_updating_destination
         self.flag_cleaning_tmp = flag_cleaning_tmp
+        self.flag_batching_time = flag_batching_time
 
         self.tag_dim_geo_x = 'longitude'
         self.tag_dim_geo_y = 'latitude'
@@ -98,6 +147,18 @@ class DriverData:
         self.tag_coord_geo_y = 'south_north'
 
         self.dst_vars_compression_level = 9
+        if self.tag_file_encoding in list(self.dst_dict.keys()):
+            self.dst_vars_encoding_profile = deepcopy(self.dst_dict[self.tag_file_encoding])
+        else:
+            self.dst_vars_encoding_profile = None
+        # NetCDF variable(s) are not compressed if the destination file is compressed by gzip only
+        if self.file_compression_dst and (self.file_compression_mode_dst == 'gzip'):
+            self.dst_vars_compression_level = 0
+            if self.dst_vars_encoding_profile is not None:
+                if (self.dst_vars_encoding_profile.get('complevel', 0) > 0) or \
+                        self.dst_vars_encoding_profile.get('shuffle', False):
+                    logging.warning(' ===> Encoding "complevel" and "shuffle" are ignored in "gzip" compression mode')
+                self.dst_vars_encoding_profile['complevel'] = 0
         self.dst_vars_writing_engine = 'netcdf4'
 
     # -------------------------------------------------------------------------------------
@@ -117,6 +178,10 @@ class DriverData:
     # Method to collect time(s)
     def collect_file_time(self):
 
+        # Time window defined by the time plan
+        if self.time_window is not None:
+            return pd.DatetimeIndex(self.time_window)
+
         time_period = self.time_dict["time_period"]
         time_frequency = self.time_dict["time_frequency"]
         time_rounding = self.time_dict["time_rounding"]
@@ -130,12 +195,16 @@ class DriverData:
 
     # -------------------------------------------------------------------------------------
     # Method to collect ancillary file
-    def collect_file_list(self, folder_name_raw, file_name_raw, file_variable=None):
+    def collect_file_list(self, folder_name_raw, file_name_raw, file_variable=None, file_time_frequency=None):
 
         domain_name = self.domain_name
         file_name_list = []
         for datetime_step in self.time_range:
 
+            # Time step of the aggregated file(s)
+            if file_time_frequency is not None:
+                datetime_step = datetime_step.floor(file_time_frequency)
+
             template_values_step = {
                 'domain_name': domain_name,
                 'source_var_name': file_variable,
@@ -158,19 +227,31 @@ class DriverData:
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
-    # Method to write dataset in dictionary format
+    # Method to write dataset in dictionary or array store format
     @staticmethod
-    def write_dset_obj(file_name, file_dset):
-        file_dict = file_dset.to_dict()
-        write_obj(file_name, file_dict)
+    def write_dset_obj(file_name, file_dset, file_format='dictionary'):
+        if file_format == 'dictionary':
+            file_dict = file_dset.to_dict()
+            write_obj(file_name, file_dict)
+        elif file_format == 'array':
+            write_dset_store(file_name, file_dset)
+        else:
+            logging.error(' ===> Ancillary file format "' + str(file_format) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
-    # Method to load dataset saved in dictionary format
+    # Method to load dataset saved in dictionary or array store format
     @staticmethod
-    def read_dset_obj(file_name):
-        file_dict = read_obj(file_name)
-        file_dset = xr.Dataset.from_dict(file_dict)
+    def read_dset_obj(file_name, file_format='dictionary'):
+        if file_format == 'dictionary':
+            file_dict = read_obj(file_name)
+            file_dset = xr.Dataset.from_dict(file_dict)
+        elif file_format == 'array':
+            file_dset = read_dset_store(file_name)
+        else:
+            logging.error(' ===> Ancillary file format "' + str(file_format) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
         return file_dset
     # -------------------------------------------------------------------------------------
 
@@ -187,6 +268,52 @@ class DriverData:
         return global_attrs
     # -------------------------------------------------------------------------------------
 
+    # -------------------------------------------------------------------------------------
+    # Method to plan datasets (dry-run mode; no datasets are computed)
+    def plan_data(self):
+
+        time_range = self.time_range
+
+        file_path_src_collections = self.file_path_src_dset_collections
+        file_path_anc_collections = self.file_path_anc_dset_collections
+        file_path_dst_collections = self.file_path_dst_dset_collections
+        file_path_zip_collections = self.file_zip_dst_dset_collections
+
+        var_src_dict = self.variable_src_dict
+
+        plan_collections = {'time_steps': time_range.__len__(), 'work_items': 0,
+                            'source_found': 0, 'source_missing': 0,
+                            'ancillary_found': 0, 'destination_found': 0}
+
+        for var_key, var_fields in var_src_dict.items():
+            if var_fields['var_mode']:
+                for var_file_path_src in file_path_src_collections[var_key]:
+                    plan_collections['work_items'] += 1
+                    if os.path.exists(var_file_path_src):
+                        plan_collections['source_found'] += 1
+                    else:
+                        plan_collections['source_missing'] += 1
+
+        for id, time_step in enumerate(time_range):
+            if os.path.exists(file_path_anc_collections[id]):
+                plan_collections['ancillary_found'] += 1
+            if self.file_aggregation_dst is not None:
+                var_file_saved = check_dset_aggregated(file_path_dst_collections[id], time_step)
+            elif self.file_compression_dst:
+                var_file_saved = os.path.exists(file_path_zip_collections[id])
+            else:
+                var_file_saved = os.path.exists(file_path_dst_collections[id])
+            if var_file_saved:
+                plan_collections['destination_found'] += 1
+
+        logging.info(' ----> Plan datasets :: Time ' + str(time_range[0]) + ' - ' + str(time_range[-1]) + ' :: ' +
+                     ' :: '.join([plan_key + ': ' + str(plan_value)
+                                  for plan_key, plan_value in plan_collections.items()]))
+
+        return plan_collections
+
+    # -------------------------------------------------------------------------------------
+
     # -------------------------------------------------------------------------------------
     # Method to dump datasets
     def dump_data(self):
@@ -214,23 +341,25 @@ class DriverData:
             var_file_path_dst = file_path_dst_collections[id]
             var_file_path_zip = file_path_zip_collections[id]
 
-            if flag_upd_dst:
+            if flag_upd_dst and (self.file_aggregation_dst is None):
                 if os.path.exists(var_file_path_dst):
                     os.remove(var_file_path_dst)
                 if os.path.exists(var_file_path_zip):
                     os.remove(var_file_path_zip)
 
-            if self.file_compression_dst:
-                var_file_path_check = var_file_path_zip
+            if self.file_aggregation_dst is not None:
+                var_file_saved = (not flag_upd_dst) and check_dset_aggregated(var_file_path_dst, time_step)
+            elif self.file_compression_dst:
+                var_file_saved = os.path.exists(var_file_path_zip)
             else:
-                var_file_path_check = var_file_path_dst
+                var_file_saved = os.path.exists(var_file_path_dst)
 
-            if not os.path.exists(var_file_path_check):
+            if not var_file_saved:
                 if os.path.exists(var_file_path_anc):
 
                     logging.info(' ------> Create dataset object ... ')
 
-                    var_dset_anc = self.read_dset_obj(var_file_path_anc)
+                    var_dset_anc = self.read_dset_obj(var_file_path_anc, file_format=self.file_format_anc)
 
                     # Iterate over variables
                     var_data_dict = {}
@@ -271,8 +400,17 @@ class DriverData:
 
                     var_folder_name_dst, var_file_name_dst = os.path.split(var_file_path_dst)
                     make_folder(var_folder_name_dst)
-                    write_dset(var_file_path_dst, var_dset, dset_compression_level=self.dst_vars_compression_level,
-                               dset_engine=self.dst_vars_writing_engine)
+                    if self.file_aggregation_dst is not None:
+                        write_dset_aggregated(var_file_path_dst, var_dset,
+                                              dset_compression_level=self.dst_vars_compression_level,
+                                              dset_engine=self.dst_vars_writing_engine,
+                                              dset_encoding_profile=self.dst_vars_encoding_profile,
+                                              file_time_frequency=self.file_aggregation_dst[self.tag_time_frequency],
+                                              time_step_frequency=self.time_dict[self.tag_time_frequency])
+                    else:
+                        write_dset(var_file_path_dst, var_dset, dset_compression_level=self.dst_vars_compression_level,
+                                   dset_engine=self.dst_vars_writing_engine,
+                                   dset_encoding_profile=self.dst_vars_encoding_profile)
 
                     logging.info(' ------> Save dataset object ... DONE')
 
@@ -280,7 +418,7 @@ class DriverData:
 
                     if self.file_compression_dst:
 
-                        zip_filename(var_file_path_dst, var_file_path_zip)
+                        zip_filename(var_file_path_dst, var_file_path_zip, zip_level=self.file_compression_level_dst)
                         if os.path.exists(var_file_path_dst):
                             os.remove(var_file_path_dst)
 
@@ -298,10 +436,163 @@ class DriverData:
 
     # -------------------------------------------------------------------------------------
 
+    # -------------------------------------------------------------------------------------
+    # Method to add variable data to dataset
+    def add_dset_data(self, var_dset, var_collections):
+
+        geo_collections = self.geo_collections
+
+        for var_dst_name_step, var_dst_data_step in var_collections.items():
+
+            var_da = convert_values2da(var_dst_data_step,
+                                       geo_collections[self.tag_coord_geo_x].values,
+                                       geo_collections[self.tag_coord_geo_y].values,
+                                       var_name=var_dst_name_step,
+                                       coord_name_x=self.tag_coord_geo_x,
+                                       coord_name_y=self.tag_coord_geo_y,
+                                       dim_name_x=self.tag_dim_geo_x, dim_name_y=self.tag_dim_geo_y)
+            if var_dset is None:
+                var_dset = var_da.to_dataset()
+            else:
+                var_dset[var_dst_name_step] = var_da
+
+        return var_dset
+
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Method to organize datasets computing all time steps of each variable together
+    def organize_data_batch(self):
+
+        logging.info(' ----> Organize datasets [batch mode] ... ')
+
+        time_range = self.time_range
+        geo_collections = self.geo_collections
+
+        file_fields_collections = self.file_fields_collections
+        file_engine_collections = self.file_engine_collections
+        file_path_src_collections = self.file_path_src_dset_collections
+        file_path_anc_collections = self.file_path_anc_dset_collections
+
+        var_src_dict = self.variable_src_dict
+
+        flag_upd_anc = self.flag_updating_ancillary
+
+        # Select time step(s) to compute
+        time_id_list = []
+        for id, time_step in enumerate(time_range):
+
+            var_file_path_anc = file_path_anc_collections[id]
+
+            if flag_upd_anc:
+                if os.path.exists(var_file_path_anc):
+                    os.remove(var_file_path_anc)
+
+            if not os.path.exists(var_file_path_anc):
+                time_id_list.append(id)
+            else:
+                logging.info(' -----> Time ' + str(time_step) + ' ... SKIPPED. Datasets are previously computed')
+
+        # Iterate over variable(s)
+        var_dset_collections = [None] * time_id_list.__len__()
+        for var_key, var_fields in var_src_dict.items():
+
+            logging.info(' -----> Variable ' + var_key + ' ... ')
+
+            var_mode = var_fields['var_mode']
+            var_method_compute = var_fields['var_method_compute']
+            var_attributes = var_fields['var_attributes']
+
+            var_file_list = file_fields_collections[var_key]
+
+            if var_mode and time_id_list:
+
+                logging.info(' ------> Get data ... ')
+                var_file_path_list, var_file_time_list = [], []
+                for id in time_id_list:
+                    var_file_path_src = file_path_src_collections[var_key][id]
+                    if os.path.exists(var_file_path_src):
+                        var_file_path_list.append(var_file_path_src)
+                        var_file_time_list.append(time_range[id])
+                    else:
+                        logging.warning(' ===> File not found ' + var_file_path_src)
+
+                # Read all the file(s) of the time window once
+                var_file_data_bulk = read_file_csv_bulk(var_file_path_list, file_time_list=var_file_time_list,
+                                                        file_variable=var_key, file_header=var_file_list,
+                                                        file_renamecols={'time_end': 'time'},
+                                                        file_skipcols=['time_start'],
+                                                        file_engine=file_engine_collections[var_key])
+
+                var_obj_list = []
+                for id in time_id_list:
+                    if time_range[id] in var_file_time_list:
+                        var_file_data_src = select_file_csv_bulk(var_file_data_bulk, time_range[id],
+                                                                 file_variable=var_key)
+                    else:
+                        var_file_data_src = None
+                    var_obj_list.append(var_file_data_src)
+                logging.info(' ------> Get data ... DONE')
+
+                logging.info(' ------> Compute data ... ')
+                driver_variable = DriverVariable(var_obj=None, ref_obj=geo_collections,
+                                                 var_attributes=var_attributes,
+                                                 fx_name=var_method_compute['name'],
+                                                 fx_parameters=var_method_compute['params'],
+                                                 fx_outcome=var_method_compute['outcome'],
+                                                 fx_interp_cache=self.interp_cache)
+
+                var_collections_list = driver_variable.compute_data_batch(var_obj_list)
+
+                for var_n, var_collections in enumerate(var_collections_list):
+                    if var_collections is not None:
+                        var_dset_collections[var_n] = self.add_dset_data(var_dset_collections[var_n],
+                                                                         var_collections)
+                logging.info(' ------> Compute data ... DONE')
+
+                logging.info(' -----> Variable ' + var_key + ' ... DONE')
+
+            elif not var_mode:
+                logging.info(' -----> Variable ' + var_key + ' ... SKIPPED. Variable mode not activated.')
+            else:
+                logging.info(' -----> Variable ' + var_key + ' ... SKIPPED. Datasets are previously computed')
+
+        # Save time step(s)
+        for id, var_dset in zip(time_id_list, var_dset_collections):
+
+            time_step = time_range[id]
+            var_file_path_anc = file_path_anc_collections[id]
+
+            if var_dset is not None:
+                var_folder_name_anc, var_file_name_anc = os.path.split(var_file_path_anc)
+                make_folder(var_folder_name_anc)
+
+                var_dset.attrs = self.geo_collections.attrs
+                self.write_dset_obj(var_file_path_anc, var_dset, file_format=self.file_format_anc)
+
+                logging.info(' -----> Time ' + str(time_step) + ' ... DONE')
+            else:
+                logging.info(' -----> Time ' + str(time_step) + ' ... SKIPPED. Datasets are undefined')
+
+        logging.info(' ----> Organize datasets [batch mode] ... DONE')
+
+    # -------------------------------------------------------------------------------------
+
     # -------------------------------------------------------------------------------------
     # Method to organize datasets
     def organize_data(self):
 
+        if self.flag_batching_time:
+            self.organize_data_batch()
+        else:
+            self.organize_data_step()
+
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Method to organize datasets computing time steps one by one
+    def organize_data_step(self):
+
         logging.info(' ----> Organize datasets ... ')
 
         time_range = self.time_range
@@ -365,23 +656,11 @@ class DriverData:
                                                              var_attributes=var_attributes,
                                                              fx_name=var_method_compute['name'],
                                                              fx_parameters=var_method_compute['params'],
-                                                             fx_outcome=var_method_compute['outcome'])
+                                                             fx_outcome=var_method_compute['outcome'],
+                                                             fx_interp_cache=self.interp_cache)
 
                             var_collections = driver_variable.compute_data()
-
-                            for var_dst_name_step, var_dst_data_step in var_collections.items():
-
-                                var_da = convert_values2da(var_dst_data_step,
-                                                           geo_collections[self.tag_coord_geo_x].values,
-                                                           geo_collections[self.tag_coord_geo_y].values,
-                                                           var_name=var_dst_name_step,
-                                                           coord_name_x=self.tag_coord_geo_x,
-                                                           coord_name_y=self.tag_coord_geo_y,
-                                                           dim_name_x=self.tag_dim_geo_x, dim_name_y=self.tag_dim_geo_y)
-                                if var_dset is None:
-                                    var_dset = var_da.to_dataset()
-                                else:
-                                    var_dset[var_dst_name_step] = var_da
+                            var_dset = self.add_dset_data(var_dset, var_collections)
 
                             logging.info(' -------> Compute data ... DONE')
                             logging.info(' ------> Variable ' + var_key + ' ... DONE')
@@ -397,7 +676,7 @@ class DriverData:
                     make_folder(var_folder_name_anc)
 
                     var_dset.attrs = self.geo_collections.attrs
-                    self.write_dset_obj(var_file_path_anc, var_dset)
+                    self.write_dset_obj(var_file_path_anc, var_dset, file_format=self.file_format_anc)
 
                     logging.info(' -----> Time ' + str(time_step) + ' ... DONE')
 
@@ -11,10 +11,18 @@ Version:       '1.0.0'
 # Logging
 import logging
 import tempfile
+import hashlib
+import threading
 import rasterio
 import os
 
+import numpy as np
+
+from collections import OrderedDict
+
 from numpy import zeros, min, max, flipud, savetxt
+from scipy.spatial import cKDTree
+from scipy.sparse import csr_matrix
 
 from lib_ws_generic import random_string, delete_folder, make_folder
 from lib_ws_process import exec_process
@@ -28,10 +36,345 @@ from lib_ws_process import exec_process
 # Method to interpolate point data to grid
 def interp_point2grid(data_in_1d, geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d, epsg_code='4326',
                       interp_no_data=-9999.0, interp_radius_x=None, interp_radius_y=None,
-                      interp_method='nearest', interp_option=None,
+                      interp_method='nearest', interp_option=None, interp_engine='native', interp_cache=None,
+                      interp_window=None,
                       folder_tmp=None, var_name_data='values', var_name_geox='x', var_name_geoy='y',
                       n_cpu=1):
 
+    # Check interpolation radius x and y
+    if (interp_radius_x is None) or (interp_radius_y is None):
+        logging.error(' ===> Interpolation radius x or y are undefined.')
+        raise ValueError('Radius must be defined')
+
+    # Check interpolation engine (custom gdal_grid options are available only using gdal engine)
+    if (interp_engine == 'native') and (interp_option is not None):
+        logging.warning(' ===> Interpolation option is defined only for gdal engine; switch engine to gdal')
+        interp_engine = 'gdal'
+
+    if interp_engine == 'native':
+        data_out_2d = interp_point2grid_native(
+            data_in_1d, geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d,
+            interp_no_data=interp_no_data, interp_radius_x=interp_radius_x, interp_radius_y=interp_radius_y,
+            interp_method=interp_method, interp_cache=interp_cache, interp_window=interp_window)
+    elif interp_engine == 'gdal':
+        # Data in 2d format [points, steps] are interpolated step by step and stacked as [rows, cols, steps]
+        data_in_2d = data_in_1d.reshape([data_in_1d.shape[0], -1])
+        data_out_list = []
+        for data_in_step in data_in_2d.T:
+            data_out_step = interp_point2grid_gdal(
+                data_in_step, geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d, epsg_code=epsg_code,
+                interp_no_data=interp_no_data, interp_radius_x=interp_radius_x, interp_radius_y=interp_radius_y,
+                interp_method=interp_method, interp_option=interp_option,
+                folder_tmp=folder_tmp, var_name_data=var_name_data, var_name_geox=var_name_geox,
+                var_name_geoy=var_name_geoy, n_cpu=n_cpu)
+            data_out_list.append(data_out_step)
+        if data_in_1d.ndim == 1:
+            data_out_2d = data_out_list[0]
+        else:
+            data_out_2d = np.stack(data_out_list, axis=2)
+        if interp_window is not None:
+            data_out_2d = data_out_2d[interp_window[0], interp_window[1]]
+    else:
+        logging.error(' ===> Interpolation engine "' + str(interp_engine) + '" is not allowed')
+        raise NotImplementedError('Interpolation engine not implemented yet')
+
+    return data_out_2d
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to interpolate point data to grid (using numpy/scipy in-process engine)
+def interp_point2grid_native(data_in_1d, geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d,
+                             interp_no_data=-9999.0, interp_radius_x=None, interp_radius_y=None,
+                             interp_method='nearest', interp_cache=None, interp_window=None):
+
+    # Get interpolation weights (computed or loaded from cache)
+    interp_weights, interp_valid = get_point2grid_weights(
+        geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d,
+        interp_radius_x=interp_radius_x, interp_radius_y=interp_radius_y, interp_method=interp_method,
+        interp_cache=interp_cache, interp_window=interp_window)
+
+    # Apply interpolation weights
+    geox_nodes_1d, geoy_nodes_1d = compute_grid_nodes(geox_out_2d, geoy_out_2d, grid_window=interp_window)
+    data_out_2d = apply_point2grid_weights(data_in_1d, interp_weights, interp_valid,
+                                           grid_shape=(geoy_nodes_1d.shape[0], geox_nodes_1d.shape[0]),
+                                           interp_no_data=interp_no_data)
+
+    return data_out_2d
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Lock of interpolation weights cache (cache can be shared by threads)
+interp_cache_lock = threading.Lock()
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to create interpolation weights cache (weights are stored in least recently used order)
+def create_point2grid_cache(cache_obj=None, cache_size=20):
+
+    cache_data = OrderedDict()
+    if cache_obj is not None:
+        cache_data.update(cache_obj['cache_data'])
+
+    interp_cache = {'cache_size': cache_size, 'cache_data': cache_data, 'cache_updated': False}
+    update_point2grid_cache(interp_cache)
+
+    return interp_cache
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to update interpolation weights cache (removing the least recently used entries)
+def update_point2grid_cache(interp_cache):
+
+    cache_size = interp_cache['cache_size']
+    cache_data = interp_cache['cache_data']
+    if cache_size is not None:
+        while cache_data.__len__() > cache_size:
+            cache_data.popitem(last=False)
+
+    return interp_cache
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to select interpolation weights cache entries (entries not included in the given keys)
+def select_point2grid_cache(interp_cache, cache_keys):
+    return OrderedDict([(cache_key, cache_value) for cache_key, cache_value in interp_cache['cache_data'].items()
+                        if cache_key not in cache_keys])
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to merge interpolation weights cache entries (computed by other process(es))
+def merge_point2grid_cache(interp_cache, cache_data):
+
+    if cache_data:
+        interp_cache['cache_data'].update(cache_data)
+        interp_cache['cache_updated'] = True
+        update_point2grid_cache(interp_cache)
+
+    return interp_cache
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to define interpolation weights key (hash of points, grid nodes and interpolation settings)
+def define_point2grid_key(geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d,
+                          interp_radius_x=None, interp_radius_y=None, interp_method='nearest', interp_power=2.0,
+                          interp_window=None):
+
+    geox_nodes_1d, geoy_nodes_1d = compute_grid_nodes(geox_out_2d, geoy_out_2d, grid_window=interp_window)
+
+    key_hash = hashlib.sha1()
+    key_hash.update(np.ascontiguousarray(geox_in_1d, dtype=np.float64).tobytes())
+    key_hash.update(np.ascontiguousarray(geoy_in_1d, dtype=np.float64).tobytes())
+    key_hash.update(np.ascontiguousarray(geox_nodes_1d, dtype=np.float64).tobytes())
+    key_hash.update(np.ascontiguousarray(geoy_nodes_1d, dtype=np.float64).tobytes())
+    key_hash.update(':'.join([str(interp_radius_x), str(interp_radius_y),
+                              str(interp_method), str(interp_power)]).encode('utf-8'))
+
+    return key_hash.hexdigest()
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to get interpolation weights (using cache if defined)
+def get_point2grid_weights(geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d,
+                           interp_radius_x=None, interp_radius_y=None, interp_method='nearest',
+                           interp_cache=None, interp_window=None):
+
+    interp_key, interp_weights, interp_valid = None, None, None
+    if interp_cache is not None:
+
+        interp_key = define_point2grid_key(
+            geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d,
+            interp_radius_x=interp_radius_x, interp_radius_y=interp_radius_y, interp_method=interp_method,
+            interp_window=interp_window)
+
+        with interp_cache_lock:
+            cache_data = interp_cache['cache_data']
+            if interp_key in cache_data:
+                interp_weights, interp_valid = cache_data[interp_key]
+                cache_data.move_to_end(interp_key)
+
+    if interp_weights is None:
+        interp_weights, interp_valid = compute_point2grid_weights(
+            geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d,
+            interp_radius_x=interp_radius_x, interp_radius_y=interp_radius_y, interp_method=interp_method,
+            interp_window=interp_window)
+
+        if interp_cache is not None:
+            with interp_cache_lock:
+                interp_cache['cache_data'][interp_key] = (interp_weights, interp_valid)
+                interp_cache['cache_updated'] = True
+                update_point2grid_cache(interp_cache)
+
+    return interp_weights, interp_valid
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to apply interpolation weights to point data
+def apply_point2grid_weights(data_in, interp_weights, interp_valid, grid_shape, interp_no_data=-9999.0):
+
+    # Weighted sum of point value(s) (1d data [points] or 2d data [points, steps])
+    data_out = interp_weights.dot(np.asarray(data_in, dtype=np.float64))
+    data_out[~interp_valid] = interp_no_data
+
+    # Organize data in 2d or 3d format (as float32 like the gdal_grid output)
+    if data_out.ndim == 1:
+        data_out = data_out.reshape(grid_shape)
+    else:
+        data_out = data_out.reshape([grid_shape[0], grid_shape[1], data_out.shape[1]])
+    data_out = data_out.astype(np.float32)
+
+    return data_out
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to compute grid nodes (using the same layout of gdal_grid -txe, -tye and -outsize options)
+def compute_grid_nodes(geox_out_2d, geoy_out_2d, grid_window=None):
+
+    geo_out_rows, geo_out_cols = geox_out_2d.shape[0], geox_out_2d.shape[1]
+
+    geox_out_min, geox_out_max = np.min(geox_out_2d), np.max(geox_out_2d)
+    geoy_out_min, geoy_out_max = np.min(geoy_out_2d), np.max(geoy_out_2d)
+
+    geox_out_step = (geox_out_max - geox_out_min) / geo_out_cols
+    geoy_out_step = (geoy_out_max - geoy_out_min) / geo_out_rows
+
+    # Nodes are defined at cell centers; rows are ordered from north to south (as the flipped gdal_grid output)
+    geox_nodes_1d = geox_out_min + (np.arange(geo_out_cols) + 0.5) * geox_out_step
+    geoy_nodes_1d = geoy_out_max - (np.arange(geo_out_rows) + 0.5) * geoy_out_step
+
+    # Nodes of a grid window [rows, cols] (nodes keep the position of the full grid)
+    if grid_window is not None:
+        geoy_nodes_1d = geoy_nodes_1d[grid_window[0]]
+        geox_nodes_1d = geox_nodes_1d[grid_window[1]]
+
+    return geox_nodes_1d, geoy_nodes_1d
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to compute point to grid interpolation weights (nearest and inverse distance to a power)
+def compute_point2grid_weights(geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d,
+                               interp_radius_x=None, interp_radius_y=None, interp_method='nearest',
+                               interp_power=2.0, interp_block_size=65536, interp_window=None):
+
+    geox_in_1d = np.asarray(geox_in_1d, dtype=np.float64)
+    geoy_in_1d = np.asarray(geoy_in_1d, dtype=np.float64)
+
+    geox_nodes_1d, geoy_nodes_1d = compute_grid_nodes(geox_out_2d, geoy_out_2d, grid_window=interp_window)
+    nodes_n = geox_nodes_1d.shape[0] * geoy_nodes_1d.shape[0]
+    points_n = geox_in_1d.shape[0]
+
+    if interp_method not in ['nearest', 'idw']:
+        logging.error(' ===> Interpolation method "' + str(interp_method) + '" is not allowed')
+        raise NotImplementedError('Interpolation method not implemented yet')
+
+    # Search ellipse (as gdal_grid, all points are used if one of the radius is equal to zero)
+    if (interp_radius_x > 0) and (interp_radius_y > 0):
+        search_radius = True
+        scale_x, scale_y = float(interp_radius_x), float(interp_radius_y)
+    else:
+        search_radius = False
+        scale_x, scale_y = 1.0, 1.0
+
+    # Points tree in the ellipse normalized space (ellipse becomes a unit circle)
+    if points_n > 0:
+        tree_points = cKDTree(np.column_stack([geox_in_1d / scale_x, geoy_in_1d / scale_y]))
+    else:
+        tree_points = None
+
+    idx_nodes_list, idx_points_list, weights_list = [], [], []
+    for node_start in range(0, nodes_n, interp_block_size):
+
+        block_idx = np.arange(node_start, np.minimum(node_start + interp_block_size, nodes_n))
+        block_x = geox_nodes_1d[block_idx % geox_nodes_1d.shape[0]]
+        block_y = geoy_nodes_1d[block_idx // geox_nodes_1d.shape[0]]
+
+        # Find node/point pair(s) inside the search ellipse
+        if tree_points is None:
+            break
+        elif search_radius:
+            tree_nodes = cKDTree(np.column_stack([block_x / scale_x, block_y / scale_y]))
+            pairs = tree_nodes.sparse_distance_matrix(tree_points, max_distance=1.0, output_type='ndarray')
+            pair_node, pair_point = pairs['i'].astype(np.int64), pairs['j'].astype(np.int64)
+        else:
+            pair_node = np.repeat(np.arange(block_idx.shape[0], dtype=np.int64), points_n)
+            pair_point = np.tile(np.arange(points_n, dtype=np.int64), block_idx.shape[0])
+
+        if pair_node.shape[0] == 0:
+            continue
+
+        pair_dx = block_x[pair_node] - geox_in_1d[pair_point]
+        pair_dy = block_y[pair_node] - geoy_in_1d[pair_point]
+        pair_r2 = pair_dx * pair_dx + pair_dy * pair_dy
+
+        if interp_method == 'nearest':
+
+            # Select the closest point for each node (ties are solved using the points order)
+            pair_order = np.lexsort((pair_point, pair_r2, pair_node))
+            pair_node, pair_point = pair_node[pair_order], pair_point[pair_order]
+            _, pair_first = np.unique(pair_node, return_index=True)
+            pair_node, pair_point = pair_node[pair_first], pair_point[pair_first]
+            pair_weight = np.ones(shape=[pair_node.shape[0]], dtype=np.float64)
+
+        else:
+
+            # Nodes overlapping a point take the point value (as gdal_grid invdist)
+            pair_hit = pair_r2 < 0.0000000000001
+            pair_weight = np.zeros(shape=[pair_node.shape[0]], dtype=np.float64)
+            pair_weight[~pair_hit] = 1.0 / np.power(pair_r2[~pair_hit], interp_power / 2.0)
+
+            if np.any(pair_hit):
+                node_hit = np.zeros(shape=[block_idx.shape[0]], dtype=bool)
+                node_hit[pair_node[pair_hit]] = True
+                pair_weight[node_hit[pair_node]] = 0.0
+
+                hit_index = np.flatnonzero(pair_hit)
+                hit_order = np.lexsort((pair_point[hit_index], pair_node[hit_index]))
+                hit_index = hit_index[hit_order]
+                _, hit_first = np.unique(pair_node[hit_index], return_index=True)
+                pair_weight[hit_index[hit_first]] = 1.0
+
+            # Normalize weights for each node
+            node_weight = np.bincount(pair_node, weights=pair_weight, minlength=block_idx.shape[0])
+            pair_weight = pair_weight / node_weight[pair_node]
+
+        idx_nodes_list.append(block_idx[pair_node])
+        idx_points_list.append(pair_point)
+        weights_list.append(pair_weight)
+
+    if idx_nodes_list:
+        idx_nodes = np.concatenate(idx_nodes_list)
+        idx_points = np.concatenate(idx_points_list)
+        weights = np.concatenate(weights_list)
+    else:
+        idx_nodes = np.zeros(shape=[0], dtype=np.int64)
+        idx_points = np.zeros(shape=[0], dtype=np.int64)
+        weights = np.zeros(shape=[0], dtype=np.float64)
+
+    interp_weights = csr_matrix((weights, (idx_nodes, idx_points)), shape=(nodes_n, points_n))
+    interp_valid = np.diff(interp_weights.indptr) > 0
+
+    return interp_weights, interp_valid
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to interpolate point data to grid (using gdal_grid executable)
+def interp_point2grid_gdal(data_in_1d, geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_2d, epsg_code='4326',
+                           interp_no_data=-9999.0, interp_radius_x=None, interp_radius_y=None,
+                           interp_method='nearest', interp_option=None,
+                           folder_tmp=None, var_name_data='values', var_name_geox='x', var_name_geoy='y',
+                           n_cpu=1):
+
     # Define layer name (using a random string)
     var_name_layer = random_string()
 
@@ -42,11 +385,6 @@ def interp_point2grid(data_in_1d, geox_in_1d, geoy_in_1d, geox_out_2d, geoy_out_
     if not os.path.exists(folder_tmp):
         make_folder(folder_tmp)
 
-    # Check interpolation radius x and y
-    if (interp_radius_x is None) or (interp_radius_y is None):
-        logging.error(' ===> Interpolation radius x or y are undefined.')
-        raise ValueError('Radius must be defined')
-
     # Define temporary file(s)
     file_name_csv = os.path.join(folder_tmp, var_name_layer + '.csv')
     file_name_vrt = os.path.join(folder_tmp, var_name_layer + '.vrt')
@@ -10,6 +10,7 @@ Version:       '1.0.0'
 #######################################################################################
 # Library
 import logging
+import hashlib
 import os
 import tempfile
 import rasterio
@@ -17,9 +18,11 @@ import rasterio
 import numpy as np
 
 from time import sleep
+from scipy.sparse import csr_matrix
 
 from lib_ws_generic import random_string, delete_folder, make_folder
 from lib_ws_process import exec_process
+from lib_ws_analysis_interpolation_point import update_point2grid_cache, interp_cache_lock
 
 # Debug
 import matplotlib.pylab as plt
@@ -105,9 +108,62 @@ def compute_predictor(file_path_in, file_path_out, command_line_data, command_li
 
 
 # -------------------------------------------------------------------------------------
-# Method to compute snow kernel
+# Method to define snow kernel cache key
+def define_kernel_key(ref_geo_data, ref_geo_y, geo_cellsize_x, geo_cellsize_y,
+                      var_index_x, var_index_y, radius_influnce, grid_window=None):
+
+    key_hash = hashlib.sha1()
+    key_hash.update(b'snow_kernel')
+    key_hash.update(np.asarray(ref_geo_data.shape, dtype=np.int64).tobytes())
+    key_hash.update(np.ascontiguousarray(ref_geo_y, dtype=np.float64).tobytes())
+    key_hash.update(np.asarray([geo_cellsize_x, geo_cellsize_y, radius_influnce], dtype=np.float64).tobytes())
+    key_hash.update(np.ascontiguousarray(var_index_x, dtype=np.float64).tobytes())
+    key_hash.update(np.ascontiguousarray(var_index_y, dtype=np.float64).tobytes())
+    if grid_window is not None:
+        key_hash.update(str([(grid_slice.start, grid_slice.stop) for grid_slice in grid_window]).encode('utf-8'))
+
+    return key_hash.hexdigest()
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to compute snow kernel (using cache if defined)
 def compute_kernel(ref_geo_data, ref_geo_x, ref_geo_y, geo_cellsize_x, geo_cellsize_y,
-                   var_index_x, var_index_y, radius_influnce):
+                   var_index_x, var_index_y, radius_influnce, kernel_cache=None, grid_window=None):
+
+    kernel_key, grid_weights = None, None
+    if kernel_cache is not None:
+
+        kernel_key = define_kernel_key(ref_geo_data, ref_geo_y, geo_cellsize_x, geo_cellsize_y,
+                                       var_index_x, var_index_y, radius_influnce, grid_window=grid_window)
+
+        with interp_cache_lock:
+            cache_data = kernel_cache['cache_data']
+            if kernel_key in cache_data:
+                grid_weights = cache_data[kernel_key].toarray()
+                cache_data.move_to_end(kernel_key)
+
+    if grid_weights is None:
+        grid_weights = compute_kernel_window(ref_geo_data, ref_geo_y, geo_cellsize_x, geo_cellsize_y,
+                                             var_index_x, var_index_y, radius_influnce, grid_window=grid_window)
+
+        if kernel_cache is not None:
+            with interp_cache_lock:
+                # Kernel is stored in sparse format (weights are zero outside the sensors radius)
+                kernel_cache['cache_data'][kernel_key] = csr_matrix(grid_weights)
+                kernel_cache['cache_updated'] = True
+                update_point2grid_cache(kernel_cache)
+
+    return grid_weights
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to compute snow kernel (only the window around each sensor is computed)
+def compute_kernel_window(ref_geo_data, ref_geo_y, geo_cellsize_x, geo_cellsize_y,
+                          var_index_x, var_index_y, radius_influnce, grid_window=None):
 
     # -------------------------------------------------------------------------------------
     # Dynamic values (NEW)
@@ -130,28 +186,61 @@ def compute_kernel(ref_geo_data, ref_geo_x, ref_geo_y, geo_cellsize_x, geo_cells
     # Pixel(s) interpolation
     pixel_distance = np.int32(radius_influnce * 1000 / geo_mm)
 
-    # Compute gridded indexes
+    # Compute gridded indexes (1d; the grid is never expanded)
     ref_index_x = np.linspace(0, ref_geo_data.shape[1], ref_geo_data.shape[1])
     ref_index_y = np.linspace(0, ref_geo_data.shape[0], ref_geo_data.shape[0])
-    grid_index_x, grid_index_y = np.meshgrid(ref_index_x, ref_index_y)
+
+    # Grid window [rows, cols] (indexes keep the values of the full grid)
+    if grid_window is None:
+        grid_window = (slice(0, ref_geo_data.shape[0]), slice(0, ref_geo_data.shape[1]))
+    grid_index_y, grid_index_x = ref_index_y[grid_window[0]], ref_index_x[grid_window[1]]
+    grid_start_y = grid_window[0].indices(ref_index_y.size)[0]
+    grid_start_x = grid_window[1].indices(ref_index_x.size)[0]
 
     # Cycle(s) on snow sensor(s)
-    grid_weights = np.zeros([ref_geo_data.shape[0], ref_geo_data.shape[1]])
+    grid_weights = np.zeros([grid_index_y.shape[0], grid_index_x.shape[0]])
     for index_x, index_y in zip(var_index_x, var_index_y):
 
-        # Compute distance index matrix
-        grid_index_distance = np.zeros([ref_geo_data.shape[0], ref_geo_data.shape[1]])
-        grid_index_distance = np.sqrt((grid_index_y - index_y) ** 2 + (grid_index_x - index_x) ** 2)
+        # Window of the pixel(s) that can be closer than pixel distance
+        window_x = find_kernel_window(ref_index_x, index_x, pixel_distance, grid_start_x, grid_index_x.size)
+        window_y = find_kernel_window(ref_index_y, index_y, pixel_distance, grid_start_y, grid_index_y.size)
 
-        # Weight(s) matrix
-        grid_index_pixels = np.zeros([ref_geo_data.shape[0], ref_geo_data.shape[1]])
-        grid_index_pixels = np.where(grid_index_distance < pixel_distance)
+        # Compute distance index matrix (window)
+        window_index_distance = np.sqrt((grid_index_y[window_y, np.newaxis] - index_y) ** 2 +
+                                        (grid_index_x[np.newaxis, window_x] - index_x) ** 2)
 
-        grid_weights[grid_index_pixels] = grid_weights[grid_index_pixels] + \
-            (pixel_distance ** 2 - grid_index_distance[grid_index_pixels] ** 2) /\
-            (pixel_distance ** 2 + grid_index_distance[grid_index_pixels] ** 2) / len(var_index_x)
+        # Weight(s) matrix (window)
+        window_weights = grid_weights[window_y, window_x]
+        window_index_pixels = np.where(window_index_distance < pixel_distance)
+
+        window_weights[window_index_pixels] = window_weights[window_index_pixels] + \
+            (pixel_distance ** 2 - window_index_distance[window_index_pixels] ** 2) /\
+            (pixel_distance ** 2 + window_index_distance[window_index_pixels] ** 2) / len(var_index_x)
 
     return grid_weights
     # --------------------------------------------------------------------------------
 
 # --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+# Method to find the window of a sensor along an index axis
+def find_kernel_window(ref_index, var_index, pixel_distance, grid_start=0, grid_size=None):
+
+    index_step = 1.0
+    if ref_index.size > 1:
+        index_step = ref_index[1] - ref_index[0]
+
+    # Window is enlarged of one pixel for each side (the distance check is done in the window)
+    index_start = int(max(np.floor((var_index - pixel_distance) / index_step) - 1, 0))
+    index_end = int(min(np.ceil((var_index + pixel_distance) / index_step) + 2, ref_index.size))
+
+    # Window is referred to the grid window
+    if grid_size is None:
+        grid_size = ref_index.size - grid_start
+    index_start = min(max(index_start - grid_start, 0), grid_size)
+    index_end = min(max(index_end - grid_start, index_start), grid_size)
+
+    return slice(index_start, index_end)
+
+# --------------------------------------------------------------------------------
@@ -110,3 +110,55 @@ def store_logging_file(logger_file, logger_ext='.old.{}', logger_file_max=12):
             if logger_file != logger_file_loop:
                 os.rename(logger_file, logger_file_loop)
 # -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Class to buffer logging record(s) of a worker process
+class BufferHandler(logging.Handler):
+
+    def __init__(self, level=logging.DEBUG):
+        super(BufferHandler, self).__init__(level=level)
+        self.records = []
+
+    def emit(self, record):
+        # Resolve message and exception (to pickle record to the parent process)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+    def flush_records(self):
+        records = self.records
+        self.records = []
+        return records
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to set logging buffer (in a worker process)
+def set_logging_buffer():
+
+    # Remove handle(s) inherited by the parent process
+    logger_root = logging.getLogger('')
+    for logger_handle in list(logger_root.handlers):
+        logger_root.removeHandler(logger_handle)
+
+    # Add buffer handle to logger
+    logger_buffer = BufferHandler()
+    logger_root.addHandler(logger_buffer)
+
+    return logger_buffer
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to emit logging record(s) buffered by a worker process
+def emit_logging_buffer(logger_records):
+    logger_root = logging.getLogger('')
+    for logger_record in logger_records:
+        logger_root.handle(logger_record)
+# -------------------------------------------------------------------------------------
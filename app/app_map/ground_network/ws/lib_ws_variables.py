@@ -24,6 +24,12 @@ import matplotlib.pylab as plt
 logging.getLogger('matplotlib').setLevel(logging.WARNING)
 #######################################################################################
 
+# -------------------------------------------------------------------------------------
+# Method(s) supporting 2d data [points, steps] (steps are computed together and returned as [rows, cols, steps])
+fx_batch_methods = ['compute_rain', 'compute_air_temperature', 'compute_wind_speed',
+                    'compute_incoming_radiation', 'compute_relative_humidity', 'compute_air_pressure']
+# -------------------------------------------------------------------------------------
+
 
 # -------------------------------------------------------------------------------------
 # Method to compute rain map
@@ -32,7 +38,7 @@ def compute_rain(var_data, var_geo_x, var_geo_y,
                  var_units='mm', var_missing_value=-9999.0, var_fill_value=-9999.0,
                  fx_nodata=-9999.0, fx_interp_name='idw',
                  fx_interp_radius_x=None, fx_interp_radius_y=None,
-                 fx_cpu=1):
+                 fx_interp_engine='native', fx_interp_cache=None, fx_cpu=1):
 
     if var_units is None:
         logging.warning(' ===> Rain variable unit is undefined; set to [mm]')
@@ -41,9 +47,9 @@ def compute_rain(var_data, var_geo_x, var_geo_y,
         logging.warning(' ===> Rain variable units in wrong format; expected in [mm], passed in [' +
                         var_units + ']')
 
-    if var_data.ndim > 1:
+    if var_data.ndim > 2:
         logging.error(' ===> Rain variable dimensions are not allowed')
-        raise IOError('Dimension must be equal to 1')
+        raise IOError('Dimension must be equal to 1 or 2 [points, steps]')
 
     if ref_geo_x.ndim == 1 and ref_geo_y.ndim == 1:
         grid_geo_x, grid_geo_y = np.meshgrid(ref_geo_x, ref_geo_y)
@@ -58,7 +64,9 @@ def compute_rain(var_data, var_geo_x, var_geo_y,
     grid_data = interp_point2grid(var_data, var_geo_x, var_geo_y, grid_geo_x, grid_geo_y, epsg_code=ref_epsg,
                                   interp_no_data=fx_nodata, interp_method=fx_interp_name,
                                   interp_radius_x=fx_interp_radius_x,
-                                  interp_radius_y=fx_interp_radius_y, n_cpu=fx_cpu)
+                                  interp_radius_y=fx_interp_radius_y,
+                                  interp_engine=fx_interp_engine, interp_cache=fx_interp_cache,
+                                  n_cpu=fx_cpu)
 
     # Filter data nan and over domain
     grid_data[np.isnan(grid_data)] = var_missing_value
@@ -76,7 +84,7 @@ def compute_air_temperature(var_data, var_geo_x, var_geo_y, var_geo_z,
                             var_units='C', var_missing_value=-9999.0, var_fill_value=-9999.0,
                             fx_nodata=-9999.0, fx_interp_name='idw',
                             fx_interp_radius_x=None, fx_interp_radius_y=None,
-                            fx_cpu=1):
+                            fx_interp_engine='native', fx_interp_cache=None, fx_cpu=1):
 
     if var_units is None:
         logging.warning(' ===> Air temperature variable unit is undefined; set to [C]')
@@ -85,9 +93,9 @@ def compute_air_temperature(var_data, var_geo_x, var_geo_y, var_geo_z,
         logging.warning(' ===> Air temperature variable units in wrong format; expected in [C], passed in [' +
                         var_units + ']')
 
-    if var_data.ndim > 1:
+    if var_data.ndim > 2:
         logging.error(' ===> Air temperature variable dimensions are not allowed')
-        raise IOError('Dimension must be equal to 1')
+        raise IOError('Dimension must be equal to 1 or 2 [points, steps]')
 
     if ref_geo_x.ndim == 1 and ref_geo_y.ndim == 1:
         grid_geo_x, grid_geo_y = np.meshgrid(ref_geo_x, ref_geo_y)
@@ -107,9 +115,15 @@ def compute_air_temperature(var_data, var_geo_x, var_geo_y, var_geo_z,
     var_geo_z_sort = var_geo_z[var_index_sort]
     var_data_sort = var_data[var_index_sort]
 
+    # Define altitude(s) for fitting 1d data [points] or 2d data [points, steps]
+    if var_data_sort.ndim == 1:
+        var_geo_z_fit, ref_geo_z_fit = var_geo_z_sort, ref_geo_z
+    else:
+        var_geo_z_fit, ref_geo_z_fit = var_geo_z_sort[:, np.newaxis], ref_geo_z[:, :, np.newaxis]
+
     # Polyfit parameters and value(s) (--> linear regression)
     var_poly_parameters = np.polyfit(var_geo_z_sort, var_data_sort, 1)
-    var_poly_values = np.polyval(var_poly_parameters, var_geo_z_sort)
+    var_poly_values = np.polyval(var_poly_parameters, var_geo_z_fit)
 
     # Define residual for point value(s)
     var_data_res = var_data_sort - var_poly_values
@@ -119,10 +133,12 @@ def compute_air_temperature(var_data, var_geo_x, var_geo_y, var_geo_z,
                                       epsg_code=ref_epsg,
                                       interp_no_data=fx_nodata, interp_method=fx_interp_name,
                                       interp_radius_x=fx_interp_radius_x,
-                                      interp_radius_y=fx_interp_radius_y, n_cpu=fx_cpu)
+                                      interp_radius_y=fx_interp_radius_y,
+                                      interp_engine=fx_interp_engine, interp_cache=fx_interp_cache,
+                                      n_cpu=fx_cpu)
 
     # Interpolate polynomial parameters on z map
-    grid_poly_z = np.polyval(var_poly_parameters, ref_geo_z)
+    grid_poly_z = np.polyval(var_poly_parameters, ref_geo_z_fit)
 
     # Calculate temperature (using z regression and idw method(s))
     grid_data = grid_poly_z + grid_data_res
@@ -150,7 +166,7 @@ def compute_wind_speed(var_data, var_geo_x, var_geo_y,
                        var_units='m s-1', var_missing_value=-9999.0, var_fill_value=-9999.0,
                        fx_nodata=-9999.0, fx_interp_name='idw',
                        fx_interp_radius_x=None, fx_interp_radius_y=None,
-                       fx_cpu=1):
+                       fx_interp_engine='native', fx_interp_cache=None, fx_cpu=1):
 
     if var_units is None:
         logging.warning(' ===> Wind speed variable unit is undefined; set to [m s-1]')
@@ -159,9 +175,9 @@ def compute_wind_speed(var_data, var_geo_x, var_geo_y,
         logging.warning(' ===> Wind speed variable units in wrong format; expected in [m s-1], passed in [' +
                         var_units + ']')
 
-    if var_data.ndim > 1:
+    if var_data.ndim > 2:
         logging.error(' ===> Wind speed variable dimensions are not allowed')
-        raise IOError('Dimension must be equal to 1')
+        raise IOError('Dimension must be equal to 1 or 2 [points, steps]')
 
     if ref_geo_x.ndim == 1 and ref_geo_y.ndim == 1:
         grid_geo_x, grid_geo_y = np.meshgrid(ref_geo_x, ref_geo_y)
@@ -176,7 +192,9 @@ def compute_wind_speed(var_data, var_geo_x, var_geo_y,
     grid_data = interp_point2grid(var_data, var_geo_x, var_geo_y, grid_geo_x, grid_geo_y, epsg_code=ref_epsg,
                                   interp_no_data=fx_nodata, interp_method=fx_interp_name,
                                   interp_radius_x=fx_interp_radius_x,
-                                  interp_radius_y=fx_interp_radius_y, n_cpu=fx_cpu)
+                                  interp_radius_y=fx_interp_radius_y,
+                                  interp_engine=fx_interp_engine, interp_cache=fx_interp_cache,
+                                  n_cpu=fx_cpu)
 
     # Filter data nan and over domain
     grid_data[np.isnan(grid_data)] = var_missing_value
@@ -201,7 +219,7 @@ def compute_incoming_radiation(var_data, var_geo_x, var_geo_y,
                                var_units='W m-2', var_missing_value=-9999.0, var_fill_value=-9999.0,
                                fx_nodata=-9999.0, fx_interp_name='idw',
                                fx_interp_radius_x=None, fx_interp_radius_y=None,
-                               fx_cpu=1):
+                               fx_interp_engine='native', fx_interp_cache=None, fx_cpu=1):
 
     if var_units is None:
         logging.warning(' ===> Incoming radiation variable unit is undefined; set to [W m-2]')
@@ -210,9 +228,9 @@ def compute_incoming_radiation(var_data, var_geo_x, var_geo_y,
         logging.warning(' ===> Incoming radiation variable units in wrong format; expected in [W m-2], passed in [' +
                         var_units + ']')
 
-    if var_data.ndim > 1:
+    if var_data.ndim > 2:
         logging.error(' ===> Incoming radiation variable dimensions are not allowed')
-        raise IOError('Dimension must be equal to 1')
+        raise IOError('Dimension must be equal to 1 or 2 [points, steps]')
 
     if ref_geo_x.ndim == 1 and ref_geo_y.ndim == 1:
         grid_geo_x, grid_geo_y = np.meshgrid(ref_geo_x, ref_geo_y)
@@ -227,7 +245,9 @@ def compute_incoming_radiation(var_data, var_geo_x, var_geo_y,
     grid_data = interp_point2grid(var_data, var_geo_x, var_geo_y, grid_geo_x, grid_geo_y, epsg_code=ref_epsg,
                                   interp_no_data=fx_nodata, interp_method=fx_interp_name,
                                   interp_radius_x=fx_interp_radius_x,
-                                  interp_radius_y=fx_interp_radius_y, n_cpu=fx_cpu)
+                                  interp_radius_y=fx_interp_radius_y,
+                                  interp_engine=fx_interp_engine, interp_cache=fx_interp_cache,
+                                  n_cpu=fx_cpu)
 
     # Filter data nan and over domain
     grid_data[np.isnan(grid_data)] = var_missing_value
@@ -252,7 +272,7 @@ def compute_relative_humidity(var_data, var_geo_x, var_geo_y,
                               var_units='%', var_missing_value=-9999.0, var_fill_value=-9999.0,
                               fx_nodata=-9999.0, fx_interp_name='idw',
                               fx_interp_radius_x=None, fx_interp_radius_y=None,
-                              fx_cpu=1):
+                              fx_interp_engine='native', fx_interp_cache=None, fx_cpu=1):
 
     if var_units is None:
         logging.warning(' ===> Relative humidity variable unit is undefined; set to [%]')
@@ -261,9 +281,9 @@ def compute_relative_humidity(var_data, var_geo_x, var_geo_y,
         logging.warning(' ===> Relative humidity variable units in wrong format; expected in [%], passed in [' +
                         var_units + ']')
 
-    if var_data.ndim > 1:
+    if var_data.ndim > 2:
         logging.error(' ===> Relative humidity variable dimensions are not allowed')
-        raise IOError('Dimension must be equal to 1')
+        raise IOError('Dimension must be equal to 1 or 2 [points, steps]')
 
     if ref_geo_x.ndim == 1 and ref_geo_y.ndim == 1:
         grid_geo_x, grid_geo_y = np.meshgrid(ref_geo_x, ref_geo_y)
@@ -278,7 +298,9 @@ def compute_relative_humidity(var_data, var_geo_x, var_geo_y,
     grid_data = interp_point2grid(var_data, var_geo_x, var_geo_y, grid_geo_x, grid_geo_y, epsg_code=ref_epsg,
                                   interp_no_data=fx_nodata, interp_method=fx_interp_name,
                                   interp_radius_x=fx_interp_radius_x,
-                                  interp_radius_y=fx_interp_radius_y, n_cpu=fx_cpu)
+                                  interp_radius_y=fx_interp_radius_y,
+                                  interp_engine=fx_interp_engine, interp_cache=fx_interp_cache,
+                                  n_cpu=fx_cpu)
 
     # Filter data nan and over domain
     grid_data[np.isnan(grid_data)] = var_missing_value
@@ -303,7 +325,7 @@ def compute_air_pressure(var_data, var_geo_x, var_geo_y,
                          var_units='hPa', var_missing_value=-9999.0, var_fill_value=-9999.0,
                          fx_nodata=-9999.0, fx_interp_name='idw',
                          fx_interp_radius_x=None, fx_interp_radius_y=None,
-                         fx_cpu=1):
+                         fx_interp_engine='native', fx_interp_cache=None, fx_cpu=1):
 
     if var_units is None:
         logging.warning(' ===> Air pressure variable unit is undefined; set to [hPa]')
@@ -312,9 +334,9 @@ def compute_air_pressure(var_data, var_geo_x, var_geo_y,
         logging.warning(' ===> Air pressure variable units in wrong format; expected in [hPa], passed in [' +
                         var_units + ']')
 
-    if var_data.ndim > 1:
+    if var_data.ndim > 2:
         logging.error(' ===> Air pressure variable dimensions are not allowed')
-        raise IOError('Dimension must be equal to 1')
+        raise IOError('Dimension must be equal to 1 or 2 [points, steps]')
 
     if ref_geo_x.ndim == 1 and ref_geo_y.ndim == 1:
         grid_geo_x, grid_geo_y = np.meshgrid(ref_geo_x, ref_geo_y)
@@ -329,7 +351,9 @@ def compute_air_pressure(var_data, var_geo_x, var_geo_y,
     grid_data = interp_point2grid(var_data, var_geo_x, var_geo_y, grid_geo_x, grid_geo_y, epsg_code=ref_epsg,
                                   interp_no_data=fx_nodata, interp_method=fx_interp_name,
                                   interp_radius_x=fx_interp_radius_x,
-                                  interp_radius_y=fx_interp_radius_y, n_cpu=fx_cpu)
+                                  interp_radius_y=fx_interp_radius_y,
+                                  interp_engine=fx_interp_engine, interp_cache=fx_interp_cache,
+                                  n_cpu=fx_cpu)
 
     # Filter data nan and over domain
     grid_data[np.isnan(grid_data)] = var_missing_value
@@ -14,6 +14,9 @@ import os
 
 from lib_info_args import logger_name
 from lib_data_io_geo import read_grid_data, create_grid_data
+from lib_data_io_pickle import read_file_obj
+from lib_utils_geo import create_resample_cache
+from lib_fx_astronomic_radiation import define_geometry_key, check_geometry_tables, write_geometry_tables
 
 # set logger
 alg_logger = logging.getLogger(logger_name)
@@ -37,6 +40,14 @@ class DrvData:
         self.alg_datasets = alg_settings[tag_section_datasets]['static']
         self.alg_grid_source = self.alg_datasets['grid_source']
         self.alg_grid_destination = self.alg_datasets['grid_destination']
+        if 'grid_resample' in list(self.alg_datasets.keys()):
+            self.alg_grid_resample = self.alg_datasets['grid_resample']
+        else:
+            self.alg_grid_resample = None
+        if 'grid_geometry' in list(self.alg_datasets.keys()):
+            self.alg_grid_geometry = self.alg_datasets['grid_geometry']
+        else:
+            self.alg_grid_geometry = None
         self.alg_log = alg_settings[tag_section_log]
 
         # get geo grid source information
@@ -61,6 +72,23 @@ class DrvData:
             self.geo_y_res_dst = self.alg_grid_destination['geo_y_res']
             self.grid_dst_type = 'geo'
 
+        # get geo grid resample information (index cache shared by the run(s))
+        self.file_path_resample, self.cache_size_resample = None, 10
+        if self.alg_grid_resample is not None:
+            folder_name_resample = self.alg_grid_resample['folder_name']
+            file_name_resample = self.alg_grid_resample['file_name']
+            if folder_name_resample is not None and file_name_resample is not None:
+                self.file_path_resample = os.path.join(folder_name_resample, file_name_resample)
+            if 'cache_size' in list(self.alg_grid_resample.keys()):
+                self.cache_size_resample = self.alg_grid_resample['cache_size']
+
+        # get geo grid geometry information (solar geometry tables of the destination grid)
+        self.folder_name_geometry, self.table_daily_geometry = None, False
+        if self.alg_grid_geometry is not None:
+            self.folder_name_geometry = self.alg_grid_geometry['folder_name']
+            if 'table_daily' in list(self.alg_grid_geometry.keys()):
+                self.table_daily_geometry = self.alg_grid_geometry['table_daily']
+
     # method to organize data
     def organize_data(self):
 
@@ -94,6 +122,29 @@ class DrvData:
             alg_logger.error(' ===> Destination grid type is not correctly defined')
             raise NotImplementedError('Case not implemented yet')
 
+        # define resample index cache
+        resample_cache = create_resample_cache(cache_size=self.cache_size_resample)
+        if self.file_path_resample is not None and os.path.exists(self.file_path_resample):
+            cache_obj = read_file_obj(self.file_path_resample)
+            if isinstance(cache_obj, dict) and 'cache_data' in list(cache_obj.keys()):
+                resample_cache = create_resample_cache(cache_obj, cache_size=self.cache_size_resample)
+                alg_logger.info(' ----> Resample index cache "' + self.file_path_resample + '" loaded (' +
+                                str(resample_cache['cache_data'].__len__()) + ' grid pairs)')
+            else:
+                alg_logger.warning(' ===> Resample index cache "' + self.file_path_resample +
+                                   '" is not in the expected format; index(es) will be computed')
+
+        # define solar geometry tables
+        geometry_folder = None
+        if self.folder_name_geometry is not None:
+            geometry_folder = os.path.join(
+                self.folder_name_geometry, define_geometry_key(geo_x_grid_dst, geo_y_grid_dst))
+            if not check_geometry_tables(geometry_folder, table_daily=self.table_daily_geometry):
+                alg_logger.info(' ----> Solar geometry tables "' + geometry_folder + '" ... ')
+                write_geometry_tables(geometry_folder, geo_x_grid_dst, geo_y_grid_dst,
+                                      table_daily=self.table_daily_geometry)
+                alg_logger.info(' ----> Solar geometry tables "' + geometry_folder + '" ... DONE')
+
         # organize grid obj
         grid_obj = {
             'grid_geo_values_dst': geo_values_dst,
@@ -102,7 +153,9 @@ class DrvData:
             'grid_geo_x_min_dst': geo_x_min_dst, 'grid_geo_x_max_dst': geo_x_max_dst,
             'grid_geo_y_min_dst': geo_y_min_dst, 'grid_geo_y_max_dst': geo_y_max_dst,
             'transform_src': None, 'proj_src': None,
-            'transform_dst': None, 'proj_dst': None}
+            'transform_dst': None, 'proj_dst': None,
+            'grid_resample_cache': resample_cache, 'grid_resample_file': self.file_path_resample,
+            'grid_geometry_folder': geometry_folder}
 
         # info end method
         alg_logger.info(' ---> Organize static datasets ... DONE')
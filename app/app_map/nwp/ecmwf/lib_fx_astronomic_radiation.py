@@ -11,6 +11,9 @@ Version:        '2.1.0'
 # ----------------------------------------------------------------------------------------------------------------------
 # logging
 import logging
+import hashlib
+import os
+import shutil
 
 import pandas as pd
 import numpy as np
@@ -31,6 +34,10 @@ lookup_table_cf_default = {
     'CF_L4': {'Rain': [5, 10],   	'CloudFactor': [0.50]},
     'CF_L5': {'Rain': [10, None],   'CloudFactor': [0.15]}
 }
+
+# solar geometry table(s) (stored for each domain grid)
+geometry_tables_default = ['geo_lz', 'geo_lm', 'geo_phi', 'geo_phi_sin', 'geo_phi_cos']
+geometry_table_daily = 'ar_daily'
 # ----------------------------------------------------------------------------------------------------------------------
 
 
@@ -39,65 +46,71 @@ lookup_table_cf_default = {
 def exec_astronomic_radiation(var_data_cf,
                               geo_z,
                               time_period, time_delta,
-                              geo_lz, geo_lm, geo_phi, param_gsc, param_as, param_bs):
+                              geo_lz, geo_lm, geo_phi, param_gsc, param_as, param_bs,
+                              geo_phi_sin=None, geo_phi_cos=None, time_chunk=None, var_dtype=np.float32):
 
     # time information
     seconds_delta = time_delta.seconds
     time_delta_mid_t = time_delta.seconds / 3600 # in hour
     minutes_input_step = time_delta.seconds / 60 # in minute?
 
-    # iterate on time steps
-    var_model_k_avg = np.zeros([time_period.__len__()])
-    var_model_ar_avg = np.zeros([time_period.__len__()])
-    var_model_k = np.zeros([time_period.__len__(), geo_z.shape[0], geo_z.shape[1]])
-    var_model_ar = np.zeros([time_period.__len__(), geo_z.shape[0], geo_z.shape[1]])
-    for time_id, time_step in enumerate(time_period):
-
-        # compute cloud factor
-        var_data_cf_step = var_data_cf[time_id, :, :]
-
-        # compute time information
-        time_delta_mid = time_delta / 2
-        time_mid = pd.Timestamp(time_step - time_delta_mid)
-        hour_mid = time_mid.hour
-        doy_mid = time_mid.dayofyear
-
-        # inverse relative distance Earth-Sun
-        ird = 1.0 + 0.033 * np.cos(2 * np.pi / 365 * doy_mid)
-        b = 2 * np.pi * (doy_mid - 81) / 364.0
-
-        # seasonal correction for solar time [h]
-        solar_corr = 0.1645 * np.sin(2 * b) - 0.1255 * np.cos(b) - 0.025 * np.sin(b)
-
-        # solar declination [rad]
-        solar_decl = 0.4093 * np.sin(2 * np.pi / 365 * doy_mid - 1.405)
-
-        # solar time angle at midpoint of hourly or shorter period [rad]
-        solar_time_angle = np.pi / 12.0 * (hour_mid + 0.06667 * (geo_lz - geo_lm) + solar_corr - 12.0)
-
-        # solar time angle at beginning of period [rad]
-        solar_time_angle_start = solar_time_angle - np.pi * time_delta_mid_t / 24.0
-        # solar time angle at end of period [rad]
-        solar_time_angle_end = solar_time_angle + np.pi * time_delta_mid_t / 24.0
-
-        # extraterrestrial Radiation [MJ/m^2/interval] (Duffie & Beckman, 1980)
-        var_model_ar_step = (12 * minutes_input_step / np.pi * param_gsc * ird * (
-            (solar_time_angle_end - solar_time_angle_start) * np.sin(geo_phi) * np.sin(solar_decl) +
-            np.cos(geo_phi) * np.cos(solar_decl) * (np.sin(solar_time_angle_end) - np.sin(solar_time_angle_start))))
-
-        # extraterrestrial Radiation [W/m^2] --> Incoming radiation
-        var_model_ar_step = var_model_ar_step * 10 ** 6 / seconds_delta
-        var_model_ar_step[var_model_ar_step <= 0.0] = 0.0
-        var_model_ar_step[np.isnan(var_data_cf_step)] = np.nan
+    # latitude terms (if not precomputed)
+    if geo_phi_sin is None:
+        geo_phi_sin = np.sin(geo_phi)
+    if geo_phi_cos is None:
+        geo_phi_cos = np.cos(geo_phi)
+
+    # time terms (1d arrays referred to the midpoint of each period)
+    time_mid = pd.DatetimeIndex(time_period) - time_delta / 2
+    hour_mid = np.asarray(time_mid.hour, dtype=np.float64)
+    doy_mid = np.asarray(time_mid.dayofyear, dtype=np.float64)
+
+    # inverse relative distance Earth-Sun
+    ird = 1.0 + 0.033 * np.cos(2 * np.pi / 365 * doy_mid)
+    b = 2 * np.pi * (doy_mid - 81) / 364.0
+    # seasonal correction for solar time [h]
+    solar_corr = 0.1645 * np.sin(2 * b) - 0.1255 * np.cos(b) - 0.025 * np.sin(b)
+    # solar declination [rad]
+    solar_decl = 0.4093 * np.sin(2 * np.pi / 365 * doy_mid - 1.405)
+
+    # solar time angle at midpoint of period [rad] (time and geographical part)
+    solar_time_angle_t = np.pi / 12.0 * (hour_mid + solar_corr - 12.0)
+    solar_time_angle_geo = np.pi / 12.0 * (0.06667 * (geo_lz - geo_lm))
+
+    # extraterrestrial radiation factor(s) [W/m^2] (Duffie & Beckman, 1980)
+    # angle(end) - angle(start) = pi * dt / 12; sin(end) - sin(start) = 2 * sin(pi * dt / 24) * cos(angle)
+    ar_factor = 12 * minutes_input_step / np.pi * param_gsc * ird * 10 ** 6 / seconds_delta
+    ar_term_sin = ar_factor * (np.pi * time_delta_mid_t / 12.0) * np.sin(solar_decl)
+    ar_term_cos = ar_factor * 2.0 * np.sin(np.pi * time_delta_mid_t / 24.0) * np.cos(solar_decl)
+
+    # clear-sky factor
+    geo_k_factor = param_as + param_bs * geo_z
+
+    # iterate on time chunks (all steps at once if chunk is not defined)
+    time_steps = time_period.__len__()
+    if time_chunk is None or time_chunk <= 0:
+        time_chunk = max(time_steps, 1)
+
+    var_model_k = np.empty([time_steps, geo_z.shape[0], geo_z.shape[1]], dtype=var_dtype)
+    var_model_ar = np.empty([time_steps, geo_z.shape[0], geo_z.shape[1]], dtype=var_dtype)
+    for chunk_start in range(0, time_steps, time_chunk):
+        chunk_slice = slice(chunk_start, min(chunk_start + time_chunk, time_steps))
+
+        # extraterrestrial radiation [W/m^2] --> incoming radiation
+        var_model_ar_chunk = solar_time_angle_t[chunk_slice, np.newaxis, np.newaxis] + solar_time_angle_geo
+        np.cos(var_model_ar_chunk, out=var_model_ar_chunk)
+        var_model_ar_chunk *= ar_term_cos[chunk_slice, np.newaxis, np.newaxis] * geo_phi_cos
+        var_model_ar_chunk += ar_term_sin[chunk_slice, np.newaxis, np.newaxis] * geo_phi_sin
+        var_model_ar_chunk[var_model_ar_chunk <= 0.0] = 0.0
+
+        var_data_cf_chunk = var_data_cf[chunk_slice, :, :]
+        var_model_ar_chunk[np.isnan(var_data_cf_chunk)] = np.nan
+        var_model_ar[chunk_slice, :, :] = var_model_ar_chunk
 
         # clear-sky shortwave radiation
-        var_model_k_step = var_data_cf_step * (param_as + param_bs * geo_z) * var_model_ar_step
-
-        # store K and AR results
-        var_model_k_avg[time_id] = np.nanmean(var_model_k_step)
-        var_model_ar_avg[time_id] = np.nanmean(var_model_ar_step)
-        var_model_k[time_id, :, :] = var_model_k_step
-        var_model_ar[time_id, :, :] = var_model_ar_step
+        var_model_ar_chunk *= var_data_cf_chunk
+        var_model_ar_chunk *= geo_k_factor
+        var_model_k[chunk_slice, :, :] = var_model_ar_chunk
 
     return var_model_ar, var_model_k
 # ----------------------------------------------------------------------------------------------------------------------
@@ -110,11 +123,6 @@ def define_parameters(geo_x, geo_y):
     # degree to rad factor
     tor = np.pi / 180.0
 
-    # gsc solar constant =MJ m-2 day-1
-    gsc = 118.08
-    # gsc solar constant =MJ m-2 min-1
-    arad_param_gsc = gsc / (60.0 * 24.0)
-
     # longitude of the centre of the local time zone
     geo_lz = np.round(geo_x / 15) * 15
 
@@ -122,13 +130,127 @@ def define_parameters(geo_x, geo_y):
     geo_lm = 360.0 - geo_x
     # latitude [rad]
     geo_phi = geo_y * tor
+    geo_phi_sin, geo_phi_cos = np.sin(geo_phi), np.cos(geo_phi)
+
+    # astronomic constant(s)
+    arad_param_gsc, arad_param_as, arad_param_bs = define_constants()
+
+    return (geo_lz, geo_lm, geo_phi, geo_phi_sin, geo_phi_cos,
+            arad_param_gsc, arad_param_as, arad_param_bs)
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to define constants for astronomic radiation computation
+def define_constants():
+
+    # gsc solar constant =MJ m-2 day-1
+    gsc = 118.08
+    # gsc solar constant =MJ m-2 min-1
+    arad_param_gsc = gsc / (60.0 * 24.0)
 
     # K astronomic parameter(s)
     arad_param_as = 0.65
     arad_param_bs = 2.0 * 10e-5
 
-    return geo_lz, geo_lm, geo_phi, arad_param_gsc, arad_param_as, arad_param_bs
+    return arad_param_gsc, arad_param_as, arad_param_bs
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to compute daily extraterrestrial radiation by day of year [MJ m-2 day-1] (by FAO algorithm)
+def compute_daily_radiation(geo_phi, geo_phi_sin, geo_phi_cos, param_gsc, doy_max=366, var_dtype=np.float32):
+
+    var_model_ar_daily = np.empty([doy_max, geo_phi.shape[0], geo_phi.shape[1]], dtype=var_dtype)
+    geo_phi_tan = np.tan(geo_phi)
+    for doy_id, doy_step in enumerate(range(1, doy_max + 1)):
+
+        # inverse relative distance Earth-Sun and solar declination [rad]
+        ird = 1.0 + 0.033 * np.cos(2 * np.pi / 365 * doy_step)
+        solar_decl = 0.4093 * np.sin(2 * np.pi / 365 * doy_step - 1.405)
+
+        # sunset hour angle [rad]
+        solar_ws = np.arccos(np.clip(-geo_phi_tan * np.tan(solar_decl), -1.0, 1.0))
+
+        var_model_ar_daily[doy_id, :, :] = 24 * 60 / np.pi * param_gsc * ird * (
+            solar_ws * geo_phi_sin * np.sin(solar_decl) + geo_phi_cos * np.cos(solar_decl) * np.sin(solar_ws))
+
+    return var_model_ar_daily
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to define solar geometry key (hash of the domain grid)
+def define_geometry_key(geo_x, geo_y):
+
+    key_hash = hashlib.sha1()
+    for geo_values in [geo_x, geo_y]:
+        geo_values = np.asarray(geo_values, dtype=np.float64)
+        key_hash.update(str(geo_values.shape).encode('utf-8'))
+        key_hash.update(np.ascontiguousarray(geo_values).tobytes())
 
+    return key_hash.hexdigest()
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to check solar geometry tables
+def check_geometry_tables(folder_name, table_daily=False):
+
+    table_list = list(geometry_tables_default)
+    if table_daily:
+        table_list.append(geometry_table_daily)
+
+    return all([os.path.exists(os.path.join(folder_name, table_name + '.npy')) for table_name in table_list])
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to write solar geometry tables (one npy file for each table)
+def write_geometry_tables(folder_name, geo_x, geo_y, table_daily=False):
+
+    (geo_lz, geo_lm, geo_phi, geo_phi_sin, geo_phi_cos,
+     arad_param_gsc, _, _) = define_parameters(geo_x, geo_y)
+
+    table_collections = {'geo_lz': geo_lz, 'geo_lm': geo_lm, 'geo_phi': geo_phi,
+                         'geo_phi_sin': geo_phi_sin, 'geo_phi_cos': geo_phi_cos}
+    if table_daily:
+        table_collections[geometry_table_daily] = compute_daily_radiation(
+            geo_phi, geo_phi_sin, geo_phi_cos, arad_param_gsc)
+
+    # tables are moved in a single step (folder can be shared by the run(s))
+    folder_name_tmp = folder_name + '.' + str(os.getpid()) + '.tmp'
+    os.makedirs(folder_name_tmp, exist_ok=True)
+    for table_name, table_values in table_collections.items():
+        np.save(os.path.join(folder_name_tmp, table_name + '.npy'), np.ascontiguousarray(table_values))
+
+    if os.path.exists(folder_name):
+        shutil.rmtree(folder_name, ignore_errors=True)
+    try:
+        os.replace(folder_name_tmp, folder_name)
+    except OSError:
+        log_stream.warning(' ===> Solar geometry tables "' + folder_name + '" already defined by another run')
+        shutil.rmtree(folder_name_tmp, ignore_errors=True)
+
+    return folder_name
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to read solar geometry tables (memory-mapped)
+def read_geometry_tables(folder_name, mmap_mode='r'):
+
+    table_collections = {}
+    for table_name in geometry_tables_default + [geometry_table_daily]:
+        file_name = os.path.join(folder_name, table_name + '.npy')
+        if os.path.exists(file_name):
+            table_collections[table_name] = np.load(file_name, mmap_mode=mmap_mode)
+        elif table_name in geometry_tables_default:
+            log_stream.warning(' ===> Solar geometry table "' + file_name + '" not found')
+            return None
+
+    return table_collections
 # ----------------------------------------------------------------------------------------------------------------------
 
 
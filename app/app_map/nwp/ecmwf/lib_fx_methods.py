@@ -21,7 +21,7 @@ from copy import deepcopy
 import lib_fx_nwp_generic as lib_fx_nwp
 
 from lib_utils_io import create_darray
-from lib_utils_geo import resample_points_to_grid
+from lib_utils_geo import resample_points_to_grid, create_resample_cache, get_resample_index
 from lib_info_args import logger_name
 
 # set logger
@@ -133,9 +133,13 @@ def extract_data(obj_collections_src,
 # ----------------------------------------------------------------------------------------------------------------------
 # method to resample data
 def resample_data(obj_data_src, geo_x_values_src, geo_y_values_src, geo_x_values_dst, geo_y_values_dst,
-                  geo_resample_idx=True,
+                  geo_resample_idx=True, geo_resample_cache=None,
                   geo_mask_dst=None, **kwargs):
 
+    # index is shared by the variable(s) with the same search settings (also if the cache is not defined)
+    if geo_resample_idx and geo_resample_cache is None:
+        geo_resample_cache = create_resample_cache(cache_size=None)
+
     # iterate over variable(s)
     obj_data_dst = {}
     for var_name, var_values_src in obj_data_src.items():
@@ -148,33 +152,34 @@ def resample_data(obj_data_src, geo_x_values_src, geo_y_values_src, geo_x_values
 
             idx_1d_dst = None
             if geo_resample_idx:
+                idx_1d_dst = get_resample_index(
+                    geo_x_values_src, geo_y_values_src, geo_x_values_dst, geo_y_values_dst,
+                    resample_cache=geo_resample_cache, **var_settings)
 
-                idx_1d_src = np.arange(0, geo_y_values_src.shape[0] * geo_x_values_src.shape[1])
-                idx_2d_src = np.reshape(idx_1d_src, [geo_y_values_src.shape[0], geo_x_values_src.shape[1]])
-
-                idx_2d_dst, _, _ = resample_points_to_grid(
-                    idx_2d_src, geo_x_values_src, geo_y_values_src, geo_x_values_dst, geo_y_values_dst,
-                    **var_settings)
-
-                idx_1d_dst = idx_2d_dst.ravel()
-                idx_1d_dst = np.asarray(idx_1d_dst, dtype=int)
-
-            var_values_dst = np.zeros((var_values_src.shape[0], geo_y_values_dst.shape[0], geo_x_values_dst.shape[1]))
-            for n in range(0, var_values_src.shape[0]):
+            var_n_time, var_n_rows, var_n_cols = (
+                var_values_src.shape[0], geo_y_values_dst.shape[0], geo_x_values_dst.shape[1])
 
-                if idx_1d_dst is None:
+            if idx_1d_dst is None:
+                var_values_dst = np.zeros((var_n_time, var_n_rows, var_n_cols))
+                for n in range(0, var_n_time):
                     var_values_tmp, _, _ = resample_points_to_grid(
                         var_values_src[n, :, :], geo_x_values_src, geo_y_values_src, geo_x_values_dst, geo_y_values_dst,
                         **var_settings)
-                else:
-                    var_arr_src = var_values_src[n, :, :].ravel()
-                    var_arr_dst = var_arr_src[idx_1d_dst]
-                    var_values_tmp = np.reshape(var_arr_dst, [geo_x_values_dst.shape[0], geo_y_values_dst.shape[1]])
+                    var_values_dst[n, :, :] = np.flipud(var_values_tmp)
+            else:
+                # flip of the destination grid is folded in the index (all time steps are taken at once)
+                idx_1d_flip = np.reshape(idx_1d_dst, [var_n_rows, var_n_cols])[::-1, :].ravel()
 
-                var_values_tmp = np.flipud(var_values_tmp)
-                var_values_tmp[geo_mask_dst == 0] = np.nan
+                var_values_2d_src = np.reshape(var_values_src, [var_n_time, -1])
+                var_values_2d_dst = np.empty((var_n_time, var_n_rows * var_n_cols), dtype=np.float64)
+                if var_values_2d_src.dtype == var_values_2d_dst.dtype:
+                    np.take(var_values_2d_src, idx_1d_flip, axis=1, out=var_values_2d_dst)
+                else:
+                    var_values_2d_dst[:] = np.take(var_values_2d_src, idx_1d_flip, axis=1)
+                var_values_dst = np.reshape(var_values_2d_dst, [var_n_time, var_n_rows, var_n_cols])
 
-                var_values_dst[n, :, :] = var_values_tmp
+            if geo_mask_dst is not None:
+                var_values_dst[:, geo_mask_dst == 0] = np.nan
 
             ''' debug
             import matplotlib
@@ -295,7 +300,7 @@ def organize_time(obj_time, time_index='time_creation'):
 # ----------------------------------------------------------------------------------------------------------------------
 # method to compose data (from multiple variables to one variable for example)
 def compose_data(obj_data_src, obj_attrs_src, obj_time_src, obj_method,
-                 geo_terrain_ref=None, geo_x_ref=None, geo_y_ref=None):
+                 geo_terrain_ref=None, geo_x_ref=None, geo_y_ref=None, geo_tables_ref=None):
 
     # iterate over variable(s)
     for var_name, var_method in obj_method.items():
@@ -326,7 +331,11 @@ def compose_data(obj_data_src, obj_attrs_src, obj_time_src, obj_method,
                 # define fx arguments
                 fx_args = {'var_data': obj_data_tmp, 'var_time': obj_time_src,
                            'var_attrs': obj_attrs_tmp,
-                           'var_geo_terrain': geo_terrain_ref, 'var_geo_x': geo_x_ref, 'var_geo_y': geo_y_ref}
+                           'var_geo_terrain': geo_terrain_ref, 'var_geo_x': geo_x_ref, 'var_geo_y': geo_y_ref,
+                           'var_geo_tables': geo_tables_ref}
+                if 'parameters' in list(var_method.keys()):
+                    if var_method['parameters'] is not None:
+                        fx_args.update(var_method['parameters'])
 
                 # apply fx method and arguments
                 data_dframe_def, data_attrs_def = fx_obj(**fx_args)
@@ -46,6 +46,51 @@ def check_attributes(attr_name, attr_dict):
 # ----------------------------------------------------------------------------------------------------------------------
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+# method to define the number of hourly steps of a frequency
+def define_frequency_steps(var_frequency, var_frequency_base='1h'):
+
+    var_delta = pd.Timedelta(var_frequency.lower())
+    var_delta_base = pd.Timedelta(var_frequency_base)
+
+    if (var_delta < var_delta_base) or (var_delta % var_delta_base != pd.Timedelta(0)):
+        alg_logger.error(' ===> Frequency "' + var_frequency + '" must be a multiple of "' + var_frequency_base + '"')
+        raise NotImplementedError('Case not implemented yet')
+
+    return int(var_delta / var_delta_base)
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to disaggregate accumulated field(s) to hourly step(s)
+def disaggregate_accumulated_values(var_values_in, var_steps, var_type='accumulated', var_dtype=None):
+
+    # cumulative field(s) are referred to the forecast start (first step included)
+    if var_type == 'cumulative':
+        var_values_step = np.empty(var_values_in.shape, dtype=np.float64)
+        var_values_step[0] = var_values_in[0]
+        np.subtract(var_values_in[1:], var_values_in[:-1], out=var_values_step[1:])
+        np.maximum(var_values_step, 0, out=var_values_step)
+    elif var_type == 'accumulated':
+        var_values_step = var_values_in
+    else:
+        alg_logger.error(' ===> Rain type must be "accumulated" or "cumulative"')
+        raise NotImplementedError('Case not implemented yet')
+
+    if var_dtype is None:
+        var_dtype = var_values_in.dtype if np.issubdtype(var_values_in.dtype, np.floating) else np.float64
+
+    # each step is repeated by a broadcast view of the output (no temporary cube)
+    var_n_time, var_n_y, var_n_x = var_values_step.shape
+    var_values_out = np.empty((var_n_time * var_steps, var_n_y, var_n_x), dtype=var_dtype)
+    var_values_out.reshape(var_n_time, var_steps, var_n_y, var_n_x)[...] = var_values_step[:, np.newaxis, :, :]
+    if var_steps > 1:
+        var_values_out /= var_steps
+
+    return var_values_out
+# ----------------------------------------------------------------------------------------------------------------------
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 # method to compute rain field(s)
 def compute_rain(var_dframe, var_attrs=None,
@@ -63,8 +108,8 @@ def compute_rain(var_dframe, var_attrs=None,
         alg_logger.error(' ===> Rain units must be "m"')
         raise NotImplementedError('Case not implemented yet')
     # check variable type
-    if var_type != 'accumulated':
-        alg_logger.error(' ===> Rain type must be "accumulated"')
+    if var_type != 'accumulated' and var_type != 'cumulative':
+        alg_logger.error(' ===> Rain type must be "accumulated" or "cumulative"')
         raise NotImplementedError('Case not implemented yet')
     # check time fields
     if var_name_time not in var_dframe.dims:
@@ -73,20 +118,14 @@ def compute_rain(var_dframe, var_attrs=None,
 
     # get time information
     time_range_in = pd.DatetimeIndex(var_dframe[var_name_time].values)
-    time_steps_in = len(time_range_in)
     time_idx = list(var_dframe.dims).index(var_name_time)
 
     # check time index
     if time_idx != 0:
         alg_logger.error(' ===> Time index must be 0')
         raise NotImplementedError('Case not implemented yet')
-    # check frequency
-    if var_frequency != '3H':
-        alg_logger.error(' ===> Rain frequency must be "3H"')
-        raise NotImplementedError('Case not implemented yet')
-    else:
-        # split frequency in time and step
-        var_frequency_value, var_frequency_unit = split_time_frequency(var_frequency)
+    # get frequency steps (hourly step(s) of each source step)
+    var_frequency_steps = define_frequency_steps(var_frequency)
 
     # get geo x information
     geo_x_idx = list(var_dframe.dims).index(var_name_geo_x)
@@ -105,25 +144,13 @@ def compute_rain(var_dframe, var_attrs=None,
         raise NotImplementedError('Case not implemented yet')
 
     # adjust time range
-    time_start = time_range_in[0] - pd.Timedelta('3h')
-    time_end = time_range_in[-1]
-    time_range_out = pd.date_range(start=time_start, end=time_end, freq='1h')
-    time_range_out = time_range_out[1:]
-    time_steps_out = len(time_range_out)
-
-    values_src = var_dframe.values / var_frequency_value
-    values_dst = np.zeros(shape=(time_steps_out, values_src.shape[geo_y_idx], values_src.shape[geo_x_idx]))
-    for i in range(0, time_steps_in):
+    time_start = time_range_in[0] - pd.Timedelta(var_frequency.lower()) + pd.Timedelta('1h')
+    time_range_out = pd.date_range(start=time_start, periods=len(time_range_in) * var_frequency_steps, freq='1h')
 
-        idx_start = i * var_frequency_value
-        idx_end = (i + 1) * var_frequency_value
-
-        values_src_tmp = values_src[i, :, :]
-        values_dst_tmp = np.zeros(shape=(var_frequency_value, values_src_tmp.shape[0], values_src_tmp.shape[1]))
-        for j in range(0, var_frequency_value):
-            values_dst_tmp[j, :, :] = values_src_tmp
-
-        values_dst[idx_start:idx_end, :, :] = values_dst_tmp
+    # disaggregate values and apply scale factor
+    values_dst = disaggregate_accumulated_values(
+        var_dframe.values, var_frequency_steps, var_type=var_type, var_dtype=np.float64)
+    values_dst /= var_scale_factor
 
     var_dframe = create_darray(
         values_dst, geo_x_values, geo_y_values, geo_1d=False, time=time_range_out, name=None,
@@ -131,8 +158,6 @@ def compute_rain(var_dframe, var_attrs=None,
         dim_name_x='longitude', dim_name_y='latitude', dim_name_time='time',
         dims_order=['time', 'latitude', 'longitude'])
 
-    # apply scale factor
-    var_dframe.values = values_dst / var_scale_factor
     # apply units definition
     var_attrs['units'] = 'mm'
 
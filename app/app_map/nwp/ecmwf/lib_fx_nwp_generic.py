@@ -15,7 +15,8 @@ import logging
 import numpy as np
 import pandas as pd
 
-from lib_fx_astronomic_radiation import exec_astronomic_radiation, define_parameters, compute_cloud_factor
+from lib_fx_astronomic_radiation import (exec_astronomic_radiation, define_parameters, define_constants,
+                                         compute_cloud_factor)
 
 from lib_utils_io import create_darray
 from lib_info_args import logger_name
@@ -56,7 +57,8 @@ def compute_astronomic_radiation(var_data, var_time,
                                  var_name_rain='rain', var_name_k='incoming_radiation',
                                  var_name_time='time', var_name_geo_x='longitude', var_name_geo_y='latitude',
                                  var_period=None, var_frequency='1H',
-                                 var_type_rain='accumulated', var_type_inc_rad='instantaneous', **kwargs):
+                                 var_type_rain='accumulated', var_type_inc_rad='instantaneous',
+                                 var_time_chunk=None, var_geo_tables=None, **kwargs):
 
     # get rain data and attributes
     if var_name_rain in list(var_data.keys()):
@@ -116,13 +118,23 @@ def compute_astronomic_radiation(var_data, var_time,
     # compute cloud factor
     var_values_cf = compute_cloud_factor(var_values_rain)
     # compute parameters
-    geo_lz, geo_lm, geo_phi, arad_param_gsc, arad_param_as, arad_param_bs = define_parameters(var_geo_x, var_geo_y)
+    if var_geo_tables is not None and var_geo_tables['geo_phi'].shape != var_geo_terrain.shape:
+        alg_logger.warning(' ===> Solar geometry tables and terrain grid are not consistent; tables are not used')
+        var_geo_tables = None
+    if var_geo_tables is not None:
+        geo_lz, geo_lm, geo_phi = var_geo_tables['geo_lz'], var_geo_tables['geo_lm'], var_geo_tables['geo_phi']
+        geo_phi_sin, geo_phi_cos = var_geo_tables['geo_phi_sin'], var_geo_tables['geo_phi_cos']
+        arad_param_gsc, arad_param_as, arad_param_bs = define_constants()
+    else:
+        (geo_lz, geo_lm, geo_phi, geo_phi_sin, geo_phi_cos,
+         arad_param_gsc, arad_param_as, arad_param_bs) = define_parameters(var_geo_x, var_geo_y)
 
     # compute astronomic and incoming radiation
     var_values_ar, var_values_k = exec_astronomic_radiation(
         var_values_cf, var_geo_terrain,
         time_range, time_delta,
-        geo_lz, geo_lm, geo_phi, arad_param_gsc, arad_param_as, arad_param_bs)
+        geo_lz, geo_lm, geo_phi, arad_param_gsc, arad_param_as, arad_param_bs,
+        geo_phi_sin=geo_phi_sin, geo_phi_cos=geo_phi_cos, time_chunk=var_time_chunk)
 
     # var_da = create_darray(
     #    var_model_k, var_geo_x, var_geo_y, geo_1d=False, time=time_range, name=None,
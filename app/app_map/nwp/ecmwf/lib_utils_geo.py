@@ -10,11 +10,14 @@ Version:       '1.0.0'
 # ----------------------------------------------------------------------------------------------------------------------
 # libraries
 import logging
+import hashlib
+import json
 import numpy as np
 import pandas as pd
 import pyresample
 
 from copy import deepcopy
+from collections import OrderedDict
 from repurpose.resample import resample_to_grid
 
 from lib_info_args import logger_name
@@ -247,3 +250,90 @@ def resample_points_to_grid(var_data_in_1d, var_geox_1d_in, var_geoy_1d_in,
     return var_data_out, var_geox_2d_out, var_geoy_2d_out
 # ----------------------------------------------------------------------------------------------------------------------
 
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to create resample index cache
+def create_resample_cache(cache_obj=None, cache_size=10):
+
+    cache_data = OrderedDict()
+    if cache_obj is not None:
+        cache_data.update(cache_obj['cache_data'])
+
+    resample_cache = {'cache_size': cache_size, 'cache_data': cache_data, 'cache_updated': False}
+    update_resample_cache(resample_cache)
+
+    return resample_cache
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to update resample index cache (removing the least recently used entries)
+def update_resample_cache(resample_cache):
+
+    cache_size = resample_cache['cache_size']
+    cache_data = resample_cache['cache_data']
+    if cache_size is not None:
+        while cache_data.__len__() > cache_size:
+            cache_data.popitem(last=False)
+
+    return resample_cache
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to define resample index key (hash of source grid, destination grid and search settings)
+def define_resample_key(var_geox_in, var_geoy_in, var_geox_out, var_geoy_out, **kwargs):
+
+    key_hash = hashlib.sha1()
+    for geo_values in [var_geox_in, var_geoy_in, var_geox_out, var_geoy_out]:
+        geo_values = np.asarray(geo_values, dtype=np.float64)
+        key_hash.update(str(geo_values.shape).encode('utf-8'))
+        key_hash.update(np.ascontiguousarray(geo_values).tobytes())
+    key_hash.update(json.dumps(kwargs, sort_keys=True, default=str).encode('utf-8'))
+
+    return key_hash.hexdigest()
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to compute resample index (source index of each destination point)
+def compute_resample_index(var_geox_in, var_geoy_in, var_geox_out, var_geoy_out, **kwargs):
+
+    idx_1d_in = np.arange(0, var_geoy_in.shape[0] * var_geox_in.shape[1])
+    idx_2d_in = np.reshape(idx_1d_in, [var_geoy_in.shape[0], var_geox_in.shape[1]])
+
+    idx_2d_out, _, _ = resample_points_to_grid(
+        idx_2d_in, var_geox_in, var_geoy_in, var_geox_out, var_geoy_out, **kwargs)
+
+    idx_1d_out = idx_2d_out.ravel()
+    idx_1d_out = np.asarray(idx_1d_out, dtype=int)
+
+    return idx_1d_out
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to get resample index (using cache if defined)
+def get_resample_index(var_geox_in, var_geoy_in, var_geox_out, var_geoy_out, resample_cache=None, **kwargs):
+
+    idx_key, idx_1d_out = None, None
+    if resample_cache is not None:
+
+        idx_key = define_resample_key(var_geox_in, var_geoy_in, var_geox_out, var_geoy_out, **kwargs)
+
+        cache_data = resample_cache['cache_data']
+        if idx_key in cache_data:
+            idx_1d_out = cache_data[idx_key]
+            cache_data.move_to_end(idx_key)
+
+    if idx_1d_out is None:
+        idx_1d_out = compute_resample_index(var_geox_in, var_geoy_in, var_geox_out, var_geoy_out, **kwargs)
+
+        if resample_cache is not None:
+            resample_cache['cache_data'][idx_key] = idx_1d_out
+            resample_cache['cache_updated'] = True
+            update_resample_cache(resample_cache)
+
+    return idx_1d_out
+# ----------------------------------------------------------------------------------------------------------------------
+
@@ -27,10 +27,10 @@ from lib_data_io_grib import read_file_grib, organize_file_grib
 from lib_data_io_nc import (organize_file_nc_xarray, organize_file_nc_library,
                             write_file_nc_xarray, write_file_nc_library)
 
-from lib_data_io_gzip import zip_filename, unzip_filename
+from lib_data_io_gzip import zip_filename
 
 from lib_utils_io import fill_string_with_time, fill_string_with_info
-from lib_utils_zip import remove_zip_extension, add_zip_extension
+from lib_utils_zip import add_zip_extension
 
 from lib_fx_methods import (extract_data,
                             transform_dset_2_data, transform_data_2_dset,
@@ -80,6 +80,9 @@ class DrvData:
 
         self.tag_folder_name, self.tag_file_name = 'folder_name', 'file_name'
         self.tag_variables, self.tag_compression, self.tag_format = 'variables', 'compression', 'format'
+        self.tag_compression_level = 'compression_level'
+        self.tag_compression_mode = 'compression_mode'
+        self.tag_index_folder_name = 'index_folder_name'
 
         self.reset_datasets_anc_raw = self.alg_flags['reset_datasets_ancillary_raw']
         self.reset_datasets_anc_def = self.alg_flags['reset_datasets_ancillary_def']
@@ -101,6 +104,19 @@ class DrvData:
         self.file_path_dst = os.path.join(self.folder_name_dst, self.file_name_dst)
         self.format_dst = self.alg_datasets_dst[self.tag_format]
         self.compression_dst = self.alg_datasets_dst[self.tag_compression]
+        if self.tag_compression_level in list(self.alg_datasets_dst.keys()):
+            self.compression_level_dst = self.alg_datasets_dst[self.tag_compression_level]
+        else:
+            self.compression_level_dst = 9
+        if self.tag_compression_mode in list(self.alg_datasets_dst.keys()):
+            self.compression_mode_dst = self.alg_datasets_dst[self.tag_compression_mode]
+        else:
+            self.compression_mode_dst = 'netcdf_gzip'
+        if self.compression_mode_dst not in ['netcdf_gzip', 'gzip']:
+            alg_logger.error(' ===> Compression mode "' + str(self.compression_mode_dst) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
+        # netcdf variable(s) are not compressed if the destination file is compressed by gzip only
+        self.compression_nc_dst = not (self.compression_dst and (self.compression_mode_dst == 'gzip'))
         self.variables_dst = self.alg_datasets_dst[self.tag_variables]
 
         self.grid_geo_x_src, self.grid_geo_y_src = self.alg_static['grid_geo_x_src'], self.alg_static['grid_geo_y_src']
@@ -108,6 +124,11 @@ class DrvData:
         self.grid_geo_values_dst = self.alg_static['grid_geo_values_dst']
         self.grid_geo_x_dst, self.grid_geo_y_dst = self.alg_static['grid_geo_x_dst'], self.alg_static['grid_geo_y_dst']
         self.transform_dst, self.proj_dst = self.alg_static['transform_dst'], self.alg_static['proj_dst']
+        if 'grid_resample_cache' in list(self.alg_static.keys()):
+            self.grid_resample_cache = self.alg_static['grid_resample_cache']
+            self.grid_resample_file = self.alg_static['grid_resample_file']
+        else:
+            self.grid_resample_cache, self.grid_resample_file = None, None
 
         self.settings_organize_data = self.alg_methods['organize_data']
         self.settings_resample_data = self.alg_methods['resample_data']
@@ -123,6 +144,19 @@ class DrvData:
         file_string_def = fill_string_with_info(file_string_def, self.alg_info, self.alg_template_info)
         return file_string_def
 
+    # method to dump resample index cache
+    def dump_resample_cache(self):
+
+        resample_cache, file_path_resample = self.grid_resample_cache, self.grid_resample_file
+        if (resample_cache is not None) and (file_path_resample is not None) and resample_cache['cache_updated']:
+            folder_name_resample, file_name_resample = os.path.split(file_path_resample)
+            make_folder(folder_name_resample)
+            # cache is replaced in a single step (resample file can be shared by the run(s))
+            file_path_tmp = file_path_resample + '.' + str(os.getpid()) + '.tmp'
+            write_file_obj(file_path_tmp, {'cache_data': resample_cache['cache_data']})
+            os.replace(file_path_tmp, file_path_resample)
+            resample_cache['cache_updated'] = False
+
     # method to organize data
     def organize_data(self):
 
@@ -192,6 +226,11 @@ class DrvData:
                 file_name_src_tmpl = file_data_fields[self.tag_file_name]
                 file_compression_src = file_data_fields[self.tag_compression]
                 file_variables_src = file_data_fields[self.tag_variables]
+                # get index folder (grib index file(s) saved over runs)
+                if self.tag_index_folder_name in list(file_data_fields.keys()):
+                    folder_name_index_src = file_data_fields[self.tag_index_folder_name]
+                else:
+                    folder_name_index_src = None
 
                 # create file path (join folder and file name)
                 file_path_src_tmpl = os.path.join(folder_name_src_tmpl, file_name_src_tmpl)
@@ -204,17 +243,11 @@ class DrvData:
                 # check file source availability
                 if os.path.exists(file_path_src_step):
 
-                    # check compression mode
-                    if file_compression_src:
-                        file_path_src_tmp = remove_zip_extension(file_path_src_step)
-                        unzip_filename(file_path_src_step, file_path_src_tmp)
-                    else:
-                        file_path_src_tmp = deepcopy(file_path_src_step)
-
-                    # get dataset source
+                    # get dataset source (compressed file decompressed in a temporary file removed after reading)
                     obj_data_src, obj_attrs_src, obj_geo_src, obj_time_src = read_file_grib(
-                        file_path_src_tmp, file_time_reference=alg_time_now,
-                        file_variables=file_variables_src)
+                        file_path_src_step, file_time_reference=alg_time_now,
+                        file_variables=file_variables_src, file_compression=file_compression_src,
+                        file_index_folder=folder_name_index_src)
 
                     # organize dataset source
                     if obj_data_src is not None:
@@ -375,8 +408,11 @@ class DrvData:
                 obj_data_anc_resample_step = resample_data(
                     obj_data_anc_ds2data_step, obj_geo_x_anc, obj_geo_y_anc,
                     grid_geo_x_dst, grid_geo_y_dst,
-                    geo_resample_idx=True, geo_mask_dst=grid_geo_values_dst,
+                    geo_resample_idx=True, geo_resample_cache=self.grid_resample_cache,
+                    geo_mask_dst=grid_geo_values_dst,
                     **settings_resample_data)
+                # dump resample index cache (if updated)
+                self.dump_resample_cache()
                 # info end resample datasets
                 alg_logger.info(' -----> (5) Resample datasets ... DONE')
 
@@ -509,7 +545,8 @@ class DrvData:
                     # method to write netcdf dataset (by xarray library)
                     folder_name_dst_step, file_name_dst_step = os.path.split(file_path_dst_step)
                     make_folder(folder_name_dst_step)
-                    write_file_nc_xarray(file_path_dst_step, variable_dset)
+                    write_file_nc_xarray(file_path_dst_step, variable_dset,
+                                         dset_compression=9 if self.compression_nc_dst else 0)
 
                 elif self.format_dst == 'netcdf_base':
 
@@ -528,7 +565,8 @@ class DrvData:
                         dset_time=obj_time_anc_def_step,
                         dset_geo_x=obj_geo_x_anc_def_step, dset_geo_y=obj_geo_y_anc_def_step,
                         geo_system_attrs=obj_attrs_anc_geo_system_step,
-                        geo_x_attrs=obj_attrs_anc_geo_x_step, geo_y_attrs=obj_attrs_anc_geo_y_step)
+                        geo_x_attrs=obj_attrs_anc_geo_x_step, geo_y_attrs=obj_attrs_anc_geo_y_step,
+                        variable_compression_flag=self.compression_nc_dst)
 
                 else:
                     alg_logger.error(' ===> Destination format "' + self.format_dst + '" is not supported')
@@ -537,7 +575,7 @@ class DrvData:
                 # apply compression to destination file
                 if self.compression_dst:
                     file_path_dst_zip = add_zip_extension(file_path_dst_step)
-                    zip_filename(file_path_dst_step, file_path_dst_zip)
+                    zip_filename(file_path_dst_step, file_path_dst_zip, zip_level=self.compression_level_dst)
 
                     if os.path.exists(file_path_dst_zip):
                         os.remove(file_path_dst_step)
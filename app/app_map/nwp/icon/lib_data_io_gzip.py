@@ -9,7 +9,13 @@ Version:       '3.0.0'
 # ----------------------------------------------------------------------------------------------------------------------
 # Library
 import logging
+import os
 import gzip
+import shutil
+import multiprocessing
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from lib_info_args import logger_name
 
@@ -19,30 +25,43 @@ log_stream = logging.getLogger(logger_name)
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-# Method to unzip file
-def unzip_filename(file_name_zip, file_name_unzip):
-
-    file_handle_zip = gzip.GzipFile(file_name_zip, "rb")
-    file_handle_unzip = open(file_name_unzip, "wb")
+# Method to unzip file (streaming decompression with bounded memory; multi-member files are supported)
+def unzip_filename(file_name_zip, file_name_unzip, zip_chunk_size=4194304):
 
-    file_data_unzip = file_handle_zip.read()
-    file_handle_unzip.write(file_data_unzip)
-
-    file_handle_zip.close()
-    file_handle_unzip.close()
+    with gzip.open(file_name_zip, 'rb') as file_handle_zip, open(file_name_unzip, 'wb') as file_handle_unzip:
+        shutil.copyfileobj(file_handle_zip, file_handle_unzip, zip_chunk_size)
 
 # ----------------------------------------------------------------------------------------------------------------------
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-# Method to zip file
-def zip_filename(file_name_unzip, file_name_zip):
+# Method to zip file (fixed-size chunks compressed in parallel and written as gzip members)
+def zip_filename(file_name_unzip, file_name_zip, zip_level=9, zip_workers=None, zip_chunk_size=4194304):
+
+    # Thread(s) are not used in the worker(s) of a process pool (cpu(s) are already shared by the pool)
+    if zip_workers is None:
+        if multiprocessing.parent_process() is not None:
+            zip_workers = 1
+        else:
+            zip_workers = min(os.cpu_count() or 1, 8)
 
-    file_handle_unzip = open(file_name_unzip, 'rb')
-    file_handle_zip = gzip.open(file_name_zip, 'wb')
+    with open(file_name_unzip, 'rb') as file_handle_unzip, open(file_name_zip, 'wb') as file_handle_zip:
 
-    file_handle_zip.writelines(file_handle_unzip)
+        if zip_workers <= 1:
+            with gzip.GzipFile(fileobj=file_handle_zip, mode='wb', compresslevel=zip_level) as file_handle_member:
+                shutil.copyfileobj(file_handle_unzip, file_handle_member, zip_chunk_size)
+        else:
+            # Chunk(s) in flight are bounded to limit memory usage; members are written in order
+            with ThreadPoolExecutor(max_workers=zip_workers) as zip_executor:
+                zip_queue = deque()
+                for file_chunk in iter(lambda: file_handle_unzip.read(zip_chunk_size), b''):
+                    zip_queue.append(zip_executor.submit(gzip.compress, file_chunk, zip_level))
+                    if zip_queue.__len__() >= 2 * zip_workers:
+                        file_handle_zip.write(zip_queue.popleft().result())
+                while zip_queue:
+                    file_handle_zip.write(zip_queue.popleft().result())
 
-    file_handle_zip.close()
-    file_handle_unzip.close()
+            # Empty files are saved as a valid (empty) gzip member
+            if file_handle_zip.tell() == 0:
+                file_handle_zip.write(gzip.compress(b'', zip_level))
 # ----------------------------------------------------------------------------------------------------------------------
@@ -11,6 +11,9 @@ Version:       '1.0.0'
 # libraries
 import logging
 import os
+import hashlib
+import shutil
+import tempfile
 import numpy as np
 import pandas as pd
 import xarray as xr
@@ -19,6 +22,7 @@ from copy import deepcopy
 
 from lib_info_args import logger_name
 from lib_utils_io import create_darray
+from lib_data_io_gzip import unzip_filename
 
 import lib_fx_nwp_lami_2i as lib_fx_nwp
 
@@ -30,6 +34,8 @@ logging.getLogger('gribapi').setLevel(logging.WARNING)
 # debug
 # import matplotlib.pylab as plt
 
+# folder of the decompressed file(s) (memory file system if available)
+folder_tmp_memory = '/dev/shm' if os.path.isdir('/dev/shm') else None
 # default netcdf encoded attributes
 attrs_encoded = ["_FillValue", "dtype", "scale_factor", "add_offset", "grid_mapping"]
 # ----------------------------------------------------------------------------------------------------------------------
@@ -148,9 +154,38 @@ def organize_file_grib(obj_data, obj_time=None, obj_geo_x=None, obj_geo_y=None,
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-# method to read grib file
+# method to define grib file key (hash of file path, size and modification time)
+def define_file_grib_key(file_name):
+    file_stat = os.stat(file_name)
+    file_key = ':'.join([os.path.abspath(file_name), str(file_stat.st_size), str(file_stat.st_mtime_ns)])
+    return hashlib.sha1(file_key.encode('utf-8')).hexdigest()
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to read grib file (file scanned once for all the variable(s); index file saved in the index folder)
 def read_file_grib(file_name, file_variables=None, file_time_reference=None,
-                   var_name_geo_x='longitude', var_name_geo_y='latitude'):
+                   var_name_geo_x='longitude', var_name_geo_y='latitude', file_compression=False,
+                   file_index_folder=None):
+
+    # check file compression (grib engine needs a file path; file decompressed and removed after reading)
+    if file_compression and os.path.exists(file_name):
+
+        # decompressed file in a folder owned by the call (cfgrib binds the index file to the grib file path,
+        # so the index file of the decompressed file is removed with it)
+        if file_index_folder is not None:
+            alg_logger.warning(' ===> Index folder "' + file_index_folder + '" is not used for the compressed file "' +
+                               file_name + '"; the grib index is computed in a temporary folder')
+        folder_name_tmp = tempfile.mkdtemp(prefix='hyde_grib_', dir=folder_tmp_memory)
+        file_name_tmp = os.path.join(folder_name_tmp, os.path.splitext(os.path.basename(file_name))[0])
+        try:
+            unzip_filename(file_name, file_name_tmp)
+            return read_file_grib(file_name_tmp, file_variables=file_variables,
+                                  file_time_reference=file_time_reference,
+                                  var_name_geo_x=var_name_geo_x, var_name_geo_y=var_name_geo_y,
+                                  file_index_folder=folder_name_tmp)
+        finally:
+            shutil.rmtree(folder_name_tmp, ignore_errors=True)
 
     # check file availability
     if os.path.exists(file_name):
@@ -168,17 +203,31 @@ def read_file_grib(file_name, file_variables=None, file_time_reference=None,
         if not isinstance(filter_vars, list):
             filter_vars = [filter_vars]
 
-        # iterate over filter variables
-        file_dset = None
-        for filter_var in filter_vars:
-            tmp_dset = xr.open_dataset(
-                file_name, engine='cfgrib',
-                backend_kwargs={'filter_by_keys': {'cfVarName': filter_var}})
+        # define index file (shared by the variable(s); removed after reading if the index folder is not defined)
+        file_key = define_file_grib_key(file_name)
+        if file_index_folder is None:
+            folder_name_index = tempfile.mkdtemp(dir=folder_tmp_memory)
+        else:
+            folder_name_index = file_index_folder
+            os.makedirs(folder_name_index, exist_ok=True)
+        file_index_path = os.path.join(folder_name_index, file_key + '.{short_hash}.idx')
 
-            if file_dset is None:
-                file_dset = tmp_dset
-            else:
-                file_dset = file_dset.merge(tmp_dset)
+        # iterate over filter variables (only the requested variable(s) are loaded)
+        file_dset = None
+        try:
+            for filter_var in filter_vars:
+                tmp_dset = xr.open_dataset(
+                    file_name, engine='cfgrib',
+                    backend_kwargs={'filter_by_keys': {'cfVarName': filter_var}, 'indexpath': file_index_path})
+                tmp_dset = tmp_dset.load()
+
+                if file_dset is None:
+                    file_dset = tmp_dset
+                else:
+                    file_dset = file_dset.merge(tmp_dset)
+        finally:
+            if file_index_folder is None:
+                shutil.rmtree(folder_name_index, ignore_errors=True)
 
         # check file empty or not
         if len(file_dset.dims) > 0:
@@ -476,7 +476,10 @@ def write_file_nc_xarray(file_name, dset_data,
                   dset_mode='w', dset_engine='netcdf4', dset_compression=9, dset_format='NETCDF4',
                   dim_key_time='time', no_data=-9999.0):
 
-    dset_encoded = dict(zlib=True, complevel=dset_compression)
+    if dset_compression > 0:
+        dset_encoded = dict(zlib=True, complevel=dset_compression)
+    else:
+        dset_encoded = {}
 
     dset_encoding = {}
     for var_name in dset_data.data_vars:
@@ -14,6 +14,7 @@ import logging
 
 import numpy as np
 import pandas as pd
+import xarray as xr
 
 from lib_info_args import logger_name, proj_epsg, time_format_datasets
 
@@ -37,6 +38,74 @@ def check_attributes(attr_name, attr_dict):
 # ----------------------------------------------------------------------------------------------------------------------
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+# method to define the number of hourly steps of a frequency
+def define_frequency_steps(var_frequency, var_frequency_base='1h'):
+
+    var_delta = pd.Timedelta(var_frequency.lower())
+    var_delta_base = pd.Timedelta(var_frequency_base)
+
+    if (var_delta < var_delta_base) or (var_delta % var_delta_base != pd.Timedelta(0)):
+        alg_logger.error(' ===> Frequency "' + var_frequency + '" must be a multiple of "' + var_frequency_base + '"')
+        raise NotImplementedError('Case not implemented yet')
+
+    return int(var_delta / var_delta_base)
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to disaggregate accumulated field(s) to hourly step(s)
+def disaggregate_accumulated_values(var_values_in, var_steps, var_type='accumulated', var_dtype=None):
+
+    # cumulative field(s) are referred to the forecast start (first step included)
+    if var_type == 'cumulative':
+        var_values_step = np.empty(var_values_in.shape, dtype=np.float64)
+        var_values_step[0] = var_values_in[0]
+        np.subtract(var_values_in[1:], var_values_in[:-1], out=var_values_step[1:])
+        np.maximum(var_values_step, 0, out=var_values_step)
+    elif var_type == 'accumulated':
+        var_values_step = var_values_in
+    else:
+        alg_logger.error(' ===> Rain type must be "accumulated" or "cumulative"')
+        raise NotImplementedError('Case not implemented yet')
+
+    if var_dtype is None:
+        var_dtype = var_values_in.dtype if np.issubdtype(var_values_in.dtype, np.floating) else np.float64
+
+    # each step is repeated by a broadcast view of the output (no temporary cube)
+    var_n_time, var_n_y, var_n_x = var_values_step.shape
+    var_values_out = np.empty((var_n_time * var_steps, var_n_y, var_n_x), dtype=var_dtype)
+    var_values_out.reshape(var_n_time, var_steps, var_n_y, var_n_x)[...] = var_values_step[:, np.newaxis, :, :]
+    if var_steps > 1:
+        var_values_out /= var_steps
+
+    return var_values_out
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# method to update data array with hourly value(s) (time coordinate is updated if the steps are disaggregated)
+def update_time_values(var_dframe, var_values, var_frequency, var_name_time='time'):
+
+    if var_values.shape[0] == var_dframe.shape[0]:
+        var_dframe.values = var_values
+        return var_dframe
+
+    time_range_in = pd.DatetimeIndex(var_dframe[var_name_time].values)
+    time_start = time_range_in[0] - pd.Timedelta(var_frequency.lower()) + pd.Timedelta('1h')
+    time_range_out = pd.date_range(start=time_start, periods=var_values.shape[0], freq='1h')
+
+    var_coords = {var_key: var_coord for var_key, var_coord in var_dframe.coords.items()
+                  if var_name_time not in var_coord.dims}
+    var_coords[var_name_time] = time_range_out
+
+    var_dframe = xr.DataArray(var_values, dims=var_dframe.dims, coords=var_coords,
+                              attrs=var_dframe.attrs, name=var_dframe.name)
+
+    return var_dframe
+# ----------------------------------------------------------------------------------------------------------------------
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 # method to compute rain field(s)
 def compute_rain(var_dframe, var_attrs=None,
@@ -53,8 +122,8 @@ def compute_rain(var_dframe, var_attrs=None,
         alg_logger.error(' ===> Rain units must be "kg m**-2" or "mm"')
         raise NotImplementedError('Case not implemented yet')
     # check variable type
-    if var_type != 'accumulated':
-        alg_logger.error(' ===> Rain type must be "accumulated"')
+    if var_type != 'accumulated' and var_type != 'cumulative':
+        alg_logger.error(' ===> Rain type must be "accumulated" or "cumulative"')
         raise NotImplementedError('Case not implemented yet')
     # check time fields
     if var_name_time not in var_dframe.dims:
@@ -69,18 +138,20 @@ def compute_rain(var_dframe, var_attrs=None,
     if time_idx != 0:
         alg_logger.error(' ===> Time index must be 0')
         raise NotImplementedError('Case not implemented yet')
-    # check frequency
-    if var_frequency != '1H':
-        alg_logger.error(' ===> Rain frequency must be "1H"')
-        raise NotImplementedError('Case not implemented yet')
+    # get frequency steps (hourly step(s) of each source step)
+    var_frequency_steps = define_frequency_steps(var_frequency)
 
     # select variable period
     if var_period is not None:
         idx_start, idx_end = var_period[0], var_period[1]
         var_dframe = var_dframe[idx_start:idx_end, :, :]
 
+    # compute variable field(s)
+    var_data_out = disaggregate_accumulated_values(var_dframe.values, var_frequency_steps, var_type=var_type)
+
     # apply scale factor
-    var_dframe.values = var_dframe.values * var_scale_factor
+    var_data_out *= var_scale_factor
+    var_dframe = update_time_values(var_dframe, var_data_out, var_frequency, var_name_time=var_name_time)
     # apply units definition
     var_attrs['units'] = 'mm'
 
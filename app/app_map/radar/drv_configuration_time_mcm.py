@@ -92,4 +92,41 @@ class DriverTime:
 
     # -------------------------------------------------------------------------------------
 
+    # -------------------------------------------------------------------------------------
+    # Method to plan time window(s) (each time of the windows of the time steps is planned once)
+    @staticmethod
+    def set_algorithm_plan(time_range, time_window_info):
+
+        logging.info(' ---> Set time plan ... ')
+
+        time_window_period = time_window_info['time_period']
+        time_window_frequency = time_window_info['time_frequency']
+        time_window_rounding = time_window_info['time_rounding']
+
+        # Collect the window(s) of the time steps
+        time_slots = 0
+        time_union = set()
+        for time_step in time_range:
+            time_window = pd.date_range(end=time_step.floor(time_window_rounding),
+                                        periods=time_window_period, freq=time_window_frequency)
+            time_slots += time_window.__len__()
+            time_union.update(time_window)
+        time_plan = pd.DatetimeIndex(sorted(time_union))
+
+        # Split the planned time(s) in not overlapping chunk(s) of window length
+        time_chunks = [time_plan[i:i + time_window_period]
+                       for i in range(0, time_plan.__len__(), max(time_window_period, 1))]
+
+        logging.info(' ----> Time steps: ' + str(time_range.__len__()) +
+                     ' :: Window slots: ' + str(time_slots) +
+                     ' :: Planned times: ' + str(time_plan.__len__()) +
+                     ' :: Duplicated slots removed: ' + str(time_slots - time_plan.__len__()) +
+                     ' :: Chunks: ' + str(time_chunks.__len__()))
+
+        logging.info(' ---> Set time plan ... DONE')
+
+        return time_chunks
+
+    # -------------------------------------------------------------------------------------
+
 # -------------------------------------------------------------------------------------
@@ -14,18 +14,23 @@ Version:       '1.0.0'
 import logging
 import os
 import time
+import fcntl
 
 import xarray as xr
 import pandas as pd
 
+from copy import deepcopy
+
 from lib_mcm_conventions import conventions_vars
 
-from lib_mcm_io_generic import write_obj, read_obj, convert_values2da, create_dset, write_dset, read_file_tiff
+from lib_mcm_io_generic import write_obj, read_obj, write_dset_store, read_dset_store, \
+    convert_values2da, create_dset, write_dset, read_file_tiff, read_file_tiff_geo, read_file_tiff_stack
 from lib_mcm_generic import make_folder, fill_tags2string, list_folder, get_root_path
 
-from lib_mcm_analysis_interpolation_grid import interp_grid2index
+from lib_mcm_analysis_interpolation_grid import create_grid2index_cache, get_grid2index, \
+    compute_grid2index_window, merge_grid2index_cache
 
-from lib_mcm_io_gzip import zip_filename, unzip_filename
+from lib_mcm_io_gzip import zip_filename
 
 from cpl_data_variables_mcm import DriverVariable
 # -------------------------------------------------------------------------------------
@@ -38,9 +43,11 @@ class DriverData:
     def __init__(self, time_step, geo_collections=None,
                  src_dict=None, ancillary_dict=None, dst_dict=None,
                  variable_src_dict=None, variable_dst_dict=None, time_dict=None, template_dict=None, info_dict=None,
-                 flag_updating_ancillary=True, flag_updating_destination=True, flag_cleaning_tmp=True):
+                 flag_updating_ancillary=True, flag_updating_destination=True, flag_cleaning_tmp=True,
+                 flag_batching_time=False, time_window=None):
 
         self.time_step = time_step
+        self.time_window = time_window
         self.geo_collections = geo_collections
 
         self.src_dict = src_dict
@@ -54,8 +61,15 @@ class DriverData:
         self.tag_folder_name = 'folder_name'
         self.tag_file_name = 'file_name'
         self.tag_file_compression = 'file_compression'
+        self.tag_file_compression_level = 'file_compression_level'
+        self.tag_file_compression_mode = 'file_compression_mode'
+        self.tag_file_encoding = 'file_encoding'
+        self.tag_file_format = 'file_format'
 
         self.tag_file_path_grid = 'file_path_grid'
+        self.tag_interp_max_distance = 'interp_max_distance'
+        self.tag_interp_cache_size = 'interp_cache_size'
+        self.tag_file_window_margin = 'file_window_margin'
 
         self.domain_name = info_dict['domain']
         self.variable_src_list = list(self.variable_src_dict.keys())
@@ -71,11 +85,13 @@ class DriverData:
             self.file_compression_src = self.src_dict[self.tag_file_compression]
         else:
             self.file_compression_src = False
-        self.file_unzip_src_raw = self.remove_file_extension(self.file_name_src_raw, file_extension='.gz')
-        self.file_unzip_src_collections = self.collect_file_list(self.folder_name_src_raw, self.file_unzip_src_raw)
 
         self.folder_name_anc_raw = self.ancillary_dict[self.tag_folder_name]
         self.file_name_anc_raw = self.ancillary_dict[self.tag_file_name]
+        if self.tag_file_format in list(self.ancillary_dict.keys()):
+            self.file_format_anc = self.ancillary_dict[self.tag_file_format]
+        else:
+            self.file_format_anc = 'dictionary'
         self.file_path_anc_collections = self.collect_file_list(self.folder_name_anc_raw, self.file_name_anc_raw)
 
         self.folder_name_anc_root = get_root_path(self.folder_name_anc_raw)
@@ -88,12 +104,24 @@ class DriverData:
             self.file_compression_dst = self.dst_dict[self.tag_file_compression]
         else:
             self.file_compression_dst = False
+        if self.tag_file_compression_level in list(self.dst_dict.keys()):
+            self.file_compression_level_dst = self.dst_dict[self.tag_file_compression_level]
+        else:
+            self.file_compression_level_dst = 9
+        if self.tag_file_compression_mode in list(self.dst_dict.keys()):
+            self.file_compression_mode_dst = self.dst_dict[self.tag_file_compression_mode]
+        else:
+            self.file_compression_mode_dst = 'netcdf_gzip'
+        if self.file_compression_mode_dst not in ['netcdf_gzip', 'gzip']:
+            logging.error(' ===> Compression mode "' + str(self.file_compression_mode_dst) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
         self.file_zip_dst_raw = self.add_file_extension(self.file_name_dst_raw, file_extension='.gz')
         self.file_zip_dst_collections = self.collect_file_list(self.folder_name_dst_raw, self.file_zip_dst_raw)
 
         self.flag_updating_ancillary = flag_updating_ancillary
         self.flag_updating_destination = flag_updating_destination
         self.flag_cleaning_tmp = flag_cleaning_tmp
+        self.flag_batching_time = flag_batching_time
 
         self.tag_dim_geo_x = 'longitude'
         self.tag_dim_geo_y = 'latitude'
@@ -102,13 +130,47 @@ class DriverData:
         self.tag_geo_data = 'terrain'
 
         self.dst_vars_compression_level = 9
+        if self.tag_file_encoding in list(self.dst_dict.keys()):
+            self.dst_vars_encoding_profile = deepcopy(self.dst_dict[self.tag_file_encoding])
+        else:
+            self.dst_vars_encoding_profile = None
+        # NetCDF variable(s) are not compressed if the destination file is compressed by gzip only
+        if self.file_compression_dst and (self.file_compression_mode_dst == 'gzip'):
+            self.dst_vars_compression_level = 0
+            if self.dst_vars_encoding_profile is not None:
+                if (self.dst_vars_encoding_profile.get('complevel', 0) > 0) or \
+                        self.dst_vars_encoding_profile.get('shuffle', False):
+                    logging.warning(' ===> Encoding "complevel" and "shuffle" are ignored in "gzip" compression mode')
+                self.dst_vars_encoding_profile['complevel'] = 0
         self.dst_vars_writing_engine = 'netcdf4'
 
-        self.interp_index_grid = None
+        self.interp_cache_grid = None
         if self.tag_file_path_grid  in list(self.geo_collections.attrs):
             self.file_path_grid = self.geo_collections.attrs[self.tag_file_path_grid]
         else:
             self.file_path_grid = None
+        # Maximum distance of the nearest source point (no data over the radar coverage)
+        if self.tag_interp_max_distance in list(self.ancillary_dict.keys()):
+            self.interp_max_distance = self.ancillary_dict[self.tag_interp_max_distance]
+        else:
+            self.interp_max_distance = None
+        # Number of grid index(es) stored in the grid reference file (least recently used removed)
+        if self.tag_interp_cache_size in list(self.ancillary_dict.keys()):
+            self.interp_cache_size = self.ancillary_dict[self.tag_interp_cache_size]
+        else:
+            self.interp_cache_size = 10
+        # Source file(s) read over the window of the domain bounding box plus a margin (in cells)
+        if self.tag_file_window_margin in list(self.src_dict.keys()):
+            self.file_window_margin = self.src_dict[self.tag_file_window_margin]
+        else:
+            self.file_window_margin = 2
+        if self.file_window_margin is not None:
+            geo_x_values = self.geo_collections[self.tag_coord_geo_x].values
+            geo_y_values = self.geo_collections[self.tag_coord_geo_y].values
+            self.file_window_bbox = [float(geo_x_values.min()), float(geo_y_values.max()),
+                                     float(geo_x_values.max()), float(geo_y_values.min())]
+        else:
+            self.file_window_bbox = None
         # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
@@ -137,6 +199,10 @@ class DriverData:
     # Method to collect time(s)
     def collect_file_time(self):
 
+        # Time window defined by the time plan
+        if self.time_window is not None:
+            return pd.DatetimeIndex(self.time_window)
+
         time_period = self.time_dict["time_period"]
         time_frequency = self.time_dict["time_frequency"]
         time_rounding = self.time_dict["time_rounding"]
@@ -178,19 +244,31 @@ class DriverData:
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
-    # Method to write dataset in dictionary format
+    # Method to write dataset in dictionary or array store format
     @staticmethod
-    def write_dset_obj(file_name, file_dset):
-        file_dict = file_dset.to_dict()
-        write_obj(file_name, file_dict)
+    def write_dset_obj(file_name, file_dset, file_format='dictionary'):
+        if file_format == 'dictionary':
+            file_dict = file_dset.to_dict()
+            write_obj(file_name, file_dict)
+        elif file_format == 'array':
+            write_dset_store(file_name, file_dset)
+        else:
+            logging.error(' ===> Ancillary file format "' + str(file_format) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
-    # Method to load dataset saved in dictionary format
+    # Method to load dataset saved in dictionary or array store format
     @staticmethod
-    def read_dset_obj(file_name):
-        file_dict = read_obj(file_name)
-        file_dset = xr.Dataset.from_dict(file_dict)
+    def read_dset_obj(file_name, file_format='dictionary'):
+        if file_format == 'dictionary':
+            file_dict = read_obj(file_name)
+            file_dset = xr.Dataset.from_dict(file_dict)
+        elif file_format == 'array':
+            file_dset = read_dset_store(file_name)
+        else:
+            logging.error(' ===> Ancillary file format "' + str(file_format) + '" is not allowed')
+            raise NotImplementedError('Case not implemented yet')
         return file_dset
     # -------------------------------------------------------------------------------------
 
@@ -208,32 +286,88 @@ class DriverData:
     # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
-    # Method to compute reference index
-    def get_interp_index(self, data_collections):
+    # Method to compute reference index (grid indexes are cached by source and reference grid)
+    def get_interp_index(self, data_geo_x, data_geo_y):
 
         file_path_grid = self.file_path_grid
 
-        if not os.path.exists(file_path_grid):
-            ref_geo_x = self.geo_collections[self.tag_coord_geo_x].values
-            ref_geo_y = self.geo_collections[self.tag_coord_geo_y].values
-
-            data_geo_x = data_collections[self.tag_coord_geo_x].values
-            data_geo_y = data_collections[self.tag_coord_geo_y].values
+        if self.interp_cache_grid is None:
+            self.interp_cache_grid = create_grid2index_cache(cache_size=self.interp_cache_size)
+            if os.path.exists(file_path_grid):
+                cache_obj = read_obj(file_path_grid)
+                if 'cache_data' in list(cache_obj.keys()):
+                    self.interp_cache_grid = create_grid2index_cache(cache_obj, cache_size=self.interp_cache_size)
+                else:
+                    logging.warning(' ===> Grid reference file in previous format; index will be computed')
+        interp_cache = self.interp_cache_grid
 
-            data_geo_index = interp_grid2index(data_geo_x, data_geo_y, ref_geo_x, ref_geo_y)
+        ref_geo_x = self.geo_collections[self.tag_coord_geo_x].values
+        ref_geo_y = self.geo_collections[self.tag_coord_geo_y].values
 
-            index_collections = {'geo_index': data_geo_index}
+        data_geo_index = get_grid2index(data_geo_x, data_geo_y, ref_geo_x, ref_geo_y,
+                                        interp_max_distance=self.interp_max_distance,
+                                        interp_cache=interp_cache)
 
+        if interp_cache['cache_updated']:
             folder_name, file_name = os.path.split(file_path_grid)
             make_folder(folder_name)
-            write_obj(file_path_grid, index_collections)
+            # Lock the grid reference file (worker(s) can update the same file; stored entries are merged)
+            with open(file_path_grid + '.lock', 'w') as file_lock:
+                fcntl.flock(file_lock, fcntl.LOCK_EX)
+                if os.path.exists(file_path_grid):
+                    cache_obj = read_obj(file_path_grid)
+                    if 'cache_data' in list(cache_obj.keys()):
+                        merge_grid2index_cache(interp_cache, cache_obj['cache_data'])
+                # Cache is replaced in a single step (readers never get a partial file)
+                file_path_tmp = file_path_grid + '.' + str(os.getpid()) + '.tmp'
+                write_obj(file_path_tmp, {'cache_data': interp_cache['cache_data']})
+                os.replace(file_path_tmp, file_path_grid)
+            interp_cache['cache_updated'] = False
 
-        else:
+        return data_geo_index
 
-            index_collections = read_obj(file_path_grid)
-            data_geo_index = index_collections['geo_index']
+    # -------------------------------------------------------------------------------------
+    # Method to plan datasets (dry-run mode; no datasets are computed)
+    def plan_data(self):
 
-        return data_geo_index
+        time_range = self.time_range
+
+        file_path_src_collections = self.file_path_src_collections
+        file_path_anc_collections = self.file_path_anc_collections
+        file_path_dst_collections = self.file_path_dst_collections
+        file_path_zip_collections = self.file_zip_dst_collections
+
+        var_src_dict = self.variable_src_dict
+
+        plan_collections = {'time_steps': time_range.__len__(), 'work_items': 0,
+                            'source_found': 0, 'source_missing': 0,
+                            'ancillary_found': 0, 'destination_found': 0}
+
+        var_mode_list = [var_fields['var_mode'] for var_fields in var_src_dict.values()]
+        for var_file_path_src in file_path_src_collections:
+            plan_collections['work_items'] += sum(var_mode_list)
+            if os.path.exists(var_file_path_src):
+                plan_collections['source_found'] += 1
+            else:
+                plan_collections['source_missing'] += 1
+
+        for id, time_step in enumerate(time_range):
+            if os.path.exists(file_path_anc_collections[id]):
+                plan_collections['ancillary_found'] += 1
+            if self.file_compression_dst:
+                var_file_path_check = file_path_zip_collections[id]
+            else:
+                var_file_path_check = file_path_dst_collections[id]
+            if os.path.exists(var_file_path_check):
+                plan_collections['destination_found'] += 1
+
+        logging.info(' ----> Plan datasets :: Time ' + str(time_range[0]) + ' - ' + str(time_range[-1]) + ' :: ' +
+                     ' :: '.join([plan_key + ': ' + str(plan_value)
+                                  for plan_key, plan_value in plan_collections.items()]))
+
+        return plan_collections
+
+    # -------------------------------------------------------------------------------------
 
     # -------------------------------------------------------------------------------------
     # Method to dump datasets
@@ -278,7 +412,7 @@ class DriverData:
 
                     logging.info(' ------> Create dataset object ... ')
 
-                    var_dset_anc = self.read_dset_obj(var_file_path_anc)
+                    var_dset_anc = self.read_dset_obj(var_file_path_anc, file_format=self.file_format_anc)
 
                     # Iterate over variables
                     var_data_dict = {}
@@ -325,7 +459,8 @@ class DriverData:
                         var_folder_name_dst, var_file_name_dst = os.path.split(var_file_path_dst)
                         make_folder(var_folder_name_dst)
                         write_dset(var_file_path_dst, var_dset, dset_compression_level=self.dst_vars_compression_level,
-                                   dset_engine=self.dst_vars_writing_engine)
+                                   dset_engine=self.dst_vars_writing_engine,
+                                   dset_encoding_profile=self.dst_vars_encoding_profile)
 
                         logging.info(' ------> Save dataset object ... DONE')
 
@@ -333,7 +468,8 @@ class DriverData:
 
                         if self.file_compression_dst:
 
-                            zip_filename(var_file_path_dst, var_file_path_zip)
+                            zip_filename(var_file_path_dst, var_file_path_zip,
+                                         zip_level=self.file_compression_level_dst)
                             if os.path.exists(var_file_path_dst):
                                 os.remove(var_file_path_dst)
 
@@ -354,17 +490,170 @@ class DriverData:
 
     # -------------------------------------------------------------------------------------
 
+    # -------------------------------------------------------------------------------------
+    # Method to organize datasets remapping all time steps of each variable together
+    def organize_data_batch(self):
+
+        logging.info(' ----> Organize datasets [batch mode] ... ')
+
+        time_range = self.time_range
+        geo_collections = self.geo_collections
+
+        file_path_src_collections = self.file_path_src_collections
+        file_path_anc_collections = self.file_path_anc_collections
+
+        var_src_dict = self.variable_src_dict
+
+        flag_upd_anc = self.flag_updating_ancillary
+
+        # Select time step(s) to compute
+        time_id_list = []
+        for id, time_step in enumerate(time_range):
+
+            var_file_path_anc = file_path_anc_collections[id]
+
+            if flag_upd_anc:
+                if os.path.exists(var_file_path_anc):
+                    os.remove(var_file_path_anc)
+
+            if not os.path.exists(var_file_path_anc):
+                time_id_list.append(id)
+            else:
+                logging.info(' -----> Time ' + str(time_step) + ' ... SKIPPED. Datasets are previously computed')
+
+        # Iterate over variable(s)
+        var_dset_collections = {}
+        for var_key, var_fields in var_src_dict.items():
+
+            logging.info(' -----> Variable ' + var_key + ' ... ')
+
+            var_mode = var_fields['var_mode']
+            var_name = var_fields['var_name']
+            var_method_compute = var_fields['var_method_compute']
+            var_attributes = var_fields['var_attributes']
+
+            if var_mode and time_id_list:
+
+                logging.info(' ------> Get geographical information ... ')
+                # Decompressed file(s) kept in memory between the grouping and the stacking step(s)
+                var_file_cache = {}
+                var_file_geo_collections = {}
+                for id in time_id_list:
+
+                    var_file_path_src = file_path_src_collections[id]
+
+                    # Group file(s) by geographical information (one stack for each source grid)
+                    if os.path.exists(var_file_path_src):
+                        var_geo_x, var_geo_y, var_geo_transform, var_geo_shape = read_file_tiff_geo(
+                            var_file_path_src, file_compression=self.file_compression_src,
+                            file_cache=var_file_cache)
+                        var_geo_key = (tuple(var_geo_transform), var_geo_shape)
+                        if var_geo_key not in list(var_file_geo_collections.keys()):
+                            var_file_geo_collections[var_geo_key] = {
+                                'geo_x': var_geo_x, 'geo_y': var_geo_y, 'geo_shape': var_geo_shape,
+                                'file_id': [], 'file_path': []}
+                        var_file_geo_collections[var_geo_key]['file_id'].append(id)
+                        var_file_geo_collections[var_geo_key]['file_path'].append(var_file_path_src)
+                    else:
+                        logging.warning(' ===> File not found ' + var_file_path_src)
+                logging.info(' ------> Get geographical information ... DONE')
+
+                for var_file_geo_fields in var_file_geo_collections.values():
+
+                    var_file_id_list = var_file_geo_fields['file_id']
+
+                    logging.info(' ------> Get data :: Stack of ' + str(var_file_id_list.__len__()) + ' file(s) ... ')
+                    # Index of the source grid and window of the source grid used by the reference grid
+                    var_geo_index = self.get_interp_index(var_file_geo_fields['geo_x'], var_file_geo_fields['geo_y'])
+                    var_geo_window, var_geo_index_window = compute_grid2index_window(
+                        var_geo_index, var_file_geo_fields['geo_shape'])
+
+                    var_file_data_src = read_file_tiff_stack(
+                        var_file_geo_fields['file_path'], [time_range[id] for id in var_file_id_list],
+                        var_name=var_name, file_window=var_geo_window, file_compression=self.file_compression_src,
+                        file_cache=var_file_cache)
+                    for var_file_path_src in var_file_geo_fields['file_path']:
+                        var_file_cache.pop(var_file_path_src, None)
+                    logging.info(' ------> Get data :: Stack of ' + str(var_file_id_list.__len__()) +
+                                 ' file(s) ... DONE')
+
+                    logging.info(' ------> Compute data ... ')
+                    driver_variable = DriverVariable(var_obj=var_file_data_src, ref_obj=geo_collections,
+                                                     var_attributes=var_attributes,
+                                                     fx_name=var_method_compute['name'],
+                                                     fx_parameters=var_method_compute['params'],
+                                                     fx_outcome=var_method_compute['outcome'],
+                                                     tag_var_data=var_name)
+
+                    var_collections = driver_variable.compute_data(ref_geo_index=var_geo_index_window)
+
+                    for var_dst_name_step, var_dst_data_stack in var_collections.items():
+                        for var_n, id in enumerate(var_file_id_list):
+
+                            var_da = convert_values2da(var_dst_data_stack[var_n],
+                                                       geo_collections[self.tag_coord_geo_x].values,
+                                                       geo_collections[self.tag_coord_geo_y].values,
+                                                       var_name=var_dst_name_step,
+                                                       coord_name_x=self.tag_coord_geo_x,
+                                                       coord_name_y=self.tag_coord_geo_y,
+                                                       dim_name_x=self.tag_dim_geo_x, dim_name_y=self.tag_dim_geo_y)
+                            if id not in list(var_dset_collections.keys()):
+                                var_dset_collections[id] = var_da.to_dataset(name=var_dst_name_step)
+                            else:
+                                var_dset_collections[id][var_dst_name_step] = var_da
+                    logging.info(' ------> Compute data ... DONE')
+
+                logging.info(' -----> Variable ' + var_key + ' ... DONE')
+
+            elif not var_mode:
+                logging.info(' -----> Variable ' + var_key + ' ... SKIPPED. Variable mode not activated.')
+            else:
+                logging.info(' -----> Variable ' + var_key + ' ... SKIPPED. Datasets are previously computed')
+
+        # Save time step(s)
+        for id in time_id_list:
+
+            time_step = time_range[id]
+            var_file_path_anc = file_path_anc_collections[id]
+
+            if id in list(var_dset_collections.keys()):
+                var_dset = var_dset_collections[id]
+
+                var_folder_name_anc, var_file_name_anc = os.path.split(var_file_path_anc)
+                make_folder(var_folder_name_anc)
+
+                var_dset.attrs = self.geo_collections.attrs
+                self.write_dset_obj(var_file_path_anc, var_dset, file_format=self.file_format_anc)
+
+                logging.info(' -----> Time ' + str(time_step) + ' ... DONE')
+            else:
+                logging.info(' -----> Time ' + str(time_step) + ' ... SKIPPED. Datasets are undefined')
+
+        logging.info(' ----> Organize datasets [batch mode] ... DONE')
+
+    # -------------------------------------------------------------------------------------
+
     # -------------------------------------------------------------------------------------
     # Method to organize datasets
     def organize_data(self):
 
+        if self.flag_batching_time:
+            self.organize_data_batch()
+        else:
+            self.organize_data_step()
+
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Method to organize datasets computing time steps one by one
+    def organize_data_step(self):
+
         logging.info(' ----> Organize datasets ... ')
 
         time_range = self.time_range
         geo_collections = self.geo_collections
 
         file_path_src_collections = self.file_path_src_collections
-        file_unzip_src_collections = self.file_unzip_src_collections
         file_path_anc_collections = self.file_path_anc_collections
 
         var_src_dict = self.variable_src_dict
@@ -384,7 +673,6 @@ class DriverData:
             if not os.path.exists(var_file_path_anc):
 
                 var_dset = None
-                var_file_unzip_src = None
                 for var_key, var_fields in var_src_dict.items():
 
                     logging.info(' ------> Variable ' + var_key + ' ... ')
@@ -395,42 +683,28 @@ class DriverData:
                     var_attributes = var_fields['var_attributes']
 
                     var_file_path_src = file_path_src_collections[id]
-                    var_file_unzip_src = file_unzip_src_collections[id]
 
                     if var_mode:
 
-                        logging.info(' -------> Unzip file ... ')
-
-                        if self.file_compression_src:
-
-                            if os.path.exists(var_file_path_src):
-
-                                if not os.path.exists(var_file_unzip_src):
-                                    unzip_filename(var_file_path_src, var_file_unzip_src)
-                                    logging.info(' -------> Unzip file ... DONE')
-                                else:
-                                    logging.info(' -------> Unzip file ... SKIPPED. Decompression previously done.')
-                            else:
-                                logging.info(' -------> Unzip file ... SKIPPED')
-                                logging.warning(' ===> File not found ' + var_file_path_src)
-                        else:
-                            var_file_unzip_src = var_file_path_src
-                            logging.info(' -------> Unzip file ... SKIPPED. Decompression not activated')
-
                         logging.info(' -------> Get data ... ')
-                        if os.path.exists(var_file_unzip_src):
-                            var_file_data_src = read_file_tiff(var_file_unzip_src, var_name=var_name)
+                        if os.path.exists(var_file_path_src):
+                            # Compressed file is decompressed in memory
+                            var_file_data_src = read_file_tiff(var_file_path_src, var_name=var_name,
+                                                               file_bbox=self.file_window_bbox,
+                                                               file_margin=self.file_window_margin,
+                                                               file_compression=self.file_compression_src)
                             logging.info(' -------> Get data  ... DONE')
                         else:
                             logging.info(' -------> Get data  ... FAILED')
-                            logging.warning(' ===> File not found ' + var_file_unzip_src)
+                            logging.warning(' ===> File not found ' + var_file_path_src)
                             var_file_data_src = None
 
                         logging.info(' -------> Compute data ... ')
                         if var_file_data_src is not None:
 
-                            if self.interp_index_grid is None:
-                                self.interp_index_grid = self.get_interp_index(var_file_data_src)
+                            var_geo_index = self.get_interp_index(
+                                var_file_data_src[self.tag_coord_geo_x].values,
+                                var_file_data_src[self.tag_coord_geo_y].values)
 
                             driver_variable = DriverVariable(var_obj=var_file_data_src, ref_obj=geo_collections,
                                                              var_attributes=var_attributes,
@@ -439,7 +713,7 @@ class DriverData:
                                                              fx_outcome=var_method_compute['outcome'],
                                                              tag_var_data=var_name)
 
-                            var_collections = driver_variable.compute_data(ref_geo_index=self.interp_index_grid)
+                            var_collections = driver_variable.compute_data(ref_geo_index=var_geo_index)
 
                             for var_dst_name_step, var_dst_data_step in var_collections.items():
 
@@ -469,19 +743,13 @@ class DriverData:
                     make_folder(var_folder_name_anc)
 
                     var_dset.attrs = self.geo_collections.attrs
-                    self.write_dset_obj(var_file_path_anc, var_dset)
+                    self.write_dset_obj(var_file_path_anc, var_dset, file_format=self.file_format_anc)
 
                     logging.info(' -----> Time ' + str(time_step) + ' ... DONE')
 
                 else:
                     logging.info(' -----> Time ' + str(time_step) + ' ... SKIPPED. Datasets are undefined')
 
-                # Delete uncompressed file
-                if self.file_compression_src:
-                    if var_file_unzip_src is not None:
-                        if os.path.exists(var_file_unzip_src):
-                            os.remove(var_file_unzip_src)
-
             else:
                 logging.info(' -----> Time ' + str(time_step) + ' ... SKIPPED. Datasets are previously computed')
 
@@ -513,7 +781,8 @@ class DriverData:
             folder_name_anc_list = list_folder(folder_name_anc_main)
             for folder_name_anc_step in folder_name_anc_list:
                 if os.path.exists(folder_name_anc_step):
-                    os.rmdir(folder_name_anc_step)
+                    if not any(os.scandir(folder_name_anc_step)):
+                        os.rmdir(folder_name_anc_step)
 
     # -------------------------------------------------------------------------------------
 
@@ -1,21 +1,27 @@
 # -------------------------------------------------------------------------------------
 # Library
 import logging
+import hashlib
 import numpy as np
+
+from collections import OrderedDict
 from scipy.interpolate import griddata
+from scipy.spatial import cKDTree
 # -------------------------------------------------------------------------------------
 
 
 # -------------------------------------------------------------------------------------
 # Method to interpolate grid index to a reference dataset
-def interp_grid2index(lons_in, lats_in, lons_out, lats_out, nodata=-9999, interp_method='nearest'):
+def interp_grid2index(lons_in, lats_in, lons_out, lats_out, nodata=-9999, interp_method='nearest',
+                      interp_max_distance=None, interp_workers=-1):
+
+    if interp_method != 'nearest':
+        logging.error(' ===> Interpolation method "' + str(interp_method) + '" is not allowed for grid index')
+        raise NotImplementedError('Case not implemented yet')
 
     if lons_in.shape.__len__() == 1 and lats_in.shape.__len__() == 1:
-        shape_in = lons_in.shape[0] * lats_in.shape[0]
         lons_in_2d, lats_in_2d = np.meshgrid(lons_in, lats_in)
-
     elif lons_in.shape.__len__() == 2 and lats_in.shape.__len__() == 2:
-        shape_in = lons_in.shape[0] * lats_in.shape[1]
         lons_in_2d = lons_in
         lats_in_2d = lats_in
     else:
@@ -31,13 +37,145 @@ def interp_grid2index(lons_in, lats_in, lons_out, lats_out, nodata=-9999, interp
         logging.error(' ===> Geographical datasets output dimensions in bed format')
         raise IOError('Geographical data format not allowed')
 
-    index_in = np.arange(0, shape_in)
-    index_out = griddata((lons_in_2d.ravel(), lats_in_2d.ravel()), index_in,
-                         (lons_out_2d.ravel(), lats_out_2d.ravel()), method=interp_method, fill_value=nodata)
+    # Nearest neighbour(s) of the output point(s) (distance in the units of the geographical coordinates)
+    if interp_max_distance is None:
+        interp_max_distance = np.inf
+    tree_in = cKDTree(np.column_stack((lons_in_2d.ravel(), lats_in_2d.ravel())))
+    _, index_out = tree_in.query(np.column_stack((lons_out_2d.ravel(), lats_out_2d.ravel())), k=1,
+                                 distance_upper_bound=interp_max_distance, workers=interp_workers)
+
+    # Point(s) over the maximum distance (returned with index equal to the number of input points)
+    index_out = index_out.astype(np.int64)
+    index_out[index_out >= tree_in.n] = nodata
+
+    return index_out
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to create grid index cache (indexes are stored in least recently used order)
+def create_grid2index_cache(cache_obj=None, cache_size=10):
+
+    cache_data = OrderedDict()
+    if cache_obj is not None:
+        cache_data.update(cache_obj['cache_data'])
+
+    interp_cache = {'cache_size': cache_size, 'cache_data': cache_data, 'cache_updated': False}
+    update_grid2index_cache(interp_cache)
+
+    return interp_cache
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to update grid index cache (removing the least recently used entries)
+def update_grid2index_cache(interp_cache):
+
+    cache_size = interp_cache['cache_size']
+    cache_data = interp_cache['cache_data']
+    if cache_size is not None:
+        while cache_data.__len__() > cache_size:
+            cache_data.popitem(last=False)
+
+    return interp_cache
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to merge grid index cache with stored entries (stored entries not in the cache are the least recently used)
+def merge_grid2index_cache(interp_cache, cache_data):
+
+    cache_merged = OrderedDict([(cache_key, cache_value) for cache_key, cache_value in cache_data.items()
+                                if cache_key not in interp_cache['cache_data']])
+    cache_merged.update(interp_cache['cache_data'])
+    interp_cache['cache_data'] = cache_merged
+    update_grid2index_cache(interp_cache)
+
+    return interp_cache
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to define grid index key (hash of source grid, reference grid and interpolation settings)
+def define_grid2index_key(lons_in, lats_in, lons_out, lats_out, interp_method='nearest', interp_max_distance=None):
+
+    key_hash = hashlib.sha1()
+    for geo_values in [lons_in, lats_in, lons_out, lats_out]:
+        geo_values = np.asarray(geo_values, dtype=np.float64)
+        key_hash.update(str(geo_values.shape).encode('utf-8'))
+        key_hash.update(np.ascontiguousarray(geo_values).tobytes())
+    key_hash.update(':'.join([str(interp_method), str(interp_max_distance)]).encode('utf-8'))
+
+    return key_hash.hexdigest()
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to get grid index (using cache if defined)
+def get_grid2index(lons_in, lats_in, lons_out, lats_out, nodata=-9999, interp_method='nearest',
+                   interp_max_distance=None, interp_cache=None):
+
+    index_key, index_out = None, None
+    if interp_cache is not None:
+
+        index_key = define_grid2index_key(lons_in, lats_in, lons_out, lats_out,
+                                          interp_method=interp_method, interp_max_distance=interp_max_distance)
+
+        cache_data = interp_cache['cache_data']
+        if index_key in cache_data:
+            index_out = cache_data[index_key]
+            cache_data.move_to_end(index_key)
+
+    if index_out is None:
+        index_out = interp_grid2index(lons_in, lats_in, lons_out, lats_out, nodata=nodata,
+                                      interp_method=interp_method, interp_max_distance=interp_max_distance)
+
+        if interp_cache is not None:
+            interp_cache['cache_data'][index_key] = index_out
+            interp_cache['cache_updated'] = True
+            update_grid2index_cache(interp_cache)
 
     return index_out
+# -------------------------------------------------------------------------------------
+
 
 # -------------------------------------------------------------------------------------
+# Method to compute the source window used by a grid index (and the index referred to the window)
+def compute_grid2index_window(index_in, shape_in):
+
+    index_valid = index_in >= 0
+    if not np.any(index_valid):
+        return (0, shape_in[0], 0, shape_in[1]), index_in
+
+    rows_in, cols_in = np.divmod(index_in[index_valid], shape_in[1])
+    row_start, row_end = int(rows_in.min()), int(rows_in.max()) + 1
+    col_start, col_end = int(cols_in.min()), int(cols_in.max()) + 1
+
+    index_window = np.array(index_in, dtype=np.int64, copy=True)
+    index_window[index_valid] = (rows_in - row_start) * (col_end - col_start) + (cols_in - col_start)
+
+    return (row_start, row_end, col_start, col_end), index_window
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to apply grid index to data (leading dimension(s) as time are gathered together)
+def interp_index2map(values_in, index_out, shape_out, nodata=-9999):
+
+    values_in = np.asarray(values_in)
+    shape_stack = values_in.shape[:-2]
+    values_flat = values_in.reshape(shape_stack + (-1,))
+
+    index_valid = index_out >= 0
+    values_tmp = values_flat[..., np.where(index_valid, index_out, 0)]
+    if not np.all(index_valid):
+        values_tmp = np.where(index_valid, values_tmp, nodata)
+
+    values_out = np.reshape(values_tmp, shape_stack + tuple(shape_out))
+
+    return values_out
+# -------------------------------------------------------------------------------------
 
 
 # -------------------------------------------------------------------------------------
@@ -50,8 +188,7 @@ def interp_grid2map(lons_in, lats_in, values_in, lons_out, lats_out, nodata=-999
                               (lons_out, lats_out), method=interp_method,
                               fill_value=nodata)
     else:
-        values_tmp = values_in.ravel()[index_out]
-        values_out = np.reshape(values_tmp, [lons_out.shape[0], lats_out.shape[1]])
+        values_out = interp_index2map(values_in, index_out, [lons_out.shape[0], lats_out.shape[1]], nodata=nodata)
 
     return values_out
 # -------------------------------------------------------------------------------------
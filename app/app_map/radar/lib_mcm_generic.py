@@ -84,7 +84,7 @@ def delete_folder(path_folder):
 # Method to make folder
 def make_folder(path_folder):
     if not os.path.exists(path_folder):
-        os.makedirs(path_folder)
+        os.makedirs(path_folder, exist_ok=True)
 # -------------------------------------------------------------------------------------
 
 
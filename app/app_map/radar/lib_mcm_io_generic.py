@@ -9,6 +9,7 @@ Version:       '1.0.0'
 #######################################################################################
 # Libraries
 import logging
+import gzip
 import tempfile
 import os
 import re
@@ -16,6 +17,10 @@ import json
 import pickle
 import rasterio
 
+from contextlib import contextmanager
+from rasterio.io import MemoryFile
+from rasterio.windows import Window
+
 import pandas as pd
 import numpy as np
 import xarray as xr
@@ -38,52 +43,116 @@ attributes_defined_lut = {
         'Missing_value': ['Missing_value', 'missing_value']
     }
 }
+# Array store file signature
+store_magic = b'HYDESTORE1'
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to open tiff file (gzipped file is decompressed in memory once if a file cache is defined)
+@contextmanager
+def open_file_tiff(file_name, file_compression=False, file_cache=None):
+    if file_compression:
+        if (file_cache is not None) and (file_name in file_cache):
+            file_bytes = file_cache[file_name]
+        else:
+            with gzip.open(file_name, 'rb') as file_handle:
+                file_bytes = file_handle.read()
+            if file_cache is not None:
+                file_cache[file_name] = file_bytes
+        with MemoryFile(file_bytes) as file_memory:
+            with file_memory.open() as dset_in:
+                yield dset_in
+    else:
+        with rasterio.open(file_name) as dset_in:
+            yield dset_in
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to define file geographical coordinates (longitude from left to right, latitude from top to bottom)
+def define_file_geo(file_bounds, file_res, decimal_round=7):
+
+    center_right = file_bounds.right - (file_res[0] / 2)
+    center_left = file_bounds.left + (file_res[0] / 2)
+    center_top = file_bounds.top - (file_res[1] / 2)
+    center_bottom = file_bounds.bottom + (file_res[1] / 2)
+
+    lon = np.arange(center_left, center_right + np.abs(file_res[0] / 2), np.abs(file_res[0]), float)
+    lat = np.arange(center_bottom, center_top + np.abs(file_res[0] / 2), np.abs(file_res[1]), float)
+
+    assert round(np.min(lon), decimal_round) == round(center_left, decimal_round)
+    assert round(np.max(lon), decimal_round) == round(center_right, decimal_round)
+    assert round(np.min(lat), decimal_round) == round(center_bottom, decimal_round)
+    assert round(np.max(lat), decimal_round) == round(center_top, decimal_round)
+
+    lat = np.flipud(lat)
+
+    return lon, lat
+
 # -------------------------------------------------------------------------------------
 
 
 # -------------------------------------------------------------------------------------
-# Method to read tiff file
+# Method to compute file window of a bounding box (in (row_start, row_end, col_start, col_end) format)
+def compute_file_window(file_transform, file_shape, file_bbox=None, file_margin=2):
+
+    if file_bbox is None:
+        return 0, file_shape[0], 0, file_shape[1]
+
+    # Bounding box in [min_lon, max_lat, max_lon, min_lat] format
+    bbox_left, bbox_top, bbox_right, bbox_bottom = file_bbox
+
+    # Transform of north-up grid(s) [cellsize_x, 0, left, 0, -cellsize_y, top]
+    col_left = (bbox_left - file_transform[2]) / file_transform[0]
+    col_right = (bbox_right - file_transform[2]) / file_transform[0]
+    row_top = (bbox_top - file_transform[5]) / file_transform[4]
+    row_bottom = (bbox_bottom - file_transform[5]) / file_transform[4]
+
+    row_start = max(int(np.floor(min(row_top, row_bottom))) - file_margin, 0)
+    row_end = min(int(np.ceil(max(row_top, row_bottom))) + file_margin, file_shape[0])
+    col_start = max(int(np.floor(min(col_left, col_right))) - file_margin, 0)
+    col_end = min(int(np.ceil(max(col_left, col_right))) + file_margin, file_shape[1])
+
+    if (row_start >= row_end) or (col_start >= col_end):
+        logging.warning(' ===> Bounding box is outside of the file domain; the file will be fully read')
+        return 0, file_shape[0], 0, file_shape[1]
+
+    return row_start, row_end, col_start, col_end
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to read tiff file (only the window of the bounding box if defined)
 def read_file_tiff(file_name, var_name='variable', var_nodata=-9999.0,
                    coord_name_x='west_east', coord_name_y='south_north',
-                   dim_name_x='west_east', dim_name_y='south_north'):
+                   dim_name_x='west_east', dim_name_y='south_north',
+                   file_bbox=None, file_margin=2, file_compression=False):
 
-    with rasterio.open(file_name) as dset_in:
+    decimal_round = 7
+
+    with open_file_tiff(file_name, file_compression=file_compression) as dset_in:
         meta = dset_in.profile
         bounds = dset_in.bounds
         res = dset_in.res
         transform = dset_in.transform
         nodata = dset_in.nodata
         dtype = dset_in.dtypes
-        data = dset_in.read()
-        values = data[0, :, :]
-
-    decimal_round = 7
-
-    center_right = bounds.right - (res[0] / 2)
-    center_left = bounds.left + (res[0] / 2)
-    center_top = bounds.top - (res[1] / 2)
-    center_bottom = bounds.bottom + (res[1] / 2)
 
-    lon = np.arange(center_left, center_right + np.abs(res[0] / 2), np.abs(res[0]), float)
-    lat = np.arange(center_bottom, center_top + np.abs(res[0] / 2), np.abs(res[1]), float)
-    lons, lats = np.meshgrid(lon, lat)
+        row_start, row_end, col_start, col_end = compute_file_window(
+            transform, dset_in.shape, file_bbox=file_bbox, file_margin=file_margin)
+        window = Window.from_slices((row_start, row_end), (col_start, col_end))
 
-    min_lon_round = round(np.min(lons), decimal_round)
-    max_lon_round = round(np.max(lons), decimal_round)
-    min_lat_round = round(np.min(lats), decimal_round)
-    max_lat_round = round(np.max(lats), decimal_round)
+        values = dset_in.read(1, window=window)
 
-    center_right_round = round(center_right, decimal_round)
-    center_left_round = round(center_left, decimal_round)
-    center_bottom_round = round(center_bottom, decimal_round)
-    center_top_round = round(center_top, decimal_round)
+    lon, lat = define_file_geo(bounds, res, decimal_round=decimal_round)
+    lon, lat = lon[col_start:col_end], lat[row_start:row_end]
 
-    assert min_lon_round == center_left_round
-    assert max_lon_round == center_right_round
-    assert min_lat_round == center_bottom_round
-    assert max_lat_round == center_top_round
-
-    lats = np.flipud(lats)
+    # Window information
+    if file_bbox is not None:
+        transform = rasterio.windows.transform(window, transform)
+        meta = dict(meta, width=values.shape[1], height=values.shape[0], transform=transform)
 
     dims = values.shape
     high = dims[0]  # nrows
@@ -92,9 +161,10 @@ def read_file_tiff(file_name, var_name='variable', var_nodata=-9999.0,
     if nodata is None:
         nodata = var_nodata
 
-    bounding_box = [min_lon_round, max_lat_round, max_lon_round, min_lat_round]
+    bounding_box = [round(np.min(lon), decimal_round), round(np.max(lat), decimal_round),
+                    round(np.max(lon), decimal_round), round(np.min(lat), decimal_round)]
 
-    da_out = create_darray_2d(values, lons, lats,
+    da_out = create_darray_2d(values, lon, lat,
                               coord_name_x=coord_name_x, coord_name_y=coord_name_y,
                               dim_name_x=dim_name_x, dim_name_y=dim_name_y, name=var_name)
 
@@ -110,10 +180,77 @@ def read_file_tiff(file_name, var_name='variable', var_nodata=-9999.0,
 
 
 # -------------------------------------------------------------------------------------
-# Method to read hdf4 file
+# Method to read tiff geographical information (no data values are read)
+def read_file_tiff_geo(file_name, file_compression=False, file_cache=None):
+
+    with open_file_tiff(file_name, file_compression=file_compression, file_cache=file_cache) as dset_in:
+        bounds = dset_in.bounds
+        res = dset_in.res
+        transform = dset_in.transform
+        shape = dset_in.shape
+
+    lon, lat = define_file_geo(bounds, res)
+
+    return lon, lat, transform, shape
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to read tiff files with the same geographical information in a (time, rows, cols) stack
+def read_file_tiff_stack(file_name_list, file_time_list, var_name='variable', var_nodata=-9999.0,
+                         file_window=None, coord_name_x='west_east', coord_name_y='south_north',
+                         dim_name_x='west_east', dim_name_y='south_north', dim_name_time='time',
+                         file_compression=False, file_cache=None):
+
+    values = None
+    nodata = None
+    for file_id, file_name in enumerate(file_name_list):
+        with open_file_tiff(file_name, file_compression=file_compression, file_cache=file_cache) as dset_in:
+
+            # Geographical information and window of the stack defined by the first file
+            if file_id == 0:
+                transform, shape = dset_in.transform, dset_in.shape
+                lon, lat = define_file_geo(dset_in.bounds, dset_in.res)
+
+                # Window of the data in (row_start, row_end, col_start, col_end) format
+                if file_window is None:
+                    file_window = (0, shape[0], 0, shape[1])
+                row_start, row_end, col_start, col_end = file_window
+                window_obj = Window.from_slices((row_start, row_end), (col_start, col_end))
+
+            elif (dset_in.transform != transform) or (dset_in.shape != shape):
+                logging.error(' ===> Geographical information of file "' + file_name + '" is not the same of the stack')
+                raise IOError('Files with different geographical information are not allowed in a stack')
+            values_step = dset_in.read(1, window=window_obj)
+            if values is None:
+                values = np.empty((file_name_list.__len__(),) + values_step.shape, dtype=values_step.dtype)
+                nodata = dset_in.nodata
+            values[file_id] = values_step
+
+    if nodata is None:
+        nodata = var_nodata
+
+    da_out = xr.DataArray(values, name=var_name, dims=[dim_name_time, dim_name_y, dim_name_x],
+                          coords={dim_name_time: (dim_name_time, pd.DatetimeIndex(file_time_list)),
+                                  coord_name_x: (dim_name_x, lon[col_start:col_end]),
+                                  coord_name_y: (dim_name_y, lat[row_start:row_end])})
+    da_out.attrs = {'high': shape[0], 'wide': shape[1], 'window': file_window,
+                    'no_data': nodata, 'transform': transform}
+
+    dset_out = da_out.to_dataset(name=var_name)
+
+    return dset_out
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to read hdf4 file (only the window of the bounding box if defined)
 def read_file_hdf4(file_name, var_name='variable', var_sep=':',
                    coord_name_x='west_east', coord_name_y='south_north',
-                   dim_name_x='west_east', dim_name_y='south_north'):
+                   dim_name_x='west_east', dim_name_y='south_north',
+                   file_bbox=None, file_margin=2):
 
     dset_bands = None
     with rasterio.open(file_name) as dset:
@@ -148,36 +285,22 @@ def read_file_hdf4(file_name, var_name='variable', var_sep=':',
                     band_bounds = subdset.bounds
                     band_res = subdset.res
                     band_transform = subdset.transform
-                    # Read band data as a 2 dim arr and append to list
-                    band_values = subdset.read(1)
+                    # Read band data (window of the bounding box) as a 2 dim arr and append to list
+                    row_start, row_end, col_start, col_end = compute_file_window(
+                        band_transform, subdset.shape, file_bbox=file_bbox, file_margin=file_margin)
+                    band_window = Window.from_slices((row_start, row_end), (col_start, col_end))
+                    band_values = subdset.read(1, window=band_window)
 
                 decimal_round = 7
 
-                center_right = band_bounds.right - (band_res[0] / 2)
-                center_left = band_bounds.left + (band_res[0] / 2)
-                center_top = band_bounds.top - (band_res[1] / 2)
-                center_bottom = band_bounds.bottom + (band_res[1] / 2)
-
-                lon = np.arange(center_left, center_right + np.abs(band_res[0] / 2), np.abs(band_res[0]), float)
-                lat = np.arange(center_bottom, center_top + np.abs(band_res[0] / 2), np.abs(band_res[1]), float)
-                lons, lats = np.meshgrid(lon, lat)
+                lon, lat = define_file_geo(band_bounds, band_res, decimal_round=decimal_round)
+                lon, lat = lon[col_start:col_end], lat[row_start:row_end]
 
-                min_lon_round = round(np.min(lons), decimal_round)
-                max_lon_round = round(np.max(lons), decimal_round)
-                min_lat_round = round(np.min(lats), decimal_round)
-                max_lat_round = round(np.max(lats), decimal_round)
-
-                center_right_round = round(center_right, decimal_round)
-                center_left_round = round(center_left, decimal_round)
-                center_bottom_round = round(center_bottom, decimal_round)
-                center_top_round = round(center_top, decimal_round)
-
-                assert min_lon_round == center_left_round
-                assert max_lon_round == center_right_round
-                assert min_lat_round == center_bottom_round
-                assert max_lat_round == center_top_round
-
-                lats = np.flipud(lats)
+                # Window information
+                if file_bbox is not None:
+                    band_transform = rasterio.windows.transform(band_window, band_transform)
+                    band_meta = dict(band_meta, width=band_values.shape[1], height=band_values.shape[0],
+                                     transform=band_transform)
 
                 if band_dtype[0] == 'uint8':
                     band_values = band_values.astype(dtype=np.int)
@@ -190,9 +313,10 @@ def read_file_hdf4(file_name, var_name='variable', var_sep=':',
                 high = dims[0]  # nrows
                 wide = dims[1]  # cols
 
-                bounding_box = [min_lon_round, max_lat_round, max_lon_round, min_lat_round]
+                bounding_box = [round(np.min(lon), decimal_round), round(np.max(lat), decimal_round),
+                                round(np.max(lon), decimal_round), round(np.min(lat), decimal_round)]
 
-                band_da = create_darray_2d(band_values, lons, lats,
+                band_da = create_darray_2d(band_values, lon, lat,
                                            coord_name_x=coord_name_x, coord_name_y=coord_name_y,
                                            dim_name_x=dim_name_x, dim_name_y=dim_name_y, name=var_name)
 
@@ -534,7 +658,13 @@ def clip_data(map, valid_range=None, missing_value=None):
 # Method to write dataset
 def write_dset(file_name,
                dset_data, dset_mode='w', dset_engine='h5netcdf', dset_compression_level=0, dset_format='NETCDF4',
-               dim_key_time='time', fill_value=-9999.0):
+               dim_key_time='time', fill_value=-9999.0, dset_encoding_profile=None):
+
+    # Encoding profile (keys: complevel, shuffle, chunk_sizes, dtype, least_significant_digit)
+    if dset_encoding_profile is None:
+        dset_encoding_profile = {}
+    if 'complevel' in list(dset_encoding_profile.keys()):
+        dset_compression_level = dset_encoding_profile['complevel']
 
     dset_encoding = {}
     for var_name in dset_data.data_vars:
@@ -553,6 +683,21 @@ def write_dset(file_name,
                 var_attrs_encoding['zlib'] = True
             if 'complevel' not in list(var_attrs_encoding.keys()):
                 var_attrs_encoding['complevel'] = dset_compression_level
+            if 'shuffle' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['shuffle'] = dset_encoding_profile['shuffle']
+
+        var_dims = dset_data[var_name].dims
+        if ('chunk_sizes' in list(dset_encoding_profile.keys())) and (var_dims.__len__() > 0):
+            chunk_sizes = dset_encoding_profile['chunk_sizes']
+            var_attrs_encoding['chunksizes'] = tuple(
+                [min(chunk_sizes.get(var_dim, dset_data.sizes[var_dim]), dset_data.sizes[var_dim])
+                 for var_dim in var_dims])
+
+        if np.issubdtype(dset_data[var_name].dtype, np.floating):
+            if 'dtype' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['dtype'] = dset_encoding_profile['dtype']
+            if 'least_significant_digit' in list(dset_encoding_profile.keys()):
+                var_attrs_encoding['least_significant_digit'] = dset_encoding_profile['least_significant_digit']
 
         dset_encoding[var_name] = var_attrs_encoding
 
@@ -584,3 +729,89 @@ def write_obj(filename, data):
     with open(filename, 'wb') as handle:
         pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
 # -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to write dataset in array store format (raw arrays in one memory-mappable file)
+def write_dset_store(filename, dset, store_align=64):
+
+    # Organize header (dims, attrs and array layout) and raw array blocks
+    store_header = {'attrs': dict(dset.attrs), 'coords': {}, 'data_vars': {}}
+    store_blocks, store_offset = [], 0
+    for store_group, store_collections in [('coords', dset.coords), ('data_vars', dset.data_vars)]:
+        for var_name, var_da in store_collections.items():
+            var_values = np.asarray(var_da.values)
+            var_info = {'dims': var_da.dims, 'attrs': dict(var_da.attrs)}
+            if var_values.dtype.hasobject:
+                var_info['values'] = var_values
+            else:
+                var_info['dtype'] = var_values.dtype.str
+                var_info['shape'] = var_values.shape
+                var_info['offset'] = store_offset
+                store_blocks.append(var_values)
+                store_offset += -(-var_values.nbytes // store_align) * store_align
+            store_header[store_group][var_name] = var_info
+
+    store_header_bytes = pickle.dumps(store_header, protocol=pickle.HIGHEST_PROTOCOL)
+    store_start = get_dset_store_start(store_header_bytes.__len__(), store_align)
+
+    if os.path.exists(filename):
+        os.remove(filename)
+    with open(filename, 'wb') as handle:
+        handle.write(store_magic)
+        handle.write(np.uint64(store_header_bytes.__len__()).tobytes())
+        handle.write(store_header_bytes)
+        handle.write(b'\0' * (store_start - handle.tell()))
+        for var_values in store_blocks:
+            handle.write(var_values.tobytes())
+            handle.write(b'\0' * (-var_values.nbytes % store_align))
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to read dataset in array store format (arrays are memory-mapped in copy-on-write mode)
+def read_dset_store(filename, store_align=64, store_mmap=True):
+
+    if not os.path.exists(filename):
+        return None
+
+    with open(filename, 'rb') as handle:
+        file_magic = handle.read(store_magic.__len__())
+        if file_magic != store_magic:
+            # Dataset saved in dictionary format (previous workspace)
+            logging.warning(' ===> File ' + filename + ' is not in array store format; read as dictionary object')
+            return xr.Dataset.from_dict(read_obj(filename))
+        store_header_n = int(np.frombuffer(handle.read(8), dtype=np.uint64)[0])
+        store_header = pickle.loads(handle.read(store_header_n))
+    store_start = get_dset_store_start(store_header_n, store_align)
+
+    store_collections = {}
+    for store_group in ['coords', 'data_vars']:
+        store_collections[store_group] = {}
+        for var_name, var_info in store_header[store_group].items():
+            if 'values' in var_info:
+                var_values = var_info['values']
+            else:
+                var_dtype, var_shape = np.dtype(var_info['dtype']), tuple(var_info['shape'])
+                var_offset = store_start + var_info['offset']
+                if store_mmap and int(np.prod(var_shape)) > 0 and var_shape.__len__() > 0:
+                    var_values = np.memmap(filename, dtype=var_dtype, mode='c', offset=var_offset, shape=var_shape)
+                else:
+                    var_values = np.fromfile(filename, dtype=var_dtype, count=int(np.prod(var_shape)),
+                                             offset=var_offset).reshape(var_shape)
+            store_collections[store_group][var_name] = (var_info['dims'], var_values, var_info['attrs'])
+
+    dset = xr.Dataset(data_vars=store_collections['data_vars'], coords=store_collections['coords'],
+                      attrs=store_header['attrs'])
+
+    return dset
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to get the start of array block(s) in array store format
+def get_dset_store_start(store_header_n, store_align=64):
+    store_start = store_magic.__len__() + 8 + store_header_n
+    store_start = -(-store_start // store_align) * store_align
+    return store_start
+# -------------------------------------------------------------------------------------
@@ -12,7 +12,7 @@ Version:       '1.0.0'
 import logging
 import numpy as np
 
-from lib_mcm_analysis_interpolation_grid import interp_grid2map
+from lib_mcm_analysis_interpolation_grid import interp_grid2map, interp_index2map
 
 # Debug
 import matplotlib.pylab as plt
@@ -34,36 +34,47 @@ def compute_rain(var_data, var_geo_x, var_geo_y,
         logging.warning(' ===> Rain variable units in wrong format; expected in [mm/h], passed in [' +
                         var_units + ']')
 
-    if var_data.ndim != 2:
-        logging.error(' ===> Variable dimensions are not allowed')
-        raise IOError('Variable data format must be equal to 2')
+    # Grid index defined (stack of time steps allowed; grid(s) are not needed)
+    if ref_geo_index is not None:
+
+        if var_data.ndim not in [2, 3]:
+            logging.error(' ===> Variable dimensions are not allowed')
+            raise IOError('Variable data format must be equal to 2 or 3')
+
+        grid_data = interp_index2map(var_data, ref_geo_index, ref_geo_z.shape, nodata=fx_nodata)
 
-    if ref_geo_x.ndim == 1 and ref_geo_y.ndim == 1:
-        ref_grid_geo_x, ref_grid_geo_y = np.meshgrid(ref_geo_x, ref_geo_y)
-    elif ref_geo_x.ndim == 2 and ref_geo_y.ndim == 2:
-        ref_grid_geo_x = ref_geo_x
-        ref_grid_geo_y = ref_geo_y
-    else:
-        logging.error(' ===> Reference dimensions in bed format')
-        raise IOError('Geographical data format not allowed')
-
-    if var_geo_x.ndim == 1 and var_geo_y.ndim == 1:
-        var_grid_geo_x, var_grid_geo_y = np.meshgrid(var_geo_x, var_geo_y)
-    elif var_geo_x.ndim == 2 and var_geo_y.ndim == 2:
-        var_grid_geo_x = var_geo_x
-        var_grid_geo_y = var_geo_y
     else:
-        logging.error(' ===> Variable dimensions in bed format')
-        raise IOError('Variable data format not allowed')
 
-    # Interpolate grid data to map
-    grid_data = interp_grid2map(var_grid_geo_x, var_grid_geo_y, var_data, ref_grid_geo_x, ref_grid_geo_y,
-                                nodata=fx_nodata, interp_method=fx_interp_method, index_out=ref_geo_index)
+        if var_data.ndim != 2:
+            logging.error(' ===> Variable dimensions are not allowed')
+            raise IOError('Variable data format must be equal to 2')
+
+        if ref_geo_x.ndim == 1 and ref_geo_y.ndim == 1:
+            ref_grid_geo_x, ref_grid_geo_y = np.meshgrid(ref_geo_x, ref_geo_y)
+        elif ref_geo_x.ndim == 2 and ref_geo_y.ndim == 2:
+            ref_grid_geo_x = ref_geo_x
+            ref_grid_geo_y = ref_geo_y
+        else:
+            logging.error(' ===> Reference dimensions in bed format')
+            raise IOError('Geographical data format not allowed')
+
+        if var_geo_x.ndim == 1 and var_geo_y.ndim == 1:
+            var_grid_geo_x, var_grid_geo_y = np.meshgrid(var_geo_x, var_geo_y)
+        elif var_geo_x.ndim == 2 and var_geo_y.ndim == 2:
+            var_grid_geo_x = var_geo_x
+            var_grid_geo_y = var_geo_y
+        else:
+            logging.error(' ===> Variable dimensions in bed format')
+            raise IOError('Variable data format not allowed')
+
+        # Interpolate grid data to map
+        grid_data = interp_grid2map(var_grid_geo_x, var_grid_geo_y, var_data, ref_grid_geo_x, ref_grid_geo_y,
+                                    nodata=fx_nodata, interp_method=fx_interp_method)
 
     # Filter data nan and over domain
     grid_data[np.isnan(grid_data)] = var_missing_value
-    grid_data[np.isnan(ref_geo_z)] = var_fill_value
-    grid_data[ref_geo_z == ref_no_data] = np.nan
+    grid_data[..., np.isnan(ref_geo_z)] = var_fill_value
+    grid_data[..., ref_geo_z == ref_no_data] = np.nan
 
     return grid_data
 # -------------------------------------------------------------------------------------
@@ -0,0 +1,96 @@
+"""
+Test Features:
+
+Name:          test_ground_network_stepwisefit
+Date:          '20261018'
+Version:       '1.0.0'
+"""
+
+# -------------------------------------------------------------------------------------
+# Libraries
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+# Stepwisefit libraries of the ground network package(s) (not installed; loaded from the file path)
+folder_ground_network = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     os.pardir, 'app', 'app_map', 'ground_network')
+lib_names = {'ws': 'lib_ws_analysis_regression_stepwisefit',
+             'hs': 'lib_hs_analysis_regression_stepwisefit'}
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to load a stepwisefit library
+def load_lib(lib_tag):
+    lib_name = lib_names[lib_tag]
+    lib_spec = importlib.util.spec_from_file_location(
+        lib_name, os.path.join(folder_ground_network, lib_tag, lib_name + '.py'))
+    lib_module = importlib.util.module_from_spec(lib_spec)
+    lib_spec.loader.exec_module(lib_module)
+    return lib_module
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to create a regression problem (a few informative predictors and optional collinear one)
+def create_data(n_obs=200, n_vars=8, seed=1, flag_collinear=False):
+    rng = np.random.default_rng(seed)
+    allx = rng.normal(size=(n_obs, n_vars))
+    if flag_collinear:
+        allx[:, -1] = 2.0 * allx[:, 0] - allx[:, 1]
+    y = 3.0 * allx[:, 0] - 2.0 * allx[:, 2] + 0.5 * allx[:, 4] + rng.normal(scale=0.8, size=n_obs)
+    return allx, y
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to check the incremental qr solver against the baseline pivoted qr solver (full stepwise run)
+@pytest.mark.parametrize('lib_tag', ['ws', 'hs'])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+@pytest.mark.parametrize('flag_collinear', [False, True])
+@pytest.mark.parametrize('scale', [False, True])
+def test_stepwisefit_solver_parity(lib_tag, seed, flag_collinear, scale):
+
+    lib = load_lib(lib_tag)
+    allx, y = create_data(seed=seed, flag_collinear=flag_collinear)
+
+    b_ref, se_ref, pval_ref, inmodel_ref, stats_ref = lib.stepwisefit(
+        allx, y, penter=0.05, premove=0.10, scale=scale, solver='qr')[0:5]
+    b_upd, se_upd, pval_upd, inmodel_upd, stats_upd = lib.stepwisefit(
+        allx, y, penter=0.05, premove=0.10, scale=scale, solver='qr_update')[0:5]
+
+    np.testing.assert_array_equal(inmodel_upd, inmodel_ref)
+    np.testing.assert_allclose(b_upd, b_ref, rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(se_upd, se_ref, rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(pval_upd, pval_ref, rtol=1e-6, atol=1e-12)
+    np.testing.assert_allclose(stats_upd.intercept, stats_ref.intercept, rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(stats_upd.rmse, stats_ref.rmse, rtol=1e-10)
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to check the incremental qr step against the baseline step (predictor(s) entering and leaving)
+@pytest.mark.parametrize('lib_tag', ['ws', 'hs'])
+def test_stepcalc_update_parity(lib_tag):
+
+    lib = load_lib(lib_tag)
+    allx, y = create_data(n_vars=6, seed=4)
+    allx = allx / allx.std(axis=0, ddof=1)
+    y = y.reshape((y.size, 1))
+
+    qrobj = lib.LazyDict(inmodel=None, Q=None, R=None)
+    inmodel = np.zeros(allx.shape[1], dtype=bool)
+    for swap in [0, 2, 4, 2, 5, 0, 1]:
+        inmodel[swap] = not inmodel[swap]
+
+        b_ref, se_ref, pval_ref = lib.stepcalc(allx, y, inmodel)[0:3]
+        b_upd, se_upd, pval_upd = lib.stepcalc_update(allx, y, inmodel, qrobj)[0:3]
+
+        np.testing.assert_allclose(b_upd, b_ref, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(se_upd, se_ref, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(pval_upd, pval_ref, rtol=1e-6, atol=1e-12)
+        np.testing.assert_array_equal(qrobj.inmodel, inmodel)
+# -------------------------------------------------------------------------------------
@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+
+"""
+HYDE PROCESSING TOOLS - Profiler Compression Mode
+
+__date__ = '20261018'
+__version__ = '1.0.0'
+__library__ = 'HyDE'
+
+General command line:
+python3 app_profiler_compression_mode.py -lib_path app/app_map/ground_network/ws [-product ws]
+    [-rows 640] [-cols 720] [-vars 7] [-steps 1] [-repeats 3]
+
+The destination compression modes ("netcdf_gzip" and "gzip") are compared using the writing method and the gzip
+library of the package folder (ws, hs, rs, radar, nwp/ecmwf, nwp/icon or nwp/lami). The product preset defines the
+variable(s) and time step(s) of one destination file; the grid and the preset value(s) can be changed by arguments.
+"""
+
+# -------------------------------------------------------------------------------------
+# Libraries
+import logging
+import time
+import argparse
+import os
+import sys
+import glob
+import importlib
+import tempfile
+
+import numpy as np
+import xarray as xr
+
+# Logging
+log_stream = logging.getLogger(__name__)
+# -------------------------------------------------------------------------------------
+
+# -------------------------------------------------------------------------------------
+# Algorithm information
+project_name = 'HyDE'
+alg_name = 'Profiler Compression Mode'
+alg_type = 'Processing Tool'
+alg_version = '1.0.0'
+alg_release = '2026-10-18'
+
+# Product preset(s) (variable(s) and time step(s) of a destination file of the example settings)
+products_default = {
+    'ws': {'vars': 7, 'steps': 1},
+    'hs': {'vars': 2, 'steps': 1},
+    'rs': {'vars': 1, 'steps': 1},
+    'radar': {'vars': 1, 'steps': 1},
+    'nwp': {'vars': 7, 'steps': 24},
+}
+# Compression mode(s) (netcdf compression level, gzip compression level)
+modes_default = {
+    'netcdf_gzip': {'complevel': 9, 'zip_level': 9},
+    'gzip': {'complevel': 0, 'zip_level': 9},
+}
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Script main
+def main():
+
+    # -------------------------------------------------------------------------------------
+    # Get algorithm arguments
+    lib_path, product_name, grid_rows, grid_cols, grid_vars, grid_steps, profile_repeats = get_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    # Get product preset (the preset is defined by the package folder if the product is not set)
+    if product_name is None:
+        product_name = os.path.basename(os.path.normpath(lib_path))
+        if product_name in ['ecmwf', 'icon', 'lami']:
+            product_name = 'nwp'
+    if product_name not in list(products_default.keys()):
+        log_stream.error(' ===> Product "' + str(product_name) + '" is not supported')
+        raise NotImplementedError('Product preset not available')
+    if grid_vars is None:
+        grid_vars = products_default[product_name]['vars']
+    if grid_steps is None:
+        grid_steps = products_default[product_name]['steps']
+
+    # Import the writing and zipping method(s) of the package
+    write_dset, zip_filename = import_methods(lib_path)
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Info algorithm
+    log_stream.info('[' + project_name + ' ' + alg_type + ' - ' + alg_name + ' (Version ' + alg_version +
+                    ' - Release ' + alg_release + ')]')
+    log_stream.info(' ---> Product: ' + product_name + ' :: Grid: ' + str(grid_rows) + 'x' + str(grid_cols) +
+                    ' :: Variables: ' + str(grid_vars) + ' :: Steps: ' + str(grid_steps))
+
+    dset_data = create_dset_profile(grid_rows, grid_cols, grid_vars, grid_steps)
+    dset_size = dset_data.nbytes / 1024 / 1024
+    folder_name_tmp = tempfile.mkdtemp(prefix='hyde_profiler_')
+
+    log_stream.info(' ---> Raw size [MB]: ' + '{:.2f}'.format(dset_size))
+    log_stream.info(' ---> ' + 'Mode'.ljust(16) + 'CPU [s]'.rjust(12) + 'Wall [s]'.rjust(12) +
+                    'Size [MB]'.rjust(12))
+    for mode_name, mode_fields in modes_default.items():
+
+        file_name_tmp = os.path.join(folder_name_tmp, mode_name + '.nc')
+        file_name_zip = file_name_tmp + '.gz'
+
+        time_cpu, time_wall = [], []
+        for profile_repeat in range(profile_repeats):
+
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            write_dset(file_name_tmp, dset_data.copy(deep=True), mode_fields['complevel'])
+            zip_filename(file_name_tmp, file_name_zip, zip_level=mode_fields['zip_level'], zip_workers=1)
+            time_cpu.append(time.process_time() - cpu_start)
+            time_wall.append(time.perf_counter() - wall_start)
+
+            os.remove(file_name_tmp)
+
+        file_size = os.path.getsize(file_name_zip) / 1024 / 1024
+        os.remove(file_name_zip)
+
+        log_stream.info(' ---> ' + mode_name.ljust(16) + '{:12.3f}{:12.3f}{:12.2f}'.format(
+            np.min(time_cpu), np.min(time_wall), file_size))
+
+    os.rmdir(folder_name_tmp)
+    # -------------------------------------------------------------------------------------
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to import a library from the package folder (only one library must match the pattern)
+def import_lib(lib_path, lib_pattern):
+
+    lib_file_list = sorted(glob.glob(os.path.join(lib_path, lib_pattern)))
+    if lib_file_list.__len__() != 1:
+        log_stream.error(' ===> Library "' + lib_pattern + '" not found or not unique in the folder "' + lib_path + '"')
+        raise IOError('Folder must contain one "' + lib_pattern + '" library')
+    lib_name = os.path.splitext(os.path.basename(lib_file_list[0]))[0]
+
+    return importlib.import_module(lib_name)
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to import the writing and zipping method(s) of the package folder
+def import_methods(lib_path):
+
+    sys.path.insert(0, lib_path)
+
+    lib_zip = import_lib(lib_path, 'lib_*_io_gzip.py')
+
+    # Ground network and radar package(s) use the generic io library; nwp package(s) use the netcdf io library
+    if glob.glob(os.path.join(lib_path, 'lib_*_io_generic.py')):
+        lib_io = import_lib(lib_path, 'lib_*_io_generic.py')
+
+        def write_dset(file_name, dset_data, dset_compression):
+            lib_io.write_dset(file_name, dset_data, dset_engine='netcdf4', dset_compression_level=dset_compression)
+    else:
+        lib_io = import_lib(lib_path, 'lib_data_io_nc.py')
+
+        def write_dset(file_name, dset_data, dset_compression):
+            lib_io.write_file_nc_xarray(file_name, dset_data, dset_compression=dset_compression)
+
+    return write_dset, lib_zip.zip_filename
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to create a realistic dataset (smooth fields with no data outside the domain)
+def create_dset_profile(grid_rows, grid_cols, grid_vars, grid_steps, no_data=-9999.0):
+
+    geo_y, geo_x = np.mgrid[0:grid_rows, 0:grid_cols]
+    geo_mask = ((geo_x - grid_cols / 2) ** 2 / (grid_cols / 2.2) ** 2 +
+                (geo_y - grid_rows / 2) ** 2 / (grid_rows / 2.2) ** 2) > 1
+
+    random_generator = np.random.default_rng(0)
+    dset_data = xr.Dataset(coords={'west_east': np.linspace(12.0, 14.0, grid_cols),
+                                   'south_north': np.linspace(44.0, 42.0, grid_rows)})
+    for var_id in range(grid_vars):
+        var_values = np.zeros((grid_steps, grid_rows, grid_cols))
+        for step_id in range(grid_steps):
+            var_values[step_id] = (np.sin(geo_x / 50.0 + var_id + step_id / 6.0) + np.cos(geo_y / 37.0)) * 10.0 + \
+                random_generator.random((grid_rows, grid_cols)) * 0.5
+            var_values[step_id][geo_mask] = no_data
+        if grid_steps == 1:
+            dset_data['variable_' + str(var_id)] = (('south_north', 'west_east'), var_values[0])
+        else:
+            dset_data['variable_' + str(var_id)] = (('time', 'south_north', 'west_east'), var_values)
+
+    return dset_data
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to get script argument(s)
+def get_args():
+    parser_handle = argparse.ArgumentParser()
+    parser_handle.add_argument('-lib_path', action="store", dest="alg_lib_path")
+    parser_handle.add_argument('-product', action="store", dest="alg_product")
+    parser_handle.add_argument('-rows', action="store", dest="alg_rows", type=int, default=640)
+    parser_handle.add_argument('-cols', action="store", dest="alg_cols", type=int, default=720)
+    parser_handle.add_argument('-vars', action="store", dest="alg_vars", type=int)
+    parser_handle.add_argument('-steps', action="store", dest="alg_steps", type=int)
+    parser_handle.add_argument('-repeats', action="store", dest="alg_repeats", type=int, default=3)
+    parser_values = parser_handle.parse_args()
+
+    if parser_values.alg_lib_path:
+        alg_lib_path = parser_values.alg_lib_path
+    else:
+        alg_lib_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    '..', '..', 'app', 'app_map', 'ground_network', 'ws')
+
+    return (alg_lib_path, parser_values.alg_product,
+            parser_values.alg_rows, parser_values.alg_cols, parser_values.alg_vars, parser_values.alg_steps,
+            parser_values.alg_repeats)
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Call script from external library
+if __name__ == "__main__":
+    main()
+# -------------------------------------------------------------------------------------
@@ -0,0 +1,189 @@
+#!/usr/bin/python3
+
+"""
+HYDE PROCESSING TOOLS - Profiler NetCDF Encoding
+
+__date__ = '20261018'
+__version__ = '1.0.0'
+__library__ = 'HyDE'
+
+General command line:
+python3 app_profiler_netcdf_encoding.py -lib_path app/app_map/ground_network/ws [-settings_file configuration.json]
+    [-rows 640] [-cols 720] [-vars 7] [-repeats 3]
+
+The writing method is imported from the "lib_*_io_generic" module of the package folder (ws, hs, rs or radar).
+"""
+
+# -------------------------------------------------------------------------------------
+# Libraries
+import logging
+import time
+import argparse
+import os
+import sys
+import glob
+import json
+import importlib
+import tempfile
+
+import numpy as np
+import xarray as xr
+
+# Logging
+log_stream = logging.getLogger(__name__)
+# -------------------------------------------------------------------------------------
+
+# -------------------------------------------------------------------------------------
+# Algorithm information
+project_name = 'HyDE'
+alg_name = 'Profiler NetCDF Encoding'
+alg_type = 'Processing Tool'
+alg_version = '1.0.0'
+alg_release = '2026-10-18'
+
+# Encoding profile(s) (same keys of the "file_encoding" destination settings)
+profiles_default = {
+    'zlib_9': {'complevel': 9},
+    'zlib_4_shuffle': {'complevel': 4, 'shuffle': True},
+    'zlib_4_shuffle_chunk': {'complevel': 4, 'shuffle': True,
+                             'chunk_sizes': {'south_north': 256, 'west_east': 256}},
+    'zlib_4_shuffle_float32': {'complevel': 4, 'shuffle': True, 'dtype': 'float32'},
+    'zlib_4_shuffle_float32_lsd2': {'complevel': 4, 'shuffle': True, 'dtype': 'float32',
+                                    'least_significant_digit': 2},
+    'zlib_1_shuffle_float32': {'complevel': 1, 'shuffle': True, 'dtype': 'float32'},
+}
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Script main
+def main():
+
+    # -------------------------------------------------------------------------------------
+    # Get algorithm arguments
+    lib_path, file_settings, grid_rows, grid_cols, grid_vars, profile_repeats = get_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    # Import the writing method of the package
+    write_dset = import_write_dset(lib_path)
+
+    # Get profile(s) (the product profile is added if defined in the settings file)
+    profiles_collections = dict(profiles_default)
+    if file_settings is not None:
+        with open(file_settings) as file_handle:
+            settings_data = json.load(file_handle)
+        settings_dst = settings_data['data']['dynamic']['destination']
+        if 'file_encoding' in list(settings_dst.keys()):
+            profiles_collections['settings'] = settings_dst['file_encoding']
+    # -------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------
+    # Info algorithm
+    log_stream.info('[' + project_name + ' ' + alg_type + ' - ' + alg_name + ' (Version ' + alg_version +
+                    ' - Release ' + alg_release + ')]')
+    log_stream.info(' ---> Grid: ' + str(grid_rows) + 'x' + str(grid_cols) + ' :: Variables: ' + str(grid_vars))
+
+    dset_data = create_dset_profile(grid_rows, grid_cols, grid_vars)
+    folder_name_tmp = tempfile.mkdtemp(prefix='hyde_profiler_')
+
+    log_stream.info(' ---> ' + 'Profile'.ljust(32) + 'Write [s]'.rjust(12) + 'Read [s]'.rjust(12) +
+                    'Size [MB]'.rjust(12))
+    for profile_name, profile_encoding in profiles_collections.items():
+
+        file_name_tmp = os.path.join(folder_name_tmp, profile_name + '.nc')
+
+        time_write, time_read = [], []
+        for profile_repeat in range(profile_repeats):
+
+            time_start = time.time()
+            write_dset(file_name_tmp, dset_data.copy(deep=True), dset_engine='netcdf4',
+                       dset_encoding_profile=profile_encoding)
+            time_write.append(time.time() - time_start)
+
+            time_start = time.time()
+            with xr.open_dataset(file_name_tmp) as dset_check:
+                dset_check.load()
+            time_read.append(time.time() - time_start)
+
+        file_size = os.path.getsize(file_name_tmp) / 1024 / 1024
+        os.remove(file_name_tmp)
+
+        log_stream.info(' ---> ' + profile_name.ljust(32) + '{:12.3f}{:12.3f}{:12.2f}'.format(
+            np.min(time_write), np.min(time_read), file_size))
+
+    os.rmdir(folder_name_tmp)
+    # -------------------------------------------------------------------------------------
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to import the writing method from the generic io library of the package folder
+def import_write_dset(lib_path):
+
+    lib_file_list = sorted(glob.glob(os.path.join(lib_path, 'lib_*_io_generic.py')))
+    if lib_file_list.__len__() != 1:
+        log_stream.error(' ===> Generic io library not found or not unique in the folder "' + lib_path + '"')
+        raise IOError('Folder must contain one "lib_*_io_generic.py" library')
+    lib_name = os.path.splitext(os.path.basename(lib_file_list[0]))[0]
+
+    sys.path.insert(0, lib_path)
+    lib_module = importlib.import_module(lib_name)
+    if not hasattr(lib_module, 'write_dset'):
+        log_stream.error(' ===> Method "write_dset" not found in the library "' + lib_name + '"')
+        raise NotImplementedError('Library without the writing method is not supported')
+
+    return lib_module.write_dset
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to create a realistic dataset (smooth fields with no data outside the domain)
+def create_dset_profile(grid_rows, grid_cols, grid_vars, no_data=-9999.0):
+
+    geo_y, geo_x = np.mgrid[0:grid_rows, 0:grid_cols]
+    geo_mask = ((geo_x - grid_cols / 2) ** 2 / (grid_cols / 2.2) ** 2 +
+                (geo_y - grid_rows / 2) ** 2 / (grid_rows / 2.2) ** 2) > 1
+
+    random_generator = np.random.default_rng(0)
+    dset_data = xr.Dataset(coords={'west_east': np.linspace(12.0, 14.0, grid_cols),
+                                   'south_north': np.linspace(44.0, 42.0, grid_rows)})
+    for var_id in range(grid_vars):
+        var_values = (np.sin(geo_x / 50.0 + var_id) + np.cos(geo_y / 37.0)) * 10.0 + \
+            random_generator.random((grid_rows, grid_cols)) * 0.5
+        var_values[geo_mask] = no_data
+        dset_data['variable_' + str(var_id)] = (('south_north', 'west_east'), var_values)
+
+    return dset_data
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Method to get script argument(s)
+def get_args():
+    parser_handle = argparse.ArgumentParser()
+    parser_handle.add_argument('-lib_path', action="store", dest="alg_lib_path")
+    parser_handle.add_argument('-settings_file', action="store", dest="alg_settings")
+    parser_handle.add_argument('-rows', action="store", dest="alg_rows", type=int, default=640)
+    parser_handle.add_argument('-cols', action="store", dest="alg_cols", type=int, default=720)
+    parser_handle.add_argument('-vars', action="store", dest="alg_vars", type=int, default=7)
+    parser_handle.add_argument('-repeats', action="store", dest="alg_repeats", type=int, default=3)
+    parser_values = parser_handle.parse_args()
+
+    if parser_values.alg_lib_path:
+        alg_lib_path = parser_values.alg_lib_path
+    else:
+        alg_lib_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    '..', '..', 'app', 'app_map', 'ground_network', 'ws')
+
+    return (alg_lib_path, parser_values.alg_settings,
+            parser_values.alg_rows, parser_values.alg_cols, parser_values.alg_vars, parser_values.alg_repeats)
+
+# -------------------------------------------------------------------------------------
+
+
+# -------------------------------------------------------------------------------------
+# Call script from external library
+if __name__ == "__main__":
+    main()
+# -------------------------------------------------------------------------------------